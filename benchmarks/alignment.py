@@ -0,0 +1,105 @@
+"""Smith-Waterman engine vs. a naive pure-Python implementation.
+
+Run from the repository root:  python -m benchmarks.alignment [--targets 200]
+"""
+import argparse
+import json
+import random
+import time
+
+from protein_db import alignment
+from protein_db.alignment import BLOSUM62, BLOSUM62_ALPHABET, GAP_EXTEND, GAP_OPEN
+
+RESIDUES = "ACDEFGHIKLMNPQRSTVWY"
+
+def naive_score(query, target, gap_open=GAP_OPEN, gap_extend=GAP_EXTEND):
+    """Textbook Gotoh recurrence, one cell at a time."""
+    index = {aa: i for i, aa in enumerate(BLOSUM62_ALPHABET)}
+    neg = float("-inf")
+    n = len(target)
+    h_prev, f_prev = [0] * (n + 1), [neg] * (n + 1)
+    best = 0
+    for a in query:
+        row = BLOSUM62[index.get(a, index["X"])].tolist()
+        h, f, e = [0] * (n + 1), [neg] * (n + 1), neg
+        for j in range(1, n + 1):
+            e = max(h[j - 1] - gap_open - gap_extend, e - gap_extend)
+            f[j] = max(h_prev[j] - gap_open - gap_extend, f_prev[j] - gap_extend)
+            h[j] = max(0, h_prev[j - 1] + row[index.get(target[j - 1], index["X"])], e, f[j])
+            best = max(best, h[j])
+        h_prev, f_prev = h, f
+    return best
+
+def mutate(sequence, rng, rate):
+    out = []
+    for aa in sequence:
+        r = rng.random()
+        if r < rate / 2:
+            out.append(rng.choice(RESIDUES))
+        elif r < rate * 3 / 4:
+            continue
+        elif r < rate:
+            out.extend([aa, rng.choice(RESIDUES)])
+        else:
+            out.append(aa)
+    return "".join(out)
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", type=int, default=200)
+    parser.add_argument("--length", type=int, default=300)
+    parser.add_argument("--naive-pairs", type=int, default=5, help="pairs timed with the naive baseline")
+    parser.add_argument("--workers", type=int, default=alignment.WORKERS)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    query = "".join(rng.choice(RESIDUES) for _ in range(args.length))
+    targets = [mutate(query, rng, 0.3) if k % 2 else
+               "".join(rng.choice(RESIDUES) for _ in range(rng.randint(args.length // 2, args.length * 2)))
+               for k in range(args.targets)]
+
+    naive, naive_time = timed(lambda: [naive_score(query, t) for t in targets[:args.naive_pairs]])
+    single, single_time = timed(lambda: [int(alignment.score_batch(query, [t])[0][0])
+                                         for t in targets[:args.naive_pairs]])
+    assert naive == single, f"score mismatch: naive {naive} vs vectorized {single}"
+
+    alignment.get_cache().clear()
+    batch, batch_time = timed(lambda: alignment.align_many(query, targets, workers=1))
+    alignment.get_cache().clear()
+    pooled, pool_time = timed(lambda: alignment.align_many(query, targets, workers=args.workers))
+    _, cached_time = timed(lambda: alignment.align_many(query, targets, workers=args.workers))
+    assert batch[:args.naive_pairs] == naive, f"score mismatch: naive {naive} vs batched {batch[:args.naive_pairs]}"
+    assert batch == pooled, "process pool scores differ from in-process scores"
+    traced, traceback_time = timed(lambda: alignment.align(query, targets[1]))
+    assert traced["score"] == batch[1], f"traceback score {traced['score']} vs batched {batch[1]}"
+
+    cells = len(query) * sum(len(t) for t in targets)
+    per_pair_naive = naive_time / args.naive_pairs
+    results = {
+        "targets": args.targets,
+        "query_length": len(query),
+        "naive_ms_per_pair": round(per_pair_naive * 1e3, 2),
+        "vectorized_ms_per_pair": round(single_time / args.naive_pairs * 1e3, 2),
+        "batch_ms_per_pair": round(batch_time / args.targets * 1e3, 3),
+        "batch_mcups": round(cells / batch_time / 1e6, 1),
+        "pool_workers": args.workers,
+        "pool_ms_per_pair": round(pool_time / args.targets * 1e3, 3),
+        "cached_ms_total": round(cached_time * 1e3, 2),
+        "traceback_ms": round(traceback_time * 1e3, 2),
+        "speedup_vs_naive": round(per_pair_naive / (batch_time / args.targets), 1),
+    }
+    if args.json:
+        print(json.dumps(results))
+    else:
+        for name, value in results.items():
+            print(f"{name:>24}  {value}")
+
+if __name__ == "__main__":
+    main()
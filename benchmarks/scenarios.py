@@ -0,0 +1,275 @@
+"""Timed search, admin listing / statistics and ingestion scenarios on a synthetic database.
+
+Run from the repository root:  python -m benchmarks.scenarios --rows 100k --out results.json
+
+The database is generated once per size and seed under --workdir and
+reused by later runs. Ingestion talks to benchmarks.stub_api on a local
+port, so no scenario touches the network. Results are JSON (--out, or
+--json for stdout); --baseline compares medians with an earlier result file.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Proteins added by the ingestion scenarios; removed again at the end of a run.
+INGEST_PREFIX = "PDB_9"
+SEARCH_TERMS = {
+    "text_word": "kinase",
+    "text_phrase": '"heat shock" protein',
+    "text_prefix": "thio",
+    "text_organism": "coronavirus spike",
+    "text_no_match": "zzyzxq",
+}
+PAGE_WALK = 10
+
+# ================= ENVIRONMENT =================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def configure(workdir, db_path, stub_url):
+    """Point every setting read at import time at the work directory and the stub API.
+
+    protein_db reads its settings when first imported, so this runs before
+    any protein_db (or benchmarks.synthetic_db) import.
+    """
+    os.environ.update({
+        "PROTEIN_DB_PATH": db_path,
+        "RCSB_DATA_URL": stub_url,
+        "UNIPROT_REST_URL": stub_url,
+        "RCSB_FILES_URL": stub_url,
+        "RCSB_MODELS_URL": stub_url,
+        "RCSB_CDN_URL": stub_url,
+        "IMAGE_PREFETCH": "0",
+        "RESPONSE_CACHE_DIR": os.path.join(workdir, "responses"),
+        "STRUCTURE_CACHE_DIR": os.path.join(workdir, "structures"),
+        "IMAGE_CACHE_DIR": os.path.join(workdir, "images"),
+    })
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit, "dirty": dirty}
+
+# ================= TIMING =================
+def summarize(times):
+    ordered = sorted(times)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0] * 1e3, 3),
+        "median_ms": round(ordered[len(ordered) // 2] * 1e3, 3),
+        "p95_ms": round(ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)] * 1e3, 3),
+        "max_ms": round(ordered[-1] * 1e3, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1e3, 3),
+    }
+
+def measure(fn, repeat, setup=None):
+    """Time fn() repeat times; setup() runs untimed before each call. fn gets the run number."""
+    times = []
+    for run in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn(run)
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+# ================= SCENARIOS =================
+def run_scenarios(conn, args, on_result):
+    """Run every scenario against conn; on_result(name, summary) is called as each one finishes."""
+    from protein_db import jobs, query_cache
+    from protein_db.ingest import fetch_protein_record, ingest_batch, run_after_commit, store_protein
+    from protein_db.kmer_index import index_for
+    from protein_db.listing import fetch_page
+    from protein_db.search import search_by_sequence, search_proteins
+    from protein_db.shape_index import similar_structures
+    from protein_db.stats import check_stats, get_breakdown, get_counters
+
+    repeat = args.repeat
+    cold = query_cache.bump_generation  # every query pays for SQLite, not the result cache
+    rng = random.Random(args.seed)
+    sample = [row[0] for row in conn.execute(
+        "SELECT pdb_id FROM protein ORDER BY random() LIMIT ?", (max(repeat, 20),))]
+    sample_ids = [row[0] for row in conn.execute(
+        "SELECT protein_id FROM protein WHERE pdb_id IN (SELECT value FROM json_each(?))", (json.dumps(sample),))]
+    store = index_for(conn).store
+
+    def run(name, fn, times=repeat, setup=cold):
+        on_result(name, measure(fn, times, setup))
+
+    # ---------- search page ----------
+    run("search.pdb_id", lambda i: search_proteins(conn, sample[i % len(sample)]))
+    for name, text in SEARCH_TERMS.items():
+        run(f"search.{name}", lambda i, text=text: search_proteins(conn, text))
+    run("search.text_word_cached", lambda i: search_proteins(conn, SEARCH_TERMS["text_word"]), setup=None)
+
+    def rebuild_index(i):
+        index_for(conn).invalidate()
+        index_for(conn).ensure_built(conn)
+    run("search.sequence_index_build", rebuild_index, times=min(repeat, 3))
+    queries = []
+    for protein_id in sample_ids:
+        residues = list(store.get_str(conn, protein_id))
+        for k in rng.sample(range(len(residues)), len(residues) // 10):
+            residues[k] = rng.choice("ACDEFGHIKLMNPQRSTVWY")
+        queries.append("".join(residues))
+    run("search.sequence", lambda i: search_by_sequence(conn, queries[i % len(queries)]))
+
+    # ---------- admin listing and statistics ----------
+    run("admin.listing_first_page", lambda i: fetch_page(conn))
+    run("admin.listing_sorted_name_desc", lambda i: fetch_page(conn, sort="protein_name", descending=True))
+
+    def walk(i):
+        cursor = None
+        for _ in range(PAGE_WALK):
+            _, cursor = fetch_page(conn, sort="organism", after=cursor)
+    run(f"admin.listing_walk_{PAGE_WALK}_pages", walk)
+    run("admin.listing_filter_text", lambda i: fetch_page(conn, text=SEARCH_TERMS["text_word"]))
+    run("admin.listing_filter_method_ligand",
+        lambda i: fetch_page(conn, method="ELECTRON MICROSCOPY", ligand=True))
+    run("admin.counters", lambda i: get_counters(conn))
+    run("admin.breakdown", lambda i: (get_breakdown(conn, "method"), get_breakdown(conn, "organism")))
+    run("admin.check_stats", lambda i: check_stats(conn), times=min(repeat, 3))
+
+    # ---------- ingestion ----------
+    serial = iter(range(10 ** 7))
+
+    def fresh_id():
+        return f"{INGEST_PREFIX}{next(serial):07d}"
+
+    records = [fetch_protein_record(fresh_id())[0] for _ in range(repeat)]
+
+    def store_one(i):
+        after_commit = []
+        with conn:
+            store_protein(conn.cursor(), records[i], after_commit=after_commit)
+        run_after_commit(after_commit)
+    run("ingest.store_protein", store_one, setup=None)
+    run("ingest.add_protein", lambda i: ingest_batch(conn, [fresh_id()], workers=1), setup=None)
+    batch = [fresh_id() for _ in range(args.batch)]
+    on_result(f"ingest.batch_{args.batch}", measure(lambda i: ingest_batch(conn, batch), 1))
+
+    runner = jobs.start_runner(args.db)
+
+    def queued(i):
+        job_id = jobs.enqueue(conn, "ingest", {"pdb_ids": [fresh_id()]})
+        while conn.execute("SELECT status FROM job WHERE job_id = ?", (job_id,)).fetchone()[0] in ("queued",
+                                                                                                    "running"):
+            time.sleep(0.005)
+    run("ingest.queued_job", queued, times=min(repeat, 10), setup=runner.wake)
+
+    # Only ingested proteins have coordinates, so shape search runs on them.
+    run("search.similar_structures", lambda i: similar_structures(conn, records[i % len(records)]["pdb_id"]))
+
+def remove_ingested(conn):
+    from protein_db import query_cache
+    from protein_db.kmer_index import index_for
+    from protein_db.shape_index import shape_index_for
+
+    with conn:
+        ids = f"SELECT protein_id FROM protein WHERE pdb_id LIKE '{INGEST_PREFIX}%'"
+        conn.execute(f"DELETE FROM protein_structure WHERE protein_id IN ({ids})")
+        conn.execute(f"DELETE FROM protein WHERE protein_id IN ({ids})")
+        conn.execute("DELETE FROM job")
+    index_for(conn).invalidate()
+    shape_index_for(conn).invalidate()
+    query_cache.bump_generation()
+
+# ================= REPORTING =================
+def compare(results, baseline):
+    """Lines comparing median times with an earlier result file."""
+    lines = []
+    for name, summary in results["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None or not before["median_ms"]:
+            lines.append(f"{name:>40}  {summary['median_ms']:>10.2f} ms  (new)")
+            continue
+        change = summary["median_ms"] / before["median_ms"] - 1
+        lines.append(f"{name:>40}  {before['median_ms']:>10.2f} -> {summary['median_ms']:>10.2f} ms  "
+                     f"{change:+.0%}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10k", help="row count or one of 10k, 100k, 1m")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per scenario")
+    parser.add_argument("--batch", type=int, default=100, help="IDs in the batch ingestion scenario")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds the stub API adds to every response")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "protein_db_benchmarks"),
+                        help="where generated databases and caches are kept between runs")
+    parser.add_argument("--out", help="write the JSON results to this file")
+    parser.add_argument("--baseline", help="earlier JSON results to compare medians with")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    os.makedirs(args.workdir, exist_ok=True)
+    port = free_port()
+    rows_label = args.rows.lower()
+    args.db = os.path.join(args.workdir, f"synthetic-{rows_label}-{args.seed}.db")
+    configure(args.workdir, args.db, f"http://127.0.0.1:{port}")
+
+    from benchmarks import stub_api
+    from benchmarks.synthetic_db import SIZES, generate
+    from protein_db.db import get_connection
+
+    rows = SIZES.get(rows_label) or int(args.rows)
+    server, _ = stub_api.start(port, args.latency)
+    start = time.perf_counter()
+    added = generate(args.db, rows, args.seed)
+    generate_seconds = time.perf_counter() - start
+
+    conn = get_connection(args.db)
+    remove_ingested(conn)
+    results = {
+        "suite": "scenarios",
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git": git_revision(),
+        "environment": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                        "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {"rows": rows, "seed": args.seed, "repeat": args.repeat, "batch": args.batch,
+                   "latency": args.latency},
+        "database": {"path": args.db, "bytes": os.path.getsize(args.db),
+                     "generated_rows": added, "generate_seconds": round(generate_seconds, 2) if added else None},
+        "scenarios": {},
+    }
+
+    def report(name, summary):
+        results["scenarios"][name] = summary
+        if not args.json:
+            print(f"{name:>40}  median {summary['median_ms']:>10.2f} ms  p95 {summary['p95_ms']:>10.2f} ms  "
+                  f"({summary['runs']} runs)", flush=True)
+
+    try:
+        run_scenarios(conn, args, report)
+    finally:
+        remove_ingested(conn)
+        server.shutdown()
+    results["stub_requests"] = dict(server.RequestHandlerClass.counts)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results))
+    if args.baseline:
+        with open(args.baseline) as f:
+            print("\n".join(compare(results, json.load(f))))
+
+if __name__ == "__main__":
+    main()
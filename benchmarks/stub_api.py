@@ -0,0 +1,143 @@
+"""Local stand-in for the RCSB Data API, RCSB file server and UniProt REST API.
+
+Responses are synthetic but shaped like the real ones and deterministic per
+ID, so ingestion can be benchmarked without the network:
+
+    python -m benchmarks.stub_api --port 8765 --latency 0.05
+    RCSB_DATA_URL=http://127.0.0.1:8765 UNIPROT_REST_URL=http://127.0.0.1:8765 \\
+    RCSB_FILES_URL=http://127.0.0.1:8765 RCSB_MODELS_URL=http://127.0.0.1:8765 streamlit run Home.py
+
+IDs starting with "0" (which the PDB never issues) answer 404.
+"""
+import argparse
+import gzip
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from benchmarks.synthetic_db import family_sequence, family_text, record
+
+# Families the stub draws from; a larger pool means fewer repeated sequences.
+FAMILIES = 50_000
+MAX_MODEL_RESIDUES = 600
+CA_STEP = 3.8
+BACKBONE = (("N", "N", -1.2), ("CA", "C", 0.0), ("C", "C", 1.3), ("O", "O", 2.1))
+
+_ENTRY = re.compile(r"/rest/v1/core/entry/(\w+)$")
+_ENTITY = re.compile(r"/rest/v1/core/polymer_entity/(\w+)/(\d+)$")
+_UNIPROT = re.compile(r"/uniprotkb/([PQO])(\d+)\.json$")
+_MMCIF = re.compile(r"/download/(\w+)\.cif\.gz$")
+
+# ================= DOCUMENTS =================
+def _record(pdb_id):
+    return record(zlib.crc32(pdb_id.upper().encode()), FAMILIES)
+
+def entry_document(pdb_id):
+    _, name, _, _, _, method, resolution, ligand_present, _ = _record(pdb_id)
+    return {
+        "rcsb_id": pdb_id.upper(),
+        "struct": {"title": name},
+        "exptl": [{"method": method}],
+        "rcsb_entry_info": {"resolution_combined": [resolution] if resolution else None},
+        "rcsb_entry_container_identifiers": {"entry_id": pdb_id.upper(),
+                                             "nonpolymer_entity_ids": ["2"] if ligand_present else []},
+    }
+
+def entity_document(pdb_id):
+    _, _, uniprot_id, organism, *_ = _record(pdb_id)
+    return {
+        "rcsb_polymer_entity_container_identifiers": {"entry_id": pdb_id.upper(), "entity_id": "1",
+                                                      "uniprot_ids": [uniprot_id]},
+        "rcsb_entity_source_organism": [{"scientific_name": organism}],
+    }
+
+def uniprot_document(prefix, number):
+    family = int(number) * 3 + "PQO".index(prefix)
+    _, function = family_text(family)
+    return {
+        "primaryAccession": f"{prefix}{number}",
+        "sequence": {"value": family_sequence(family).tobytes().decode("ascii")},
+        "comments": [{"commentType": "FUNCTION", "texts": [{"value": function}]}],
+    }
+
+def mmcif_document(pdb_id):
+    """A single-chain backbone model whose CA trace is a 3.8 Å random walk."""
+    rng = np.random.default_rng(zlib.crc32(pdb_id.upper().encode()))
+    residues = min(len(_record(pdb_id)[8]), MAX_MODEL_RESIDUES)
+    steps = rng.normal(size=(residues, 3))
+    ca = np.cumsum(steps * (CA_STEP / np.linalg.norm(steps, axis=1))[:, None], axis=0)
+    lines = [f"data_{pdb_id.upper()}", "#", "loop_"] + [f"_atom_site.{c}" for c in (
+        "group_PDB", "id", "type_symbol", "label_atom_id", "label_comp_id", "label_asym_id", "label_seq_id",
+        "Cartn_x", "Cartn_y", "Cartn_z", "auth_seq_id", "auth_asym_id", "pdbx_PDB_model_num")]
+    serial = 0
+    for r, (x, y, z) in enumerate(ca, 1):
+        for atom, element, shift in BACKBONE:
+            serial += 1
+            lines.append(f"ATOM {serial} {element} {atom} ALA A {r} {x + shift:.3f} {y:.3f} {z:.3f} {r} A 1")
+    lines.append("#")
+    return ("\n".join(lines) + "\n").encode()
+
+# ================= SERVER =================
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    counts = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        path = self.path.split("?")[0]
+        for name, pattern, build in (("entry", _ENTRY, entry_document), ("entity", _ENTITY, entity_document),
+                                     ("uniprot", _UNIPROT, uniprot_document), ("mmcif", _MMCIF, mmcif_document)):
+            match = pattern.match(path)
+            if match is None:
+                continue
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if match.group(1).startswith("0"):
+                return self._send(404, b"{}")
+            if name == "mmcif":
+                return self._send(200, gzip.compress(build(match.group(1)), 1), "application/octet-stream")
+            if name == "entity" and match.group(2) != "1":
+                return self._send(404, b"{}")
+            args = match.groups() if name == "uniprot" else (match.group(1),)
+            return self._send(200, json.dumps(build(*args)).encode())
+        # Anything else (BinaryCIF models, images) is "not available".
+        self._send(404)
+
+def start(port=0, latency=0.0):
+    """Serve on a daemon thread. Returns (server, base URL); server.shutdown() stops it."""
+    handler = type("Handler", (StubHandler,), {"latency": latency, "counts": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="stub-api", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    server, url = start(args.port, args.latency)
+    print(f"serving on {url}; Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
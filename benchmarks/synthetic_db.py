@@ -0,0 +1,179 @@
+"""Synthetic protein_structure.db for benchmarks: realistic names, functions, organisms and sequences.
+
+Run from the repository root:  python -m benchmarks.synthetic_db --rows 100000 --out bench/protein_structure.db
+"""
+import argparse
+import functools
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+
+from protein_db.bulk_import import write_records
+from protein_db.migrations import migrate
+from protein_db.sequence_store import default_path
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BATCH_SIZE = 5000
+# Proteins of one family share a mutated ancestor sequence, so sequence
+# search and clustering see homologs the way they would in the PDB.
+FAMILY_SIZE = 20
+MUTATION_RATE = 0.25
+
+# ================= VOCABULARY =================
+# UniProt background frequencies of the 20 standard residues.
+RESIDUES = np.frombuffer(b"ARNDCQEGHILKMFPSTWYV", dtype=np.uint8)
+RESIDUE_FREQUENCIES = np.array([8.25, 5.53, 4.06, 5.45, 1.37, 3.93, 6.75, 7.07, 2.27, 5.96,
+                                9.66, 5.84, 2.42, 3.86, 4.70, 6.56, 5.34, 1.08, 2.92, 6.87])
+RESIDUE_FREQUENCIES /= RESIDUE_FREQUENCIES.sum()
+
+FAMILIES = [
+    ("Hemoglobin subunit {greek}", "Involved in oxygen transport from the lung to the various peripheral tissues."),
+    ("Myoglobin", "Serves as a reserve supply of oxygen and facilitates the movement of oxygen within muscles."),
+    ("Serine/threonine-protein kinase {gene}", "Phosphorylates serine and threonine residues of {substrate}."),
+    ("Tyrosine-protein kinase {gene}", "Non-receptor tyrosine kinase that regulates {process}."),
+    ("Beta-lactamase {gene}", "Hydrolyzes beta-lactam antibiotics such as penicillins and cephalosporins."),
+    ("DNA polymerase {greek}", "Catalyzes DNA-template-directed extension of the 3'-end of a DNA strand during {process}."),
+    ("Lysozyme C", "Hydrolyzes the 1,4-beta-linkages in peptidoglycan of bacterial cell walls."),
+    ("Carbonic anhydrase {roman}", "Reversible hydration of carbon dioxide; involved in {process}."),
+    ("Glyceraldehyde-3-phosphate dehydrogenase", "Key enzyme in glycolysis that catalyzes the conversion of "
+     "glyceraldehyde 3-phosphate to 1,3-bisphosphoglycerate."),
+    ("Heat shock protein HSP 90-{greek}", "Molecular chaperone that promotes the maturation and structural "
+     "maintenance of {substrate}."),
+    ("Ubiquitin carboxyl-terminal hydrolase {number}", "Deubiquitinating enzyme that removes ubiquitin from "
+     "{substrate}."),
+    ("Cytochrome P450 {gene}", "Monooxygenase that catalyzes the oxidation of {substrate}."),
+    ("Thioredoxin {number}", "Participates in redox reactions through the reversible oxidation of its active "
+     "center dithiol."),
+    ("Green fluorescent protein", "Energy-transfer acceptor; its role is to transduce the blue chemiluminescence "
+     "of aequorin into green fluorescent light."),
+    ("Insulin", "Decreases blood glucose concentration and increases cell permeability to monosaccharides."),
+    ("Spike glycoprotein", "Attaches the virion to the cell membrane by interacting with host receptors, "
+     "initiating the infection."),
+    ("Protease {gene}", "Cleaves {substrate} at specific sites during {process}."),
+    ("Transcription factor {gene}", "Binds DNA and regulates the transcription of genes involved in {process}."),
+    ("Elongation factor {gene}", "Promotes the GTP-dependent binding of aminoacyl-tRNA to the ribosome during "
+     "protein biosynthesis."),
+    ("ATP synthase subunit {greek}", "Produces ATP from ADP in the presence of a proton gradient across the membrane."),
+    ("Actin, cytoplasmic {number}", "Actins are highly conserved proteins involved in various types of cell motility."),
+    ("Tubulin {greek} chain", "Tubulin is the major constituent of microtubules."),
+    ("Calmodulin-{number}", "Mediates the control of a large number of enzymes, ion channels and other proteins "
+     "by Ca(2+)."),
+    ("Glutathione S-transferase {gene}", "Conjugation of reduced glutathione to a wide number of hydrophobic "
+     "electrophiles."),
+    ("Aldo-keto reductase family 1 member {gene}", "Catalyzes the NADPH-dependent reduction of {substrate}."),
+]
+PREFIXES = ["", "", "", "", "Putative ", "Probable ", "Uncharacterized ", "Mitochondrial ", "Crystal structure of "]
+SUFFIXES = ["", "", "", "", " in complex with ATP", " mutant", " (apo form)", " bound to inhibitor", " fragment"]
+GREEK = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta"]
+ROMAN = ["I", "II", "III", "IV", "VII", "IX", "XII"]
+SUBSTRATES = ["a broad range of substrates", "steroid hormones", "client proteins", "histone H2A",
+              "viral polyproteins", "fatty acids", "aldehydes and ketones", "target proteins"]
+PROCESSES = ["cell cycle progression", "DNA repair", "apoptosis", "pH homeostasis", "viral replication",
+             "immune response", "cell migration", "glucose metabolism"]
+# (name, weight): a few model organisms dominate, as in the PDB.
+ORGANISMS = [("Homo sapiens", 40), ("Escherichia coli", 14), ("Mus musculus", 8), ("Saccharomyces cerevisiae", 5),
+             ("Rattus norvegicus", 3), ("Bos taurus", 3), ("Thermus thermophilus", 3), ("Arabidopsis thaliana", 2),
+             ("Drosophila melanogaster", 2), ("Mycobacterium tuberculosis", 2), ("Severe acute respiratory "
+             "syndrome coronavirus 2", 2), ("Staphylococcus aureus", 2), ("Gallus gallus", 1),
+             ("Danio rerio", 1), ("Pseudomonas aeruginosa", 1), ("Plasmodium falciparum", 1)]
+METHODS = [("X-RAY DIFFRACTION", 82), ("ELECTRON MICROSCOPY", 12), ("SOLUTION NMR", 5),
+           ("NEUTRON DIFFRACTION", 1)]
+
+# ================= RECORDS =================
+ID_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+CLASSIC_IDS = 9 * 36 ** 3
+
+def pdb_id(i):
+    """A unique ID for row i: classic four-character IDs first, then the extended PDB_ form."""
+    if i >= CLASSIC_IDS:
+        return f"PDB_{i:08d}"
+    first, rest = divmod(i, 36 ** 3)
+    return ID_CHARS[first + 1] + ID_CHARS[rest // 1296] + ID_CHARS[rest // 36 % 36] + ID_CHARS[rest % 36]
+
+def _weights(choices):
+    weights = np.array([weight for _, weight in choices], dtype=float)
+    return np.cumsum(weights / weights.sum())
+
+ORGANISM_CDF = _weights(ORGANISMS)
+METHOD_CDF = _weights(METHODS)
+
+def _pick(rng, choices, cdf):
+    return choices[min(int(np.searchsorted(cdf, rng.random())), len(choices) - 1)][0]
+
+@functools.lru_cache(maxsize=None)
+def family_text(family):
+    """(protein name, function) of a family, filled in deterministically."""
+    rng = np.random.default_rng(family)
+    template, function = FAMILIES[family % len(FAMILIES)]
+    fields = {"greek": GREEK[rng.integers(len(GREEK))], "roman": ROMAN[rng.integers(len(ROMAN))],
+              "number": int(rng.integers(1, 20)), "gene": f"{chr(65 + rng.integers(26))}{rng.integers(1, 40)}",
+              "substrate": SUBSTRATES[rng.integers(len(SUBSTRATES))],
+              "process": PROCESSES[rng.integers(len(PROCESSES))]}
+    return template.format(**fields), function.format(**fields)
+
+@functools.lru_cache(maxsize=None)
+def family_sequence(family):
+    rng = np.random.default_rng(family + 1_000_003)
+    length = int(np.clip(rng.lognormal(5.7, 0.55), 40, 2500))
+    return rng.choice(RESIDUES, size=length, p=RESIDUE_FREQUENCIES)
+
+def mutate(ancestor, rng, rate=MUTATION_RATE):
+    sequence = ancestor.copy()
+    changed = rng.random(len(sequence)) < rate
+    sequence[changed] = rng.choice(RESIDUES, size=int(changed.sum()), p=RESIDUE_FREQUENCIES)
+    return sequence.tobytes().decode("ascii")
+
+def family_count(rows):
+    return max(1, rows // FAMILY_SIZE)
+
+def record(i, families, seed=0):
+    """The synthetic record for row i, in bulk_import.RECORD_COLUMNS order. The same arguments give the same record."""
+    rng = np.random.default_rng((seed, i))
+    family = zlib.crc32(f"{seed}:{i}".encode()) % families
+    name, function = family_text(family)
+    name = PREFIXES[rng.integers(len(PREFIXES))] + name + SUFFIXES[rng.integers(len(SUFFIXES))]
+    method = _pick(rng, METHODS, METHOD_CDF)
+    resolution = None if method == "SOLUTION NMR" else round(float(np.clip(rng.gamma(6.0, 0.38), 0.8, 8.0)), 2)
+    uniprot_id = f"{'PQO'[family % 3]}{family // 3:05d}"
+    return (pdb_id(i), name, uniprot_id, _pick(rng, ORGANISMS, ORGANISM_CDF),
+            function if rng.random() > 0.05 else None, method, resolution, int(rng.random() < 0.6),
+            mutate(family_sequence(family), rng))
+
+# ================= DATABASE =================
+def generate(path, rows, seed=0, on_progress=None):
+    """Create (or extend) a database at path with rows synthetic proteins. Returns how many were added."""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    migrate(conn)
+    start = conn.execute("SELECT COUNT(*) FROM protein").fetchone()[0]
+    families = family_count(rows)
+    added = 0
+    for first in range(start, rows, BATCH_SIZE):
+        added += write_records(conn, [record(i, families, seed)
+                                      for i in range(first, min(first + BATCH_SIZE, rows))])
+        conn.commit()
+        if on_progress is not None:
+            on_progress(min(first + BATCH_SIZE, rows), rows)
+    conn.execute("PRAGMA optimize")
+    conn.close()
+    return added
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10k", help=f"row count or one of {', '.join(SIZES)}")
+    parser.add_argument("--out", default="protein_structure.db", help="database file; extended if it exists")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = SIZES.get(args.rows.lower()) or int(args.rows)
+    start = time.perf_counter()
+    added = generate(args.out, rows, args.seed,
+                     on_progress=lambda done, total: print(f"\r{done:,} / {total:,}", end="", flush=True))
+    print(f"\nadded {added:,} proteins to {args.out} ({default_path(args.out)}) "
+          f"in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 
+from protein_db import image_cache
+from protein_db.clustering import IDENTITIES, collapse_redundant
+from protein_db.db import get_connection
+from protein_db.export import FORMATS, column_types, export_frame, export_query, search_query as full_text_query
+from protein_db.instrumentation import page_timer
+from protein_db.search import align_hit, format_alignment, search_by_sequence, search_proteins
+from protein_db.shape_index import similar_structures
+
 # ================= PAGE CONFIG =================
 st.set_page_config(page_title="Protein Detail Viewer", layout="wide", page_icon="🧬")
 
 # ================= DATABASE =================
-DB_NAME = "protein_structure.db"
-conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+conn = get_connection()
+timer = page_timer("search")
 
 # ================= CUSTOM CSS =================
 st.markdown("""
@@ -74,39 +81,73 @@ st.markdown("""
 st.markdown('<h1 class="main-title">🧬 Protein Detail Viewer</h1>', unsafe_allow_html=True)
 
 # ================= SEARCH INPUT =================
+timer.section("search input")
 st.markdown('<div class="search-container">', unsafe_allow_html=True)
-search_query = st.text_input("🔍 Enter PDB ID or Protein Name", placeholder="e.g., 4HHB or Hemoglobin").strip()
+search_query = st.text_input("🔍 Enter PDB ID, Protein Name, Function or Organism",
+                             placeholder='e.g., 4HHB, Hemoglobin or "oxygen transport"').strip()
+with st.expander("🧪 Search by Sequence", expanded=False):
+    sequence_query = st.text_area("Paste a protein sequence (plain or FASTA)", height=120,
+                                  placeholder=">query\nMVLSPADKTNVKAAWGKVGAHAGEYGAEALERMFLSFPTTKTYFPHF...").strip()
+col_collapse, col_identity = st.columns([2, 1])
+with col_collapse:
+    collapse = st.checkbox("🧩 Show one representative per cluster of near-identical chains", value=True)
+with col_identity:
+    identity = st.selectbox("Identity", IDENTITIES, format_func=lambda x: f"≥ {x:.0%}",
+                            disabled=not collapse, label_visibility="collapsed")
 st.markdown('</div>', unsafe_allow_html=True)
 
-if search_query:
-    query = """
-    SELECT
-        p.protein_name,
-        p.pdb_id,
-        p.uniprot_id,
-        p.organism,
-        p.function,
-        p.aa_length,
-        p.molecular_weight,
-        s.method,
-        s.resolution,
-        s.ligand_present
-    FROM protein p
-    JOIN protein_structure s ON p.protein_id = s.protein_id
-    WHERE LOWER(p.pdb_id) = LOWER(?)
-       OR LOWER(p.protein_name) LIKE LOWER(?)
-    """
-
-    df = pd.read_sql_query(query, conn, params=(search_query, f"%{search_query}%"))
+if sequence_query or search_query:
+    timer.section("query")
+    if sequence_query:
+        df = search_by_sequence(conn, sequence_query)
+    else:
+        df = search_proteins(conn, search_query)
+    if collapse:
+        df = collapse_redundant(conn, df, identity)
 
     if df.empty:
         st.error("❌ No protein found in the local database. Please contact the administrator.")
     else:
-        protein = df.iloc[0]
+        selected = 0
+        if len(df) > 1 or sequence_query:
+            def describe(i):
+                row = df.iloc[i]
+                label = f"{row['pdb_id']} — {row['protein_name']}"
+                if "alignment_score" in df.columns:
+                    label += f" (score {row['alignment_score']}, {row['coverage']:.0%} of query seeded)"
+                if "cluster_size" in df.columns and row["cluster_size"] > 1:
+                    label += f" [+{row['cluster_size'] - 1} similar]"
+                return label
+            selected = st.selectbox(
+                f"🔎 {len(df)} matching proteins",
+                options=range(len(df)),
+                format_func=describe,
+            )
+
+        timer.section("export")
+        with st.expander("⬇️ Export Results", expanded=False):
+            text_export = None if sequence_query else full_text_query(search_query)
+            st.caption("Exports every full-text match, best first, including near-identical chains."
+                       if text_export else "Exports the sequence search hits listed above.")
+            x1, x2 = st.columns([1, 2])
+            with x1:
+                export_format = st.selectbox("Format", options=list(FORMATS), format_func=lambda f: FORMATS[f][0],
+                                             key="search_export_format", label_visibility="collapsed")
+            with x2:
+                if st.button("📄 Export", use_container_width=True, key="search_export"):
+                    if text_export:
+                        exported = export_query(conn, *text_export, export_format, "search")
+                    else:
+                        exported = export_frame(df, export_format, "sequence-search", column_types(conn))
+                    st.markdown(f'<a href="{exported["url"]}" download="{exported["file_name"]}">'
+                                f'📥 {exported["file_name"]}</a> — {exported["rows"]:,} rows',
+                                unsafe_allow_html=True)
+
+        protein = df.iloc[selected]
         pdb_id = protein["pdb_id"]
-        pdb_lower = pdb_id.lower()
 
         # ================= PROTEIN HEADER CARD =================
+        timer.section("protein header card")
         st.markdown(f"""
         <div class="info-card">
             <h2 style="margin:0; font-size: 2rem;">{protein['protein_name']}</h2>
@@ -117,6 +158,7 @@ if search_query:
         """, unsafe_allow_html=True)
 
         # ================= KEY METRICS =================
+        timer.section("key metrics")
         st.markdown('<div class="section-header">📊 Key Metrics</div>', unsafe_allow_html=True)
 
         col1, col2, col3, col4, col5 = st.columns(5)
@@ -133,43 +175,86 @@ if search_query:
             ligand_status = "✅ Yes" if protein['ligand_present'] == 1 else "❌ No"
             st.metric("💊 Ligand", ligand_status)
 
+        if pd.notna(protein['isoelectric_point']):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("⚡ Isoelectric Point", f"{protein['isoelectric_point']:.2f}")
+            with col2:
+                st.metric("💡 Ext. Coeff. (M⁻¹cm⁻¹)", f"{int(protein['extinction_coefficient']):,}")
+            with col3:
+                st.metric("💧 GRAVY", f"{protein['gravy']:.3f}")
+
+        if pd.notna(protein['radius_of_gyration']):
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("🌀 Radius of Gyration", f"{protein['radius_of_gyration']:.1f} Å")
+            with col2:
+                st.metric("🔗 CA Contacts", f"{int(protein['ca_contacts']):,}")
+            with col3:
+                st.metric("⛓️ Chains", int(protein['chain_count']))
+            with col4:
+                st.metric("📦 Extents (Å)", f"{protein['extent_major']:.0f} × {protein['extent_middle']:.0f} "
+                                            f"× {protein['extent_minor']:.0f}")
+
+        # ================= SEQUENCE ALIGNMENT =================
+        timer.section("sequence alignment")
+        if sequence_query:
+            st.markdown('<div class="section-header">🧬 Alignment to Query</div>', unsafe_allow_html=True)
+            result = align_hit(conn, sequence_query, protein["seq_offset"], protein["seq_length"])
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("🏅 Smith-Waterman Score", result["score"])
+            with col2:
+                st.metric("🎯 Identity", f"{result['identity']:.0%}")
+            with col3:
+                st.metric("📏 Aligned Columns", len(result["midline"]))
+            st.code(format_alignment(result), language=None)
+
         # ================= STRUCTURE VISUALIZATION =================
+        timer.section("structure visualization")
         st.markdown('<div class="section-header">🔬 Protein Structure Visualization</div>', unsafe_allow_html=True)
 
         col_left, col_right = st.columns(2)
 
-        with col_left:
-            st.markdown("### 🎨 Assembly Structure")
-            st.markdown(f"""
+        def image_card(image, alt, caption, missing_text):
+            # Thumbnails and full images are served locally; unavailable ones get a placeholder without a request.
+            if image is None:
+                return f"""
+                <div class="image-container" style="display: flex; align-items: center; justify-content: center; min-height: 300px; background: #f1f5f9;">
+                    <div style="text-align: center; color: #94a3b8;">
+                        <div style="font-size: 4rem; margin-bottom: 1rem;">🖼️</div>
+                        <h3 style="color: #64748b; margin: 0;">{missing_text}</h3>
+                    </div>
+                </div>
+                """
+            return f"""
             <div class="image-container">
-                <img
-                    src="https://cdn.rcsb.org/images/structures/{pdb_lower}_assembly-1.jpeg"
-                    style="width: 100%; border-radius: 8px;"
-                    alt="Assembly Structure"
-                    onerror="this.onerror=null; this.src='https://via.placeholder.com/400x400?text=Image+Not+Available';"
-                />
+                <a href="{image['url']}" target="_blank">
+                    <img
+                        src="{image['thumbnail_url']}"
+                        style="width: 100%; border-radius: 8px;"
+                        alt="{alt}"
+                        loading="lazy"
+                    />
+                </a>
                 <p style="text-align: center; color: #64748b; margin-top: 0.5rem; font-size: 0.9rem;">
-                    Biological Assembly View
+                    {caption}
                 </p>
             </div>
-            """, unsafe_allow_html=True)
+            """
+
+        with col_left:
+            st.markdown("### 🎨 Assembly Structure")
+            st.markdown(image_card(image_cache.get(pdb_id, "assembly"), "Assembly Structure",
+                                   "Biological Assembly View", "Image Not Available"),
+                        unsafe_allow_html=True)
 
         with col_right:
             if protein['ligand_present'] == 1:
                 st.markdown("### 💊 Ligand Structure")
-                st.markdown(f"""
-                <div class="image-container">
-                    <img
-                        src="https://cdn.rcsb.org/images/structures/{pdb_lower}_ligand-1.jpeg"
-                        style="width: 100%; border-radius: 8px;"
-                        alt="Ligand Structure"
-                        onerror="this.onerror=null; this.src='https://via.placeholder.com/400x400?text=Ligand+Image+Not+Available';"
-                    />
-                    <p style="text-align: center; color: #64748b; margin-top: 0.5rem; font-size: 0.9rem;">
-                        Bound Ligand Molecule
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
+                st.markdown(image_card(image_cache.get(pdb_id, "ligand"), "Ligand Structure",
+                                       "Bound Ligand Molecule", "Ligand Image Not Available"),
+                            unsafe_allow_html=True)
             else:
                 st.markdown("### 💊 Ligand Structure")
                 st.markdown(f"""
@@ -182,7 +267,16 @@ if search_query:
                 </div>
                 """, unsafe_allow_html=True)
 
+        # ================= SIMILAR STRUCTURES =================
+        timer.section("similar structures")
+        similar = similar_structures(conn, pdb_id)
+        if similar is not None:
+            st.markdown('<div class="section-header">🔭 Structurally Similar Entries</div>', unsafe_allow_html=True)
+            st.caption("Closest CA distance distributions in the database (Hellinger distance, 0 = same shape).")
+            st.dataframe(similar, use_container_width=True, hide_index=True)
+
         # ================= BIOLOGICAL FUNCTION =================
+        timer.section("biological function")
         st.markdown('<div class="section-header">🧠 Biological Function</div>', unsafe_allow_html=True)
         st.markdown(f"""
         <div class="structure-card">
@@ -193,6 +287,7 @@ if search_query:
         """, unsafe_allow_html=True)
 
         # ================= EXTERNAL LINKS =================
+        timer.section("external links")
         st.markdown('<div class="section-header">🔗 External Resources</div>', unsafe_allow_html=True)
 
         link_col1, link_col2, link_col3 = st.columns(3)
@@ -225,6 +320,7 @@ if search_query:
             """, unsafe_allow_html=True)
 
         # ================= NAVIGATION =================
+        timer.section("navigation")
         st.markdown('<div class="section-header">🧭 Navigation</div>', unsafe_allow_html=True)
 
         nav_col1, nav_col2, nav_col3 = st.columns([1, 2, 1])
@@ -235,6 +331,7 @@ if search_query:
 
 else:
     # ================= EMPTY STATE =================
+    timer.section("empty state")
     st.markdown("""
     <div style="text-align: center; padding: 4rem 2rem; background: linear-gradient(135deg, #667eea22 0%, #764ba222 100%); border-radius: 15px; margin: 2rem 0;">
         <h2 style="color: #475569; margin-bottom: 1rem;">👋 Welcome to Protein Detail Viewer</h2>
@@ -262,9 +359,11 @@ else:
     """, unsafe_allow_html=True)
 
 # ================= FOOTER =================
+timer.section("footer")
 st.markdown("---")
 st.markdown("""
 <div style="text-align: center; color: #94a3b8; font-size: 0.9rem; padding: 1rem;">
     Powered by RCSB PDB & UniProt | Built with Streamlit 🎈
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+timer.finish()
@@ -1,6 +1,14 @@
+import os
+
 import streamlit as st
 import streamlit.components.v1 as components
 
+from protein_db import structure_cache
+from protein_db.instrumentation import page_timer
+
+# Base URL of the Mol* viewer build; point it at a copy under static/ for air-gapped deployments.
+MOLSTAR_URL = os.environ.get("MOLSTAR_URL", "https://cdn.jsdelivr.net/npm/molstar@4/build/viewer").rstrip("/")
+
 # ================= PAGE CONFIG =================
 st.set_page_config(
     page_title="3D Structure Viewer",
@@ -121,10 +129,13 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ================= HEADER =================
+timer = page_timer("3d_structure")
+timer.section("header")
 st.markdown('<h1 class="main-title">🧬 Interactive 3D Structure Viewer</h1>', unsafe_allow_html=True)
-st.markdown('<p class="subtitle">Explore protein structures in stunning 3D using iCn3D</p>', unsafe_allow_html=True)
+st.markdown('<p class="subtitle">Explore protein structures in stunning 3D using Mol*</p>', unsafe_allow_html=True)
 
 # ================= SEARCH SECTION =================
+timer.section("search section")
 col1, col2, col3 = st.columns([1, 3, 1])
 
 with col2:
@@ -148,6 +159,7 @@ with col2:
     """, unsafe_allow_html=True)
 
 # ================= VIEWER SECTION =================
+timer.section("viewer section")
 if pdb_id:
     # Info panel
     st.markdown(f"""
@@ -198,35 +210,88 @@ if pdb_id:
             """)
 
     # 3D Viewer
-    icn3d_url = (
-        "https://www.ncbi.nlm.nih.gov/Structure/icn3d/full.html"
-        f"?pdbid={pdb_id}&bu=1&showanno=1&show2d=1&showsets=1"
-    )
-
-    components.html(
-        f"""
-        <style>
-            body {{
-                margin: 0;
-                padding: 0;
-                overflow: hidden;
-            }}
-            iframe {{
-                border: none;
-                width: 100%;
-                height: 100vh;
-                background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
-            }}
-        </style>
-        <iframe
-            src="{icn3d_url}"
-            allow="fullscreen"
-            loading="lazy"
-        ></iframe>
-        """,
-        height=850,
-        scrolling=False
-    )
+    with st.spinner("📦 Fetching structure file..."):
+        structure = structure_cache.get(pdb_id)
+
+    if structure is not None:
+        # The cached file is gzip-compressed; the browser inflates it and hands Mol* a blob URL.
+        components.html(
+            f"""
+            <link rel="stylesheet" href="{MOLSTAR_URL}/molstar.css" />
+            <script src="{MOLSTAR_URL}/molstar.js"></script>
+            <style>
+                body {{
+                    margin: 0;
+                    padding: 0;
+                    overflow: hidden;
+                }}
+                #viewer {{
+                    position: absolute;
+                    width: 100%;
+                    height: 100vh;
+                    background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
+                }}
+            </style>
+            <div id="viewer"></div>
+            <script>
+                (async () => {{
+                    const viewer = await molstar.Viewer.create("viewer", {{
+                        layoutIsExpanded: false,
+                        layoutShowControls: true,
+                        layoutShowSequence: true,
+                        viewportShowExpand: true,
+                    }});
+                    const response = await fetch("{structure['url']}");
+                    const inflated = response.body.pipeThrough(new DecompressionStream("gzip"));
+                    const blob = await new Response(inflated).blob();
+                    await viewer.loadStructureFromUrl(
+                        URL.createObjectURL(blob), "mmcif", {str(structure['binary']).lower()});
+                }})();
+            </script>
+            """,
+            height=850,
+            scrolling=False
+        )
+        source = (f", {structure['source_size'] / 1e6:.1f} MB uncompressed"
+                  if structure["source_size"] else "")
+        st.caption(f"{'📦 Served from the local structure cache' if structure['from_cache'] else '⬇️ Downloaded and cached'}: "
+                   f"{structure['format'].upper()}, {structure['size'] / 1e6:.1f} MB compressed{source}")
+    elif structure_cache.get_cache().offline:
+        st.warning(f"⚠️ {pdb_id} is not in the local structure cache and offline mode is on.")
+        cached = structure_cache.get_cache().cached_ids()
+        if cached:
+            st.caption("Available offline: " + ", ".join(cached))
+    else:
+        # Not downloadable here (unknown ID or network trouble): let iCn3D fetch it from NCBI instead.
+        icn3d_url = (
+            "https://www.ncbi.nlm.nih.gov/Structure/icn3d/full.html"
+            f"?pdbid={pdb_id}&bu=1&showanno=1&show2d=1&showsets=1"
+        )
+
+        components.html(
+            f"""
+            <style>
+                body {{
+                    margin: 0;
+                    padding: 0;
+                    overflow: hidden;
+                }}
+                iframe {{
+                    border: none;
+                    width: 100%;
+                    height: 100vh;
+                    background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
+                }}
+            </style>
+            <iframe
+                src="{icn3d_url}"
+                allow="fullscreen"
+                loading="lazy"
+            ></iframe>
+            """,
+            height=850,
+            scrolling=False
+        )
 
     # Additional info
     st.markdown("""
@@ -244,6 +309,7 @@ if pdb_id:
 
 else:
     # ================= EMPTY STATE =================
+    timer.section("empty state")
     st.markdown("""
     <div style="text-align: center; padding: 4rem 2rem; background: linear-gradient(135deg, #667eea11 0%, #764ba211 100%); border-radius: 20px; margin: 3rem 0;">
         <div style="font-size: 5rem; margin-bottom: 1rem;">🔬</div>
@@ -283,11 +349,13 @@ else:
     """, unsafe_allow_html=True)
 
 # ================= FOOTER =================
+timer.section("footer")
 st.markdown("---")
 st.markdown("""
 <div style="text-align: center; color: #94a3b8; font-size: 0.9rem; padding: 1rem;">
-    Powered by <a href="https://www.ncbi.nlm.nih.gov/Structure/icn3d/docs/icn3d.html" target="_blank" style="color: #667eea; text-decoration: none;">iCn3D Viewer</a> |
+    Powered by <a href="https://molstar.org/" target="_blank" style="color: #667eea; text-decoration: none;">Mol* Viewer</a> and <a href="https://www.ncbi.nlm.nih.gov/Structure/icn3d/docs/icn3d.html" target="_blank" style="color: #667eea; text-decoration: none;">iCn3D</a> |
     Data from <a href="https://www.rcsb.org/" target="_blank" style="color: #667eea; text-decoration: none;">RCSB PDB</a> |
     Built with Streamlit 🎈
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+timer.finish()
@@ -1,8 +1,39 @@
+import json
+import os
+
 import streamlit as st
-import sqlite3
-import requests
 import pandas as pd
 
+from protein_db import http_client, image_cache, query_cache, response_cache, structure_cache
+from protein_db.bulk_import import RECORD_COLUMNS, import_dumps
+from protein_db.clustering import IDENTITIES, cluster_summary, count_missing_signatures, largest_clusters, recluster
+from protein_db.db import get_connection
+from protein_db.export import FORMATS, count_rows, database_query, export_query, listing_query
+from protein_db.instrumentation import page_timer
+from protein_db.ingest import (
+    DEFAULT_WORKERS,
+    backfill_sequences,
+    count_missing_coordinates,
+    count_missing_sequences,
+    parse_pdb_ids,
+)
+from protein_db.jobs import (
+    KINDS,
+    STATUSES,
+    cancel,
+    clear_finished,
+    enqueue,
+    list_jobs,
+    retry,
+    status_counts,
+)
+from protein_db.kmer_index import index_for
+from protein_db.listing import METHODS, PAGE_SIZES, SORT_COLUMNS, fetch_page
+from protein_db.migrations import applied_versions, pending
+from protein_db.sequence_store import store_for
+from protein_db.shape_index import backfill_shapes, count_missing_shapes, shape_index_for
+from protein_db.stats import check_stats, get_breakdown, get_counters, rebuild_stats
+
 # ================= PAGE CONFIG =================
 st.set_page_config(
     page_title="Admin Panel - Protein DB ",
@@ -123,136 +154,35 @@ if not st.session_state.authenticated:
     st.stop()
 
 # ================= DATABASE =================
-DB_NAME = "protein_structure.db"
-conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+conn = get_connection()
 cursor = conn.cursor()
+timer = page_timer("admin")
 
-# ================= CREATE TABLES =================
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS protein (
-    protein_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    protein_name TEXT,
-    pdb_id TEXT UNIQUE,
-    uniprot_id TEXT,
-    organism TEXT,
-    function TEXT,
-    aa_length INTEGER,
-    molecular_weight REAL
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS protein_structure (
-    structure_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    protein_id INTEGER,
-    method TEXT,
-    resolution REAL,
-    ligand_present INTEGER,
-    FOREIGN KEY (protein_id) REFERENCES protein(protein_id)
-)
-""")
-conn.commit()
-
-# ================= MOLECULAR WEIGHT =================
-aa_weights = {
-    'A': 89.1, 'R': 174.2, 'N': 132.1, 'D': 133.1,
-    'C': 121.2, 'E': 147.1, 'Q': 146.1, 'G': 75.1,
-    'H': 155.2, 'I': 131.2, 'L': 131.2, 'K': 146.2,
-    'M': 149.2, 'F': 165.2, 'P': 115.1, 'S': 105.1,
-    'T': 119.1, 'W': 204.2, 'Y': 181.2, 'V': 117.1
-}
-
-def calculate_molecular_weight(sequence):
-    total = sum(aa_weights.get(aa, 0) for aa in sequence)
-    return round(total / 1000, 2)
-
-# ================= DATA FETCHING =================
-def fetch_rcsb_data(pdb_id):
-    url = f"https://data.rcsb.org/rest/v1/core/entry/{pdb_id}"
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    data = r.json()
-    protein_name = data.get("struct", {}).get("title", "Unknown")
-    method = data.get("exptl", [{}])[0].get("method") if data.get("exptl") else None
-    resolution = data.get("rcsb_entry_info", {}).get("resolution_combined", [None])[0]
-    ligands = data.get("rcsb_entry_container_identifiers", {}).get("nonpolymer_entity_ids", [])
-    ligand_present = 1 if ligands else 0
-    return protein_name, method, resolution, ligand_present, "Unknown"
-
-def get_uniprot_and_organism(pdb_id):
-    url = f"https://data.rcsb.org/rest/v1/core/polymer_entity/{pdb_id}/1"
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None, "Unknown"
-    data = r.json()
-    uniprot_ids = data.get("rcsb_polymer_entity_container_identifiers", {}).get("uniprot_ids", [])
-    uniprot_id = uniprot_ids[0] if uniprot_ids else None
-    organism = "Unknown"
-    src = data.get("rcsb_entity_source_organism", [])
-    if src:
-        organism = src[0].get("scientific_name", "Unknown")
-    return uniprot_id, organism
-
-def fetch_uniprot_data(uniprot_id):
-    url = f"https://rest.uniprot.org/uniprotkb/{uniprot_id}.json"
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None, None
-    data = r.json()
-    sequence = data["sequence"]["value"]
-    function = "No description available"
-    for c in data.get("comments", []):
-        if c.get("commentType") == "FUNCTION":
-            texts = c.get("texts", [])
-            if texts:
-                function = texts[0].get("value", function)
-    return sequence, function
-
-def add_protein(pdb_id):
-    rcsb = fetch_rcsb_data(pdb_id)
-    if rcsb is None:
-        return False, "RCSB data not found"
-    protein_name, method, resolution, ligand_present, organism = rcsb
-    uniprot_id, organism = get_uniprot_and_organism(pdb_id)
-    if uniprot_id is None:
-        return False, "UniProt mapping not found"
-    sequence, function = fetch_uniprot_data(uniprot_id)
-    if sequence is None:
-        return False, "UniProt data not found"
-    aa_length = len(sequence)
-    molecular_weight = calculate_molecular_weight(sequence)
-    cursor.execute("""
-    INSERT OR IGNORE INTO protein
-    (protein_name, pdb_id, uniprot_id, organism, function, aa_length, molecular_weight)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (protein_name, pdb_id, uniprot_id, organism, function, aa_length, molecular_weight))
-    conn.commit()
-    cursor.execute("SELECT protein_id FROM protein WHERE pdb_id = ?", (pdb_id,))
-    row = cursor.fetchone()
-    if row is None:
-        return False, "Protein insert failed"
-    protein_id = row[0]
-    cursor.execute("SELECT structure_id FROM protein_structure WHERE protein_id = ?", (protein_id,))
-    if cursor.fetchone():
-        return True, "Protein already exists"
-    cursor.execute("""
-    INSERT INTO protein_structure (protein_id, method, resolution, ligand_present)
-    VALUES (?, ?, ?, ?)
-    """, (protein_id, method, resolution, ligand_present))
-    conn.commit()
-    return True, "Protein added successfully"
+# ================= DATA INGESTION =================
+# Ingestion, refresh and recompute run as queued jobs on the worker threads
+# of protein_db.jobs, started with the connection pool, so they outlive this
+# script run and the browser tab.
+
+def queue_job(kind, payload=None):
+    job_id = enqueue(conn, kind, payload)
+    st.success(f"✅ Queued job #{job_id} ({KINDS[kind][0]}); follow it under Background Jobs")
 
 def delete_protein(pdb_id):
     try:
-        cursor.execute("SELECT protein_id FROM protein WHERE pdb_id = ?", (pdb_id,))
+        cursor.execute("SELECT protein_id FROM protein WHERE pdb_id = UPPER(?)", (pdb_id,))
         result = cursor.fetchone()
         if result is None:
             return False, f"Protein with PDB ID '{pdb_id}' not found"
         protein_id = result[0]
+        cursor.execute("SELECT seq_offset FROM protein_sequence WHERE protein_id = ?", (protein_id,))
+        sequence_row = cursor.fetchone()
         cursor.execute("DELETE FROM protein_structure WHERE protein_id = ?", (protein_id,))
         cursor.execute("DELETE FROM protein WHERE protein_id = ?", (protein_id,))
         conn.commit()
+        query_cache.bump_generation()
+        if sequence_row is not None:
+            index_for(conn).discard(conn, sequence_row[0])
+        shape_index_for(conn).discard(protein_id)
         return True, f"Successfully deleted protein {pdb_id}"
     except Exception as e:
         conn.rollback()
@@ -264,7 +194,7 @@ def get_protein_data(pdb_id):
            p.aa_length, p.molecular_weight, s.structure_id, s.method, s.resolution, s.ligand_present
     FROM protein p
     JOIN protein_structure s ON p.protein_id = s.protein_id
-    WHERE p.pdb_id = ?
+    WHERE p.pdb_id = UPPER(?)
     """, (pdb_id,))
     return cursor.fetchone()
 
@@ -280,12 +210,14 @@ def update_protein(protein_id, structure_id, protein_name, organism, function,
         WHERE structure_id = ?
         """, (method, resolution, ligand_present, structure_id))
         conn.commit()
+        query_cache.bump_generation()
         return True, "Protein updated successfully"
     except Exception as e:
         conn.rollback()
         return False, f"Error: {str(e)}"
 
 # ================= HEADER =================
+timer.section("header")
 st.markdown("""
 <div class="admin-header">
     <h1 style="margin: 0; font-size: 2.5rem;">🔐 Admin Panel</h1>
@@ -296,18 +228,15 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ================= STATISTICS =================
-cursor.execute("SELECT COUNT(*) FROM protein")
-total_proteins = cursor.fetchone()[0]
-
-cursor.execute("SELECT COUNT(*) FROM protein_structure WHERE ligand_present = 1")
-proteins_with_ligands = cursor.fetchone()[0]
+timer.section("statistics")
+counters = get_counters(conn)
 
 col1, col2, col3 = st.columns(3)
 
 with col1:
     st.markdown(f"""
     <div class="stats-card">
-        <div class="stat-number">{total_proteins}</div>
+        <div class="stat-number">{counters['proteins']}</div>
         <div class="stat-label">Total Proteins</div>
     </div>
     """, unsafe_allow_html=True)
@@ -315,7 +244,7 @@ with col1:
 with col2:
     st.markdown(f"""
     <div class="stats-card">
-        <div class="stat-number">{proteins_with_ligands}</div>
+        <div class="stat-number">{counters['structures_with_ligands']}</div>
         <div class="stat-label">With Ligands</div>
     </div>
     """, unsafe_allow_html=True)
@@ -323,34 +252,305 @@ with col2:
 with col3:
     st.markdown(f"""
     <div class="stats-card">
-        <div class="stat-number">{total_proteins - proteins_with_ligands}</div>
+        <div class="stat-number">{counters['structures_without_ligands']}</div>
         <div class="stat-label">Without Ligands</div>
     </div>
     """, unsafe_allow_html=True)
 
+with st.expander("📈 Breakdown by Method and Organism", expanded=False):
+    b1, b2 = st.columns(2)
+    with b1:
+        st.markdown("**Experimental Method**")
+        st.dataframe(pd.DataFrame(get_breakdown(conn, "method"), columns=["Method", "Structures"]),
+                     use_container_width=True, hide_index=True)
+    with b2:
+        st.markdown("**Top Organisms**")
+        st.dataframe(pd.DataFrame(get_breakdown(conn, "organism"), columns=["Organism", "Proteins"]),
+                     use_container_width=True, hide_index=True)
+    if st.button("🩺 Check & Rebuild Counters", key="check_stats"):
+        mismatches = check_stats(conn)
+        if mismatches:
+            rebuild_stats(conn)
+            st.warning(f"⚠️ Rebuilt counters; {len(mismatches)} value(s) were out of date")
+            st.dataframe(pd.DataFrame(mismatches, columns=["Dimension", "Name", "Stored", "Actual"]),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.success("✅ Counters are consistent")
+
+with st.expander("🧩 Redundancy Clusters", expanded=False):
+    identity = st.selectbox("Sequence identity", IDENTITIES, format_func=lambda x: f"≥ {x:.0%}", key="cluster_identity")
+    with_sequence, distinct, clusters = cluster_summary(conn, identity)
+    missing_signatures = count_missing_signatures(conn)
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Proteins with Sequence", with_sequence)
+    c2.metric("Distinct Sequences", distinct)
+    c3.metric("Non-redundant Clusters", clusters)
+    st.dataframe(pd.DataFrame(largest_clusters(conn, identity),
+                              columns=["Representative", "Protein Name", "Members"]),
+                 use_container_width=True, hide_index=True)
+    if missing_signatures:
+        st.caption(f"{missing_signatures} sequence(s) added since the last clustering")
+    if st.button("🔄 Update Clusters", key="recluster", use_container_width=True):
+        progress = st.progress(0.0)
+        counts = recluster(conn, on_progress=lambda done, total: progress.progress(done / total, text=f"{done} / {total}"))
+        query_cache.bump_generation()
+        st.success("✅ " + ", ".join(f"{n} clusters at ≥ {i:.0%}" for i, n in counts.items()))
+
 st.markdown("<br>", unsafe_allow_html=True)
 
 # ================= ADD PROTEIN =================
+timer.section("add protein")
 st.markdown('<div class="section-card">', unsafe_allow_html=True)
 st.markdown('<div class="section-title">➕ Add New Protein</div>', unsafe_allow_html=True)
 
 pdb_input = st.text_input("Enter PDB ID", placeholder="e.g., 4HHB", key="add_input")
+add_refresh = st.checkbox("♻️ Refresh if already stored", key="add_refresh",
+                          help="Overwrite the stored metadata, sequence and geometry with freshly fetched values")
 
 if st.button("🚀 Add Protein", use_container_width=True, type="primary"):
     if pdb_input:
-        with st.spinner("Fetching data from RCSB and UniProt..."):
-            success, message = add_protein(pdb_input.upper())
-            if success:
-                st.success(f"✅ {message}")
-                st.rerun()
-            else:
-                st.error(f"❌ {message}")
+        queue_job("refresh" if add_refresh else "ingest", {"pdb_ids": [pdb_input.strip().upper()]})
     else:
         st.warning("⚠️ Please enter a PDB ID")
 
 st.markdown('</div>', unsafe_allow_html=True)
 
+# ================= BATCH IMPORT =================
+timer.section("batch import")
+st.markdown('<div class="section-card">', unsafe_allow_html=True)
+st.markdown('<div class="section-title">📦 Batch Import</div>', unsafe_allow_html=True)
+
+batch_text = st.text_area("Paste PDB IDs (separated by spaces, commas or new lines)",
+                          placeholder="4HHB 1MBN 2ZP5", height=100, key="batch_input")
+batch_file = st.file_uploader("...or upload a list of PDB IDs", type=["txt", "csv"], key="batch_file")
+batch_workers = st.slider("Parallel downloads", min_value=1, max_value=32, value=DEFAULT_WORKERS)
+batch_refresh = st.checkbox("♻️ Refresh proteins that are already stored", key="batch_refresh")
+
+if st.button("📥 Import Batch", use_container_width=True, type="primary"):
+    text = batch_text or ""
+    if batch_file is not None:
+        text += "\n" + batch_file.getvalue().decode("utf-8", errors="ignore")
+    pdb_ids, invalid_ids = parse_pdb_ids(text)
+    if invalid_ids:
+        st.warning(f"⚠️ Skipping {len(invalid_ids)} invalid ID(s): {', '.join(invalid_ids[:20])}")
+    if pdb_ids:
+        queue_job("refresh" if batch_refresh else "ingest", {"pdb_ids": pdb_ids, "workers": batch_workers})
+    elif not invalid_ids:
+        st.warning("⚠️ Please enter or upload at least one PDB ID")
+
+# ================= BACKGROUND JOBS =================
+timer.section("background jobs")
+JOB_POLL_SECONDS = 2
+JOB_LIST_LIMIT = 20
+STATUS_ICONS = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌", "cancelled": "🚫"}
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_panel():
+    # Reruns on its own every JOB_POLL_SECONDS, reading progress from the job table.
+    # Buttons act in on_click callbacks, so the rerun they trigger already shows the change.
+    jobs = list_jobs(conn, limit=JOB_LIST_LIMIT)
+    counts = status_counts(conn)
+    st.caption(" · ".join(f"{STATUS_ICONS[status]} {counts.get(status, 0)} {status}" for status in STATUSES))
+    if not jobs:
+        st.caption("No jobs yet")
+        return
+    for job in jobs:
+        job_id, status = job["job_id"], job["status"]
+        title = f"{STATUS_ICONS[status]} **#{job_id} {KINDS[job['kind']][0]}** — {status}"
+        if job["attempts"] > 1 or status == "failed":
+            title += f" (attempt {job['attempts']} of {job['max_attempts']})"
+        info, action = st.columns([5, 1])
+        with info:
+            if status == "running":
+                done, total = job["progress_done"], job["progress_total"]
+                st.progress(min(done / total, 1.0) if total else 0.0,
+                            text=f"{title} · {done:,} / {total:,}" if total else title)
+            else:
+                st.markdown(title)
+            if job["message"]:
+                st.caption(job["message"])
+            if job["error"]:
+                st.caption(f"⚠️ {job['error']}")
+        with action:
+            if status in ("queued", "running"):
+                st.button("Cancel", key=f"cancel_job_{job_id}", use_container_width=True,
+                          disabled=bool(job["cancel_requested"]), on_click=cancel, args=(conn, job_id))
+            elif status in ("failed", "cancelled"):
+                st.button("Retry", key=f"retry_job_{job_id}", use_container_width=True,
+                          on_click=retry, args=(conn, job_id))
+
+    with_failures = {}
+    for job in jobs:
+        failures = json.loads(job["result"]).get("failures") if job["result"] else None
+        if failures:
+            with_failures[job["job_id"]] = failures
+    if with_failures:
+        shown = st.selectbox("Show failed IDs of job", list(with_failures), format_func=lambda i: f"#{i}",
+                             key="job_failures")
+        st.dataframe(pd.DataFrame(with_failures[shown], columns=["ID", "Error"]),
+                     use_container_width=True, hide_index=True)
+    st.button("🧹 Clear Finished Jobs", key="clear_jobs", use_container_width=True,
+              on_click=clear_finished, args=(conn,))
+
+with st.expander("🧾 Background Jobs", expanded=True):
+    st.caption("Jobs are stored in the database and run on background workers; they keep running when this "
+               "tab is closed, and jobs interrupted by a restart are picked up again.")
+    job_panel()
+
+with st.expander("🗃️ Import from Local Dumps", expanded=False):
+    st.caption("Reads RCSB entry and polymer-entity JSON, UniProt JSON (.json or .jsonl, optionally gzipped) "
+               f"or CSV files with columns {', '.join(RECORD_COLUMNS)} from a folder on the server, "
+               "without touching the network. Coordinates can be fetched afterwards under Structure Geometry.")
+    dump_path = st.text_input("Dump file or folder on the server", placeholder="/data/mirror", key="dump_path")
+    if st.button("📂 Import Dumps", use_container_width=True, disabled=not dump_path, key="import_dumps"):
+        if not os.path.exists(dump_path):
+            st.error(f"❌ {dump_path} does not exist")
+        else:
+            progress = st.progress(0.0)
+
+            def report_import(stage, done, total):
+                progress.progress(done / total if total else 0.0,
+                                  text=f"{stage.capitalize()}: {done:,}" + (f" / {total:,}" if total else ""))
+
+            counts = import_dumps(conn, [dump_path], on_progress=report_import)
+            st.success(f"✅ Imported {counts['records']:,} proteins ({counts['added']:,} new) "
+                       f"from {counts['documents']:,} documents")
+            unmatched = counts["missing_uniprot_mapping"] + counts["missing_uniprot_data"] + counts["skipped"]
+            if unmatched:
+                st.warning(f"⚠️ {counts['missing_uniprot_mapping']:,} entries without a UniProt mapping, "
+                           f"{counts['missing_uniprot_data']:,} without UniProt data, "
+                           f"{counts['skipped']:,} unrecognized documents")
+            if counts["unreadable_files"]:
+                st.warning(f"⚠️ {counts['unreadable_files']:,} file(s) could not be read to the end; "
+                           "the documents before the error were imported")
+
+with st.expander("🌐 API Latency", expanded=False):
+    latency = http_client.host_stats()
+    if latency:
+        st.dataframe(pd.DataFrame.from_dict(latency, orient="index"), use_container_width=True)
+    else:
+        st.caption("No API requests made by this server process yet.")
+
+with st.expander("💾 API Response Cache", expanded=False):
+    cache_stats = response_cache.get_cache().stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+    c2.metric("Hits / Misses", f"{cache_stats['hits'] + cache_stats['revalidated']} / {cache_stats['misses']}")
+    c3.metric("Entries", cache_stats["entries"])
+    c4.metric("Stored (MB)", f"{cache_stats['stored_bytes'] / 1e6:.1f} / {cache_stats['max_bytes'] / 1e6:.0f}")
+    st.caption(f"Served {cache_stats['bytes_served'] / 1e6:.1f} MB from cache, "
+               f"fetched {cache_stats['bytes_fetched'] / 1e6:.1f} MB from the network")
+    if st.button("🧹 Clear Response Cache", key="clear_response_cache"):
+        response_cache.get_cache().clear()
+        st.rerun()
+
+with st.expander("🗂️ Structure File Cache", expanded=False):
+    sc_stats = structure_cache.get_cache().stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Hit Rate", f"{sc_stats['hit_rate']:.0%}")
+    c2.metric("Entries", sc_stats["entries"])
+    c3.metric("Stored (MB)", f"{sc_stats['stored_bytes'] / 1e6:.1f} / {sc_stats['max_bytes'] / 1e6:.0f}")
+    c4.metric("Compression", f"{sc_stats['compression_ratio']:.1f}x")
+    st.caption(f"{'🔌 Offline mode: only cached entries are shown. ' if sc_stats['offline'] else ''}"
+               f"Downloaded {sc_stats['downloads']} files ({sc_stats['bytes_downloaded'] / 1e6:.1f} MB), "
+               f"{sc_stats['failures']} failed, {sc_stats['evictions']} evicted")
+    if st.button("🧹 Clear Structure Cache", key="clear_structure_cache"):
+        structure_cache.get_cache().clear()
+        st.rerun()
+
+with st.expander("🖼️ Image Cache", expanded=False):
+    ic_stats = image_cache.get_cache().stats()
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Hit Rate", f"{ic_stats['hit_rate']:.0%}")
+    c2.metric("Images", ic_stats["images"])
+    c3.metric("Known Missing", ic_stats["known_missing"])
+    c4.metric("Stored (MB)", f"{ic_stats['stored_bytes'] / 1e6:.1f} / {ic_stats['max_bytes'] / 1e6:.0f}")
+    st.caption(f"Downloaded {ic_stats['downloads']} images ({ic_stats['bytes_downloaded'] / 1e6:.1f} MB), "
+               f"{ic_stats['failures']} failed, {ic_stats['evictions']} evicted")
+    if st.button("🧹 Clear Image Cache", key="clear_image_cache"):
+        image_cache.get_cache().clear()
+        st.rerun()
+
+with st.expander("⚡ Query Result Cache", expanded=False):
+    qc_stats = query_cache.get_cache().stats()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Hits / Misses", f"{qc_stats['hits']} / {qc_stats['misses']}")
+    c2.metric("Entries", f"{qc_stats['entries']} / {qc_stats['max_entries']}")
+    c3.metric("Memory (MB)", f"{qc_stats['bytes'] / 1e6:.1f} / {qc_stats['max_bytes'] / 1e6:.0f}")
+    st.caption(f"Data generation {qc_stats['generation']}, {qc_stats['evictions']} evictions")
+
+with st.expander("🧬 Sequence Store", expanded=False):
+    sequence_store = store_for(conn)
+    seq_stats = sequence_store.stats(conn)
+    missing_sequences = count_missing_sequences(conn)
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Stored Sequences", seq_stats["entries"])
+    c2.metric("Distinct", seq_stats["distinct_sequences"])
+    c3.metric("File (MB)", f"{seq_stats['file_bytes'] / 1e6:.2f}")
+    c4.metric("Missing", missing_sequences)
+    index_stats = index_for(conn).stats()
+    if index_stats["built"]:
+        st.caption(f"K-mer index: {index_stats['sequences']} sequences, {index_stats['postings']:,} seeds "
+                   f"({index_stats['delta']:,} not yet merged), {index_stats['bytes'] / 1e6:.1f} MB")
+    else:
+        st.caption("K-mer index: built on the first sequence search")
+    b1, b2 = st.columns(2)
+    with b1:
+        if st.button(f"📥 Fetch {missing_sequences} Missing Sequences", disabled=missing_sequences == 0,
+                     use_container_width=True, key="backfill_sequences"):
+            progress = st.progress(0.0)
+            results = backfill_sequences(
+                conn, on_result=lambda done, total, *_: progress.progress(done / total, text=f"{done} / {total}"))
+            failed = sum(1 for _, success, _ in results if not success)
+            st.success(f"✅ Stored {len(results) - failed} sequences" + (f", {failed} failed" if failed else ""))
+    with b2:
+        if st.button(f"🗜️ Compact ({seq_stats['garbage_bytes'] / 1e6:.2f} MB unused)",
+                     disabled=seq_stats["garbage_bytes"] == 0, use_container_width=True, key="compact_sequences"):
+            sequence_store.compact(conn)
+            index_for(conn).invalidate()
+            # Cached result frames carry seq_offset values from before the rewrite.
+            query_cache.bump_generation()
+            st.rerun()
+
+with st.expander("⚗️ Physicochemical Properties", expanded=False):
+    st.caption("Recomputes length, molecular weight, pI, extinction coefficient, GRAVY and composition "
+               "from the stored sequences, committing a chunk of proteins at a time.")
+    if st.button(f"🔁 Recompute Properties for {seq_stats['entries']} Proteins",
+                 disabled=seq_stats["entries"] == 0, use_container_width=True, key="recompute_properties"):
+        queue_job("recompute")
+
+with st.expander("📐 Structure Geometry", expanded=False):
+    st.caption("Coordinates are parsed from each entry's mmCIF file at ingest time and stored as compact "
+               "arrays; radius of gyration, CA contacts, chain count and extents are derived from them.")
+    missing_coordinates = count_missing_coordinates(conn)
+    if st.button(f"📥 Fetch Coordinates for {missing_coordinates} Structures", disabled=missing_coordinates == 0,
+                 use_container_width=True, key="backfill_coordinates"):
+        queue_job("coordinates")
+    shape_stats = shape_index_for(conn).stats()
+    missing_shapes = count_missing_shapes(conn)
+    st.caption(f"Shape index: {shape_stats['structures']} structures loaded, "
+               f"{shape_stats['bytes'] / 1e6:.1f} MB" if shape_stats["built"]
+               else "Shape index: loaded on the first similar-structure search")
+    if st.button(f"🔭 Compute Shape Descriptors for {missing_shapes} Structures", disabled=missing_shapes == 0,
+                 use_container_width=True, key="backfill_shapes"):
+        progress = st.progress(0.0)
+        stored = backfill_shapes(
+            conn, on_progress=lambda done, total: progress.progress(done / total, text=f"{done} / {total}"))
+        st.success(f"✅ Stored {stored} shape descriptors")
+
+with st.expander("🧱 Schema Version", expanded=False):
+    schema_versions = applied_versions(conn)
+    st.caption(f"Schema version {max(schema_versions, default=0)}, "
+               f"{len(pending(conn))} pending migration(s)")
+    st.dataframe(pd.DataFrame([(version, name, applied_at) for version, (name, applied_at)
+                               in sorted(schema_versions.items())],
+                              columns=["Version", "Migration", "Applied"]),
+                 use_container_width=True, hide_index=True)
+
+st.markdown('</div>', unsafe_allow_html=True)
+
 # ================= DELETE PROTEIN =================
+timer.section("delete protein")
 st.markdown('<div class="section-card">', unsafe_allow_html=True)
 st.markdown('<div class="section-title">🗑️ Delete Protein</div>', unsafe_allow_html=True)
 
@@ -370,6 +570,7 @@ if st.button("🔥 Delete Protein", use_container_width=True, type="secondary"):
 st.markdown('</div>', unsafe_allow_html=True)
 
 # ================= UPDATE PROTEIN =================
+timer.section("update protein")
 st.markdown('<div class="section-card">', unsafe_allow_html=True)
 st.markdown('<div class="section-title">✏️ Update Protein Information</div>', unsafe_allow_html=True)
 
@@ -422,27 +623,107 @@ if "protein_data" in st.session_state:
 st.markdown('</div>', unsafe_allow_html=True)
 
 # ================= STORED PROTEINS TABLE =================
+timer.section("stored proteins table")
 st.markdown('<div class="section-card">', unsafe_allow_html=True)
 st.markdown('<div class="section-title">📊 Stored Proteins Database</div>', unsafe_allow_html=True)
 
-query = """
-SELECT p.protein_name, p.pdb_id, p.uniprot_id, p.organism, p.aa_length,
-       p.molecular_weight, s.method, s.resolution, s.ligand_present
-FROM protein p
-JOIN protein_structure s ON p.protein_id = s.protein_id
-"""
-
-df = pd.read_sql_query(query, conn)
+f1, f2, f3 = st.columns([2, 1, 1])
+with f1:
+    list_text = st.text_input("Filter by name, function or organism", key="list_text")
+with f2:
+    list_method = st.selectbox("Method", options=["All"] + METHODS, key="list_method")
+with f3:
+    list_ligand = st.selectbox("Ligand", options=["All", "Yes", "No"], key="list_ligand")
+
+s1, s2, s3 = st.columns([2, 1, 1])
+with s1:
+    list_sort = st.selectbox("Sort by", options=list(SORT_COLUMNS),
+                             format_func=lambda key: SORT_COLUMNS[key][0], key="list_sort")
+with s2:
+    list_descending = st.selectbox("Order", options=[False, True],
+                                   format_func=lambda d: "Descending" if d else "Ascending", key="list_order")
+with s3:
+    list_page_size = st.selectbox("Rows per page", options=PAGE_SIZES, index=1, key="list_page_size")
+
+# Cursor stack for the pages visited so far; any change to the view starts over.
+list_view = (list_text, list_method, list_ligand, list_sort, list_descending, list_page_size)
+if st.session_state.get("list_view") != list_view:
+    st.session_state.list_view = list_view
+    st.session_state.list_cursors = [None]
+
+df, next_cursor = fetch_page(
+    conn,
+    sort=list_sort,
+    descending=list_descending,
+    after=st.session_state.list_cursors[-1],
+    page_size=list_page_size,
+    text=list_text.strip() or None,
+    method=None if list_method == "All" else list_method,
+    ligand=None if list_ligand == "All" else list_ligand == "Yes",
+)
 
 if not df.empty:
-    st.dataframe(df, use_container_width=True, height=400)
+    st.dataframe(df, use_container_width=True, height=400, hide_index=True)
+    p1, p2, p3 = st.columns([1, 2, 1])
+    with p1:
+        if st.button("⬅️ Previous", disabled=len(st.session_state.list_cursors) == 1,
+                     use_container_width=True, key="list_prev"):
+            st.session_state.list_cursors.pop()
+            st.rerun()
+    with p2:
+        st.markdown(f"<p style='text-align: center;'>Page {len(st.session_state.list_cursors)}</p>",
+                    unsafe_allow_html=True)
+    with p3:
+        if st.button("Next ➡️", disabled=next_cursor is None, use_container_width=True, key="list_next"):
+            st.session_state.list_cursors.append(next_cursor)
+            st.rerun()
+elif len(st.session_state.list_cursors) > 1 or list_view[:3] != ("", "All", "All"):
+    st.info("🔎 No proteins match these filters.")
 else:
     st.info("📭 No proteins in database yet. Add some above!")
 
+with st.expander("⬇️ Export", expanded=False):
+    st.caption("Rows are read and written in chunks, so exports of any size use little memory. "
+               "Files over 200 MB cannot be served here; use `python -m protein_db.export` for those.")
+    e1, e2, e3 = st.columns([1, 2, 2])
+    with e1:
+        export_format = st.selectbox("Format", options=list(FORMATS), format_func=lambda f: FORMATS[f][0],
+                                     key="export_format", label_visibility="collapsed")
+    export_request = None
+    with e2:
+        if st.button("📄 Export This View", use_container_width=True, key="export_view"):
+            export_request = ("proteins-view", listing_query(
+                list_sort, list_descending, list_text.strip() or None,
+                None if list_method == "All" else list_method,
+                None if list_ligand == "All" else list_ligand == "Yes"))
+    with e3:
+        if st.button("🗄️ Export Whole Database", use_container_width=True, key="export_database"):
+            export_request = ("proteins", database_query())
+    if export_request is not None:
+        export_name, (export_sql, export_params) = export_request
+        export_total = count_rows(conn, export_sql, export_params)
+        progress = st.progress(0.0)
+        exported = export_query(
+            conn, export_sql, export_params, export_format, export_name,
+            on_progress=lambda rows: progress.progress(rows / max(export_total, 1),
+                                                       text=f"{rows:,} / {export_total:,} rows"))
+        st.session_state.last_export = exported
+    exported = st.session_state.get("last_export")
+    if exported is not None:
+        if exported["servable"]:
+            st.markdown(f'<a href="{exported["url"]}" download="{exported["file_name"]}">'
+                        f'📥 {exported["file_name"]}</a> — {exported["rows"]:,} rows, '
+                        f'{exported["size"] / 1e6:.1f} MB', unsafe_allow_html=True)
+        else:
+            st.warning(f"⚠️ {exported['file_name']} is {exported['size'] / 1e6:.0f} MB, too large to serve; "
+                       f"it is in static/exports on the server.")
+
 st.markdown('</div>', unsafe_allow_html=True)
 
 # ================= LOGOUT =================
+timer.section("logout")
 st.markdown("<br>", unsafe_allow_html=True)
 if st.button("🚪 Logout", use_container_width=True):
     st.session_state.authenticated = False
-    st.rerun()
\ No newline at end of file
+    st.rerun()
+timer.finish()
@@ -0,0 +1,93 @@
+import sqlite3
+import time
+
+import streamlit as st
+import pandas as pd
+
+from protein_db import instrumentation
+from protein_db.db import get_connection
+from protein_db.instrumentation import format_plan, get_registry, query_plan, render_prometheus, write_prometheus
+
+# ================= PAGE CONFIG =================
+st.set_page_config(
+    page_title="Diagnostics - Protein DB",
+    layout="wide",
+    page_icon="⏱️"
+)
+
+# ================= ADMIN GATE =================
+# Statement texts and parameters are shown here, so the page follows the admin login.
+if not st.session_state.get("authenticated"):
+    st.warning("🔐 Sign in on the Admin page to see diagnostics.")
+    st.stop()
+
+# ================= DATABASE =================
+conn = get_connection()
+registry = get_registry()
+
+# ================= HEADER =================
+st.title("⏱️ Diagnostics")
+enabled = st.toggle("Collect timings", value=instrumentation.enabled(),
+                    help="Applies to every session of this server process until it restarts; "
+                         "METRICS_ENABLED=1 switches it on at startup.")
+if enabled != instrumentation.enabled():
+    instrumentation.set_enabled(enabled)
+st.caption(f"Percentiles over the last {instrumentation.WINDOW} samples of each series; counts and totals since "
+           f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(registry.started_at))}. "
+           f"Prometheus file: `{instrumentation.EXPORT_PATH}`, rewritten every "
+           f"{instrumentation.EXPORT_SECONDS:g} s while samples arrive.")
+
+# ================= TIMINGS =================
+COLUMNS = {"count": st.column_config.NumberColumn("Count", format="%d")}
+COLUMNS.update({c: st.column_config.NumberColumn(c.replace("_ms", " (ms)"), format="%.2f")
+                for c in ("total_ms", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")})
+
+def show_series(kind, label):
+    rows = registry.snapshot(kind)
+    if not rows:
+        st.info(f"No {label} recorded yet." if enabled else "Timings are off; switch them on above.")
+        return rows
+    df = pd.DataFrame(rows).drop(columns="kind")
+    st.dataframe(df, use_container_width=True, hide_index=True,
+                 column_config={"name": st.column_config.TextColumn(label.capitalize(), width="large"), **COLUMNS})
+    return rows
+
+tab_sql, tab_http, tab_sections = st.tabs(["🗄️ SQL", "🌐 Outbound API", "📄 Page Sections"])
+
+with tab_sql:
+    statements = show_series("sql", "statements")
+    if statements:
+        # ---------- query plan ----------
+        name = st.selectbox("Query plan for", [row["name"] for row in statements], key="plan_statement")
+        example = registry.example("sql", name)
+        if example is not None and st.button("🧭 Explain", key="plan_explain"):
+            sql, params = example
+            st.code(sql.strip(), language="sql")
+            try:
+                st.code(format_plan(query_plan(conn, sql, params)) or "(no plan)", language=None)
+            except sqlite3.Error as e:
+                st.error(f"❌ Could not explain this statement: {e}")
+
+with tab_http:
+    show_series("http", "endpoints")
+
+with tab_sections:
+    show_series("section", "sections")
+
+# ================= EXPORT =================
+st.markdown("---")
+col1, col2, col3 = st.columns(3)
+with col1:
+    if st.button("💾 Write Prometheus File Now", use_container_width=True, key="metrics_write"):
+        try:
+            write_prometheus(instrumentation.EXPORT_PATH)
+            st.success(f"✅ Wrote {instrumentation.EXPORT_PATH}")
+        except OSError as e:
+            st.error(f"❌ {e}")
+with col2:
+    st.download_button("📥 Download Metrics", render_prometheus(), file_name="protein_db.prom",
+                       mime="text/plain", use_container_width=True, key="metrics_download")
+with col3:
+    if st.button("🧹 Reset Timings", use_container_width=True, key="metrics_reset"):
+        registry.reset()
+        st.rerun()
@@ -0,0 +1,287 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from protein_db.sequence_store import sequence_digest
+
+# ================= SCORING =================
+# Local alignment (Smith-Waterman) with affine gaps (Gotoh). A gap of
+# length k costs GAP_OPEN + k * GAP_EXTEND, the BLASTP defaults.
+GAP_OPEN = 11
+GAP_EXTEND = 1
+
+BLOSUM62_ALPHABET = "ARNDCQEGHILKMFPSTWYVBZX*"
+BLOSUM62 = np.array([
+    [4, -1, -2, -2, 0, -1, -1, 0, -2, -1, -1, -1, -1, -2, -1, 1, 0, -3, -2, 0, -2, -1, 0, -4],
+    [-1, 5, 0, -2, -3, 1, 0, -2, 0, -3, -2, 2, -1, -3, -2, -1, -1, -3, -2, -3, -1, 0, -1, -4],
+    [-2, 0, 6, 1, -3, 0, 0, 0, 1, -3, -3, 0, -2, -3, -2, 1, 0, -4, -2, -3, 3, 0, -1, -4],
+    [-2, -2, 1, 6, -3, 0, 2, -1, -1, -3, -4, -1, -3, -3, -1, 0, -1, -4, -3, -3, 4, 1, -1, -4],
+    [0, -3, -3, -3, 9, -3, -4, -3, -3, -1, -1, -3, -1, -2, -3, -1, -1, -2, -2, -1, -3, -3, -2, -4],
+    [-1, 1, 0, 0, -3, 5, 2, -2, 0, -3, -2, 1, 0, -3, -1, 0, -1, -2, -1, -2, 0, 3, -1, -4],
+    [-1, 0, 0, 2, -4, 2, 5, -2, 0, -3, -3, 1, -2, -3, -1, 0, -1, -3, -2, -2, 1, 4, -1, -4],
+    [0, -2, 0, -1, -3, -2, -2, 6, -2, -4, -4, -2, -3, -3, -2, 0, -2, -2, -3, -3, -1, -2, -1, -4],
+    [-2, 0, 1, -1, -3, 0, 0, -2, 8, -3, -3, -1, -2, -1, -2, -1, -2, -2, 2, -3, 0, 0, -1, -4],
+    [-1, -3, -3, -3, -1, -3, -3, -4, -3, 4, 2, -3, 1, 0, -3, -2, -1, -3, -1, 3, -3, -3, -1, -4],
+    [-1, -2, -3, -4, -1, -2, -3, -4, -3, 2, 4, -2, 2, 0, -3, -2, -1, -2, -1, 1, -4, -3, -1, -4],
+    [-1, 2, 0, -1, -3, 1, 1, -2, -1, -3, -2, 5, -1, -3, -1, 0, -1, -3, -2, -2, 0, 1, -1, -4],
+    [-1, -1, -2, -3, -1, 0, -2, -3, -2, 1, 2, -1, 5, 0, -2, -1, -1, -1, -1, 1, -3, -1, -1, -4],
+    [-2, -3, -3, -3, -2, -3, -3, -3, -1, 0, 0, -3, 0, 6, -4, -2, -2, 1, 3, -1, -3, -3, -1, -4],
+    [-1, -2, -2, -1, -3, -1, -1, -2, -2, -3, -3, -1, -2, -4, 7, -1, -1, -4, -3, -2, -2, -1, -2, -4],
+    [1, -1, 1, 0, -1, 0, 0, 0, -1, -2, -2, 0, -1, -2, -1, 4, 1, -3, -2, -2, 0, 0, 0, -4],
+    [0, -1, 0, -1, -1, -1, -1, -2, -2, -1, -1, -1, -1, -2, -1, 1, 5, -2, -2, 0, -1, -1, 0, -4],
+    [-3, -3, -4, -4, -2, -2, -3, -2, -2, -3, -2, -3, -1, 1, -4, -3, -2, 11, 2, -3, -4, -3, -2, -4],
+    [-2, -2, -2, -3, -2, -1, -2, -3, 2, -1, -1, -2, -1, 3, -3, -2, -2, 2, 7, -1, -3, -2, -1, -4],
+    [0, -3, -3, -3, -1, -2, -2, -3, -3, 3, 1, -2, 1, -1, -2, -2, 0, -3, -1, 4, -3, -2, -1, -4],
+    [-2, -1, 3, 4, -3, 0, 1, -1, 0, -3, -4, 0, -3, -3, -2, 0, -1, -4, -3, -3, 4, 1, -1, -4],
+    [-1, 0, 0, 1, -3, 3, 4, -2, 0, -3, -3, 1, -1, -3, -1, 0, -1, -3, -2, -2, 1, 4, -1, -4],
+    [0, -1, -1, -1, -2, -1, -1, -1, -1, -1, -1, -1, -1, -1, -2, 0, 0, -2, -1, -1, -1, -1, -1, -4],
+    [-4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, -4, 1],
+], dtype=np.int32)
+
+# Column PAD pads short targets in a batch; it scores far below any match,
+# so no alignment runs through it.
+PAD = len(BLOSUM62_ALPHABET)
+_SCORES = np.full((PAD + 1, PAD + 1), -1000, dtype=np.int32)
+_SCORES[:PAD, :PAD] = BLOSUM62
+_NEG = -(1 << 28)
+
+_CODE = np.full(256, BLOSUM62_ALPHABET.index("X"), dtype=np.int64)
+for _i, _residue in enumerate(BLOSUM62_ALPHABET):
+    _CODE[ord(_residue)] = _i
+    _CODE[ord(_residue.lower())] = _i
+
+def encode(sequence):
+    """BLOSUM62 indices for a str / bytes / memoryview sequence; unknown letters score as X."""
+    data = sequence.encode("ascii") if isinstance(sequence, str) else sequence
+    return _CODE[np.frombuffer(data, dtype=np.uint8)]
+
+# ================= VECTORIZED ROWS =================
+# The DP runs one query residue (row) at a time, vectorized over every
+# target column and, in score_batch, over every target at once. Diagonal
+# moves (H) and vertical gaps (F) only depend on the previous row. The
+# horizontal gap E along a row is a running maximum:
+#   E[j] = max over k < j of Hp[k] - open - extend * (j - k)
+# where Hp is H before E is applied, so it is one maximum.accumulate.
+def _row(h_prev, f_prev, scores, offsets, gap_first, gap_extend):
+    f = np.maximum(h_prev[..., 1:] - gap_first, f_prev - gap_extend)
+    hp = np.maximum(np.maximum(h_prev[..., :-1] + scores, f), 0)
+    running = np.maximum.accumulate(hp + offsets, axis=-1)
+    e = np.full_like(hp, _NEG)
+    e[..., 1:] = running[..., :-1] - offsets[1:] - gap_first + gap_extend
+    return np.maximum(hp, e), hp, e, f
+
+def score_batch(query, targets, gap_open=GAP_OPEN, gap_extend=GAP_EXTEND):
+    """Best local alignment score of query against each target, as an int array.
+
+    All targets are padded into one (n, max_len) matrix and the query is
+    walked once, so the per-row NumPy overhead is shared by the batch.
+    Also returns, per target, the 1-based (query_end, target_end) of the best cell.
+    """
+    q = encode(query)
+    if len(targets) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, 2), dtype=np.int64)
+    codes = [encode(t) for t in targets]
+    width = max(1, max(len(c) for c in codes))
+    matrix = np.full((len(codes), width), PAD, dtype=np.int64)
+    for row, c in enumerate(codes):
+        matrix[row, :len(c)] = c
+    gap_first = gap_open + gap_extend
+    offsets = gap_extend * np.arange(width, dtype=np.int32)
+    h = np.zeros((len(codes), width + 1), dtype=np.int32)
+    f = np.full((len(codes), width), _NEG, dtype=np.int32)
+    best = np.zeros(len(codes), dtype=np.int32)
+    ends = np.zeros((len(codes), 2), dtype=np.int64)
+    for i, residue in enumerate(q):
+        row, _, _, f = _row(h, f, _SCORES[residue][matrix], offsets, gap_first, gap_extend)
+        h[:, 1:] = row
+        row_best = row.max(axis=1)
+        better = row_best > best
+        if better.any():
+            best = np.where(better, row_best, best)
+            ends[better, 0] = i + 1
+            ends[better, 1] = row[better].argmax(axis=1) + 1
+    return best.astype(np.int64), ends
+
+# ================= SINGLE PAIR WITH TRACEBACK =================
+def _align_pair(query, target, gap_open, gap_extend):
+    q, t = encode(query), encode(target)
+    gap_first = gap_open + gap_extend
+    offsets = gap_extend * np.arange(len(t), dtype=np.int32)
+    m, n = len(q), len(t)
+    H = np.zeros((m + 1, n + 1), dtype=np.int32)
+    Hp = np.zeros((m + 1, n + 1), dtype=np.int32)
+    E = np.full((m + 1, n + 1), _NEG, dtype=np.int32)
+    F = np.full((m + 1, n + 1), _NEG, dtype=np.int32)
+    for i in range(1, m + 1):
+        H[i, 1:], Hp[i, 1:], E[i, 1:], F[i, 1:] = _row(H[i - 1], F[i - 1, 1:], _SCORES[q[i - 1]][t],
+                                                       offsets, gap_first, gap_extend)
+    i, j = np.unravel_index(int(H.argmax()), H.shape)
+    score, q_end, t_end = int(H[i, j]), int(i), int(j)
+    top, bottom = [], []
+    # States: "H" best cell, "P" cell without a horizontal gap (Hp), "E"/"F" in a gap.
+    state = "H"
+    while i > 0 and j > 0:
+        if state == "H":
+            state = "E" if H[i, j] != Hp[i, j] else "P"
+        elif state == "P":
+            if Hp[i, j] == 0:
+                break
+            if Hp[i, j] == H[i - 1, j - 1] + _SCORES[q[i - 1], t[j - 1]]:
+                top.append(query[i - 1])
+                bottom.append(target[j - 1])
+                i, j = i - 1, j - 1
+                state = "H"
+            else:
+                state = "F"
+        elif state == "E":
+            top.append("-")
+            bottom.append(target[j - 1])
+            state = "E" if j > 1 and E[i, j] == E[i, j - 1] - gap_extend else "P"
+            j -= 1
+        else:
+            top.append(query[i - 1])
+            bottom.append("-")
+            state = "F" if i > 1 and F[i, j] == F[i - 1, j] - gap_extend else "H"
+            i -= 1
+    top.reverse()
+    bottom.reverse()
+    return score, int(i) + 1, q_end, int(j) + 1, t_end, "".join(top), "".join(bottom)
+
+def align(query, target, gap_open=GAP_OPEN, gap_extend=GAP_EXTEND):
+    """Best local alignment of two sequences, cached by sequence pair.
+
+    Returns a dict with score, 1-based inclusive query/target start and
+    end, the gapped aligned_query / aligned_target strings, a midline
+    ("|" identity, "+" positive substitution) and identity over the
+    aligned columns.
+    """
+    query, target = query.upper(), target.upper()
+    key = ("align", sequence_digest(query.encode()), sequence_digest(target.encode()), gap_open, gap_extend)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    score, q_start, q_end, t_start, t_end, top, bottom = _align_pair(query, target, gap_open, gap_extend)
+    midline = "".join(
+        "|" if a == b else "+" if a != "-" and b != "-" and _SCORES[_CODE[ord(a)], _CODE[ord(b)]] > 0 else " "
+        for a, b in zip(top, bottom)
+    )
+    result = {
+        "score": score,
+        "query_start": q_start, "query_end": q_end,
+        "target_start": t_start, "target_end": t_end,
+        "aligned_query": top, "aligned_target": bottom, "midline": midline,
+        "identity": round(midline.count("|") / len(midline), 3) if midline else 0.0,
+    }
+    _cache.put(key, result)
+    return result
+
+# ================= BATCH API =================
+WORKERS = int(os.environ.get("ALIGN_WORKERS", os.cpu_count() or 1))
+# Below this many target residues a batch is scored in-process; shipping it
+# to worker processes would cost more than it saves.
+POOL_MIN_RESIDUES = int(os.environ.get("ALIGN_POOL_MIN_RESIDUES", 200000))
+CHUNK_RESIDUES = 100000
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS)
+        return _pool
+
+def _score_chunk(query, targets, gap_open, gap_extend):
+    return score_batch(query, targets, gap_open, gap_extend)[0].tolist()
+
+def _chunks(targets):
+    # Similar lengths share a chunk so little of each padded matrix is wasted.
+    order = sorted(range(len(targets)), key=lambda k: len(targets[k]))
+    chunk, size = [], 0
+    for k in order:
+        chunk.append(k)
+        size += len(targets[k])
+        if size >= CHUNK_RESIDUES:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+def align_many(query, targets, gap_open=GAP_OPEN, gap_extend=GAP_EXTEND, workers=None):
+    """Smith-Waterman scores of one query against many targets, in target order.
+
+    Scores are cached by (query, target) digest; uncached targets are
+    scored in length-sorted batches, spread over a process pool when the
+    batch is large enough to be worth it.
+    """
+    query = query.upper()
+    targets = [t.tobytes().decode("ascii") if isinstance(t, memoryview) else t for t in targets]
+    query_digest = sequence_digest(query.encode())
+    keys = [("score", query_digest, sequence_digest(t.upper().encode()), gap_open, gap_extend) for t in targets]
+    scores = [_cache.get(key) for key in keys]
+    todo = [k for k, score in enumerate(scores) if score is None]
+    missing = [targets[k] for k in todo]
+    workers = WORKERS if workers is None else workers
+    chunks = list(_chunks(missing))
+    if workers > 1 and len(chunks) > 1 and sum(len(t) for t in missing) >= POOL_MIN_RESIDUES:
+        pool = _get_pool()
+        futures = [pool.submit(_score_chunk, query, [missing[k] for k in chunk], gap_open, gap_extend)
+                   for chunk in chunks]
+        results = [future.result() for future in futures]
+    else:
+        results = [_score_chunk(query, [missing[k] for k in chunk], gap_open, gap_extend) for chunk in chunks]
+    for chunk, chunk_scores in zip(chunks, results):
+        for k, score in zip(chunk, chunk_scores):
+            scores[todo[k]] = score
+            _cache.put(keys[todo[k]], score)
+    return scores
+
+# ================= RESULT CACHE =================
+CACHE_MAX_ENTRIES = int(os.environ.get("ALIGNMENT_CACHE_MAX_ENTRIES", 100000))
+
+class AlignmentCache:
+    """LRU of alignment results keyed by sequence-pair digest.
+
+    Results depend only on the two sequences and the scoring parameters,
+    so entries never go stale and no invalidation is needed.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), max_entries=self.max_entries)
+
+_cache = AlignmentCache()
+
+def get_cache():
+    return _cache
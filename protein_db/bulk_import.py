@@ -0,0 +1,303 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import zlib
+
+from protein_db.fetchers import parse_polymer_entity, parse_rcsb_entry, parse_uniprot_entry
+from protein_db.kmer_index import index_for
+from protein_db.properties import property_rows
+from protein_db.query_cache import bump_generation
+from protein_db.sequence_store import store_for
+
+# ================= SETTINGS =================
+# Rows per executemany() call, and rows per transaction; each commit makes
+# the imported proteins visible to the app.
+BATCH_SIZE = int(os.environ.get("BULK_IMPORT_BATCH_SIZE", 5000))
+COMMIT_ROWS = int(os.environ.get("BULK_IMPORT_COMMIT_ROWS", 50000))
+SUFFIXES = (".json", ".jsonl", ".ndjson", ".csv")
+# CSV dumps hold already-flattened records with these columns.
+RECORD_COLUMNS = ("pdb_id", "protein_name", "uniprot_id", "organism", "function",
+                  "method", "resolution", "ligand_present", "sequence")
+
+# ================= READING DUMPS =================
+def _open(path):
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+def _kind(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    return os.path.splitext(name)[1]
+
+def dump_files(paths):
+    """Every readable dump file under the given files and directories, in a stable order."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if _kind(name) in SUFFIXES:
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+# A truncated or corrupt gzip stream, bad UTF-8, or an I/O error part way through a file.
+READ_ERRORS = (OSError, EOFError, zlib.error, UnicodeDecodeError, csv.Error)
+# Yielded by iter_documents() in place of the rest of a file it cannot read.
+UNREADABLE = object()
+
+def iter_documents(path):
+    """Yield the JSON documents (or CSV row dicts) in one dump file, one at a time.
+
+    A JSON Lines line, or a whole .json file, that is not valid JSON yields
+    None in its place, so one bad line does not end the import. A file that
+    cannot be read to the end yields UNREADABLE after the documents read
+    before the error, and the import goes on with the next file.
+    """
+    kind = _kind(path)
+    try:
+        with _open(path) as f:
+            if kind == ".json":
+                try:
+                    data = json.load(f)
+                except ValueError:
+                    data = None
+                yield from data if isinstance(data, list) else [data]
+            elif kind == ".csv":
+                yield from csv.DictReader(f)
+            else:
+                for line in f:
+                    if line.strip():
+                        try:
+                            document = json.loads(line)
+                        except ValueError:
+                            document = None
+                        yield document
+    except READ_ERRORS:
+        yield UNREADABLE
+
+def classify(document):
+    """"entry", "entity", "uniprot" or "record" (a flattened CSV row); None for anything else."""
+    if not isinstance(document, dict):
+        return None
+    if "primaryAccession" in document and "sequence" in document:
+        return "uniprot"
+    if "rcsb_polymer_entity_container_identifiers" in document:
+        return "entity"
+    if "rcsb_entry_container_identifiers" in document or "exptl" in document:
+        return "entry"
+    if document.get("pdb_id") and document.get("sequence"):
+        return "record"
+    return None
+
+# ================= STAGING =================
+# Documents of one kind rarely arrive next to the documents they join with,
+# so they are parsed into a scratch database first and joined there with
+# SQL. Only one batch of parsed rows is ever held in memory.
+STAGING_SCHEMA = """
+CREATE TABLE entry (pdb_id TEXT PRIMARY KEY, protein_name TEXT, method TEXT, resolution REAL,
+                    ligand_present INTEGER);
+CREATE TABLE entity (pdb_id TEXT PRIMARY KEY, uniprot_id TEXT, organism TEXT);
+CREATE TABLE uniprot (uniprot_id TEXT PRIMARY KEY, sequence TEXT, function TEXT);
+CREATE TABLE record (pdb_id TEXT PRIMARY KEY, protein_name TEXT, uniprot_id TEXT, organism TEXT,
+                     function TEXT, method TEXT, resolution REAL, ligand_present INTEGER, sequence TEXT);
+"""
+
+STAGING_INSERTS = {
+    "entry": "INSERT OR REPLACE INTO entry VALUES (?, ?, ?, ?, ?)",
+    "entity": "INSERT OR REPLACE INTO entity VALUES (?, ?, ?)",
+    "uniprot": "INSERT OR REPLACE INTO uniprot VALUES (?, ?, ?)",
+    "record": "INSERT OR REPLACE INTO record VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+def _blank(value):
+    return None if value in ("", None) else value
+
+def staging_row(kind, document):
+    """The staging-table row for one classified document, or None if it cannot be used."""
+    if kind == "entry":
+        pdb_id = document.get("rcsb_id") or document.get("entry", {}).get("id")
+        if not pdb_id:
+            return None
+        protein_name, method, resolution, ligand_present, _ = parse_rcsb_entry(document)
+        return pdb_id.upper(), protein_name, method, resolution, ligand_present
+    if kind == "entity":
+        ids = document["rcsb_polymer_entity_container_identifiers"]
+        # Like get_uniprot_and_organism(), only the first polymer entity counts.
+        if not ids.get("entry_id") or str(ids.get("entity_id", "1")) != "1":
+            return None
+        return (ids["entry_id"].upper(), *parse_polymer_entity(document))
+    if kind == "uniprot":
+        return (document["primaryAccession"], *parse_uniprot_entry(document))
+    return (document["pdb_id"].strip().upper(), *(_blank(document.get(c)) for c in RECORD_COLUMNS[1:]))
+
+def stage(staging, paths, on_progress=None):
+    """Parse every document under paths into the staging tables. Returns (documents, skipped, unreadable_files)."""
+    batches = {kind: [] for kind in STAGING_INSERTS}
+    documents = skipped = unreadable = 0
+
+    def flush(kind):
+        staging.executemany(STAGING_INSERTS[kind], batches[kind])
+        batches[kind].clear()
+
+    for path in dump_files(paths):
+        for document in iter_documents(path):
+            if document is UNREADABLE:
+                unreadable += 1
+                continue
+            documents += 1
+            try:
+                kind = classify(document)
+                row = staging_row(kind, document) if kind else None
+            except (KeyError, TypeError, AttributeError, IndexError, ValueError):
+                row = None
+            if row is None:
+                skipped += 1
+                continue
+            batches[kind].append(row)
+            if len(batches[kind]) >= BATCH_SIZE:
+                flush(kind)
+            if on_progress is not None and documents % BATCH_SIZE == 0:
+                on_progress("reading", documents, None)
+    for kind in batches:
+        flush(kind)
+    staging.commit()
+    return documents, skipped, unreadable
+
+JOINED_QUERY = """
+SELECT e.pdb_id, e.protein_name, m.uniprot_id, m.organism, u.function, e.method, e.resolution,
+       e.ligand_present, u.sequence
+FROM entry e
+JOIN entity m ON m.pdb_id = e.pdb_id
+JOIN uniprot u ON u.uniprot_id = m.uniprot_id
+WHERE e.pdb_id NOT IN (SELECT pdb_id FROM record)
+UNION ALL
+SELECT pdb_id, protein_name, uniprot_id, organism, function, method, resolution, ligand_present, sequence
+FROM record
+"""
+
+IMPORT_QUERY = f"SELECT * FROM ({JOINED_QUERY}) WHERE sequence IS NOT NULL AND sequence <> ''"
+
+UNMATCHED_QUERY = """
+SELECT
+    (SELECT COUNT(*) FROM entry e WHERE e.pdb_id NOT IN (SELECT pdb_id FROM record) AND NOT EXISTS
+        (SELECT 1 FROM entity m WHERE m.pdb_id = e.pdb_id AND m.uniprot_id IS NOT NULL)),
+    (SELECT COUNT(*) FROM entry e JOIN entity m ON m.pdb_id = e.pdb_id
+     WHERE e.pdb_id NOT IN (SELECT pdb_id FROM record) AND m.uniprot_id IS NOT NULL
+       AND NOT EXISTS (SELECT 1 FROM uniprot u WHERE u.uniprot_id = m.uniprot_id))
+"""
+
+# ================= WRITING =================
+def write_records(conn, records):
+    """Insert one batch of joined records with executemany. Does not commit.
+
+    Like store_protein(), proteins that are already stored are left alone.
+    Returns how many proteins were new.
+    """
+    existing = {row[0] for row in conn.execute("""
+    SELECT pdb_id FROM protein WHERE pdb_id IN (SELECT value FROM json_each(?))
+    """, (json.dumps([r[0] for r in records]),))}
+    records = [r for r in records if r[0] not in existing]
+    if not records:
+        return 0
+    properties = property_rows([r[8] for r in records])
+    conn.executemany("""
+    INSERT INTO protein
+    (protein_name, pdb_id, uniprot_id, organism, function, aa_length, molecular_weight,
+     isoelectric_point, extinction_coefficient, gravy, aa_composition)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (pdb_id) DO NOTHING
+    """, [(r[1] or "Unknown", r[0], r[2], r[3] or "Unknown", r[4], p["aa_length"], p["molecular_weight"],
+           p["isoelectric_point"], p["extinction_coefficient"], p["gravy"], p["aa_composition"])
+          for r, p in zip(records, properties)])
+    ids = dict(conn.execute("""
+    SELECT pdb_id, protein_id FROM protein WHERE pdb_id IN (SELECT value FROM json_each(?))
+    """, (json.dumps([r[0] for r in records]),)).fetchall())
+    conn.executemany("""
+    INSERT INTO protein_structure (protein_id, method, resolution, ligand_present)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT (protein_id) DO NOTHING
+    """, [(ids[r[0]], r[5], r[6], int(r[7] or 0)) for r in records])
+    store_for(conn).put_many(conn, [(ids[r[0]], r[2], r[8]) for r in records])
+    return len(records)
+
+def import_dumps(conn, paths, on_progress=None):
+    """Import proteins from local RCSB / UniProt dumps without touching the network.
+
+    ``paths`` are files or directories holding RCSB entry and polymer
+    entity JSON, UniProt JSON (one document per .json file, or one per line
+    in .jsonl), or CSV files with RECORD_COLUMNS; any of them may be
+    gzipped. Documents are told apart by their content, so mirror layouts
+    do not matter. ``on_progress(stage, done, total)`` reports the "reading"
+    and "writing" stages. Coordinates and images are not imported; the
+    geometry backfill fetches coordinates later.
+
+    Returns a dict of counts.
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        staging = sqlite3.connect(os.path.join(scratch, "staging.db"))
+        staging.execute("PRAGMA journal_mode=OFF")
+        staging.execute("PRAGMA synchronous=OFF")
+        staging.executescript(STAGING_SCHEMA)
+        documents, skipped, unreadable = stage(staging, paths, on_progress)
+        no_mapping, no_uniprot = staging.execute(UNMATCHED_QUERY).fetchone()
+        total = staging.execute(f"SELECT COUNT(*) FROM ({IMPORT_QUERY})").fetchone()[0]
+
+        cursor = staging.execute(IMPORT_QUERY)
+        written = added = uncommitted = 0
+        try:
+            while True:
+                records = cursor.fetchmany(BATCH_SIZE)
+                if not records:
+                    break
+                added += write_records(conn, records)
+                written += len(records)
+                uncommitted += len(records)
+                if uncommitted >= COMMIT_ROWS:
+                    conn.commit()
+                    # The committed sequences are searchable now; the next search rebuilds the k-mer index.
+                    index_for(conn).invalidate()
+                    bump_generation()
+                    uncommitted = 0
+                if on_progress is not None:
+                    on_progress("writing", written, total)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            staging.close()
+    # Sequences were appended in bulk; rebuild the k-mer index on the next search.
+    index_for(conn).invalidate()
+    bump_generation()
+    return {"documents": documents, "skipped": skipped, "unreadable_files": unreadable, "records": written,
+            "added": added, "existing": written - added, "missing_uniprot_mapping": no_mapping,
+            "missing_uniprot_data": no_uniprot}
+
+# ================= COMMAND LINE =================
+if __name__ == "__main__":
+    from protein_db.db import DB_NAME
+    from protein_db.migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Import proteins from local RCSB / UniProt dumps.")
+    parser.add_argument("paths", nargs="+", help="dump files or directories")
+    parser.add_argument("--db", default=DB_NAME, help=f"database file (default: {DB_NAME})")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+
+    def report(stage, done, total):
+        print(f"\r{stage}: {done:,}" + (f" / {total:,}" if total else ""), end="", flush=True)
+
+    counts = import_dumps(conn, args.paths, on_progress=report)
+    print()
+    for name, value in counts.items():
+        print(f"  {name}: {value:,}")
+    conn.close()
@@ -0,0 +1,235 @@
+import os
+
+import numpy as np
+
+from protein_db.kmer_index import ALPHABET, kmer_codes
+from protein_db.query_cache import fetch_all
+from protein_db.sequence_store import store_for
+
+# ================= SETTINGS =================
+# Sequence identity levels to cluster at, e.g. "0.95,0.9,0.8". Identical
+# sequences already share one digest, so 1.0 is implicit.
+IDENTITIES = tuple(float(x) for x in os.environ.get("CLUSTER_IDENTITIES", "0.95,0.9,0.8").split(","))
+SHINGLE = 4
+NUM_HASHES = 64
+SIGNATURE_CHUNK = 20000
+
+# ================= MINHASH =================
+# One-permutation MinHash: every shingle gets a single random 32-bit hash,
+# the top 6 bits pick one of the 64 bins and the rest is the value; a bin's
+# signature entry is its minimum value. Bins a short sequence leaves empty
+# borrow from the next non-empty bin (rotation densification), offset so
+# borrowed values never equal genuine ones.
+_BIN_SHIFT = 32 - (NUM_HASHES - 1).bit_length()
+_EMPTY = np.iinfo(np.uint32).max
+_SHINGLE_HASH = np.random.default_rng(20240601).integers(
+    0, 2 ** 32, size=len(ALPHABET) ** SHINGLE, dtype=np.uint64)
+
+def signatures(sequences):
+    """(n, NUM_HASHES) uint32 MinHash signatures; rows of sequences without a full shingle are all _EMPTY."""
+    chunks = [s.encode("ascii") if isinstance(s, str) else s for s in sequences]
+    lengths = np.fromiter((len(c) for c in chunks), dtype=np.int64, count=len(chunks))
+    residues = np.frombuffer(b"".join(chunks), dtype=np.uint8)
+    counts = np.maximum(lengths - SHINGLE + 1, 0)
+    owner = np.repeat(np.arange(len(chunks)), counts)
+    starts = np.cumsum(lengths) - lengths
+    position = starts[owner] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    codes = kmer_codes(residues, SHINGLE)[position] if len(position) else position
+    valid = codes >= 0
+    owner, hashes = owner[valid], _SHINGLE_HASH[codes[valid]]
+    flat = np.full(len(chunks) * NUM_HASHES, _EMPTY, dtype=np.uint64)
+    np.minimum.at(flat, owner * NUM_HASHES + (hashes >> _BIN_SHIFT).astype(np.int64),
+                  hashes & ((1 << _BIN_SHIFT) - 1))
+    sig = flat.reshape(len(chunks), NUM_HASHES)
+    has_shingles = np.bincount(owner, minlength=len(chunks)) > 0
+    empty = (sig == _EMPTY) & has_shingles[:, None]
+    filled = sig.copy()
+    for step in range(1, NUM_HASHES):
+        if not empty.any():
+            break
+        borrowed = np.roll(sig, -step, axis=1)
+        take = empty & (borrowed != _EMPTY)
+        filled[take] = borrowed[take] + step * (1 << _BIN_SHIFT)
+        empty &= ~take
+    return filled.astype(np.uint32)
+
+def identity_to_jaccard(identity):
+    """Expected shingle Jaccard similarity of two sequences at a given substitution-only identity."""
+    shared = identity ** SHINGLE
+    return shared / (2 - shared)
+
+def band_layout(jaccard):
+    """(bands, rows) with the steepest LSH S-curve whose midpoint is still at or below jaccard."""
+    best = (NUM_HASHES, 1)
+    for rows in range(1, NUM_HASHES + 1):
+        bands = NUM_HASHES // rows
+        if (1 / bands) ** (1 / rows) <= jaccard:
+            best = (bands, rows)
+    return best
+
+# ================= SIGNATURE STORE =================
+MISSING_SIGNATURES_SQL = """
+SELECT q.digest, MIN(q.seq_offset), MAX(q.seq_length)
+FROM protein_sequence q
+LEFT JOIN sequence_minhash m ON m.digest = q.digest
+WHERE m.digest IS NULL
+GROUP BY q.digest
+"""
+
+def count_missing_signatures(conn):
+    return fetch_all(conn, f"SELECT COUNT(*) FROM ({MISSING_SIGNATURES_SQL})")[0][0]
+
+def update_signatures(conn, on_progress=None):
+    """Compute and store signatures for sequences that have none yet; drop those of deleted sequences."""
+    store = store_for(conn)
+    rows = conn.execute(MISSING_SIGNATURES_SQL + " ORDER BY 2").fetchall()
+    with conn:
+        conn.execute("""
+        DELETE FROM sequence_minhash
+        WHERE digest NOT IN (SELECT digest FROM protein_sequence)
+        """)
+        for first in range(0, len(rows), SIGNATURE_CHUNK):
+            chunk = rows[first:first + SIGNATURE_CHUNK]
+            sigs = signatures([store.read_range(offset, length) for _, offset, length in chunk])
+            conn.executemany("INSERT INTO sequence_minhash (digest, signature) VALUES (?, ?)",
+                             [(digest, sig.tobytes()) for (digest, _, _), sig in zip(chunk, sigs)])
+            if on_progress is not None:
+                on_progress(first + len(chunk), len(rows))
+    return len(rows)
+
+def load_signatures(conn):
+    """(digests, lengths, signature matrix) for every stored sequence with a signature."""
+    rows = conn.execute("""
+    SELECT m.digest, MAX(q.seq_length), m.signature
+    FROM sequence_minhash m JOIN protein_sequence q ON q.digest = m.digest
+    GROUP BY m.digest
+    ORDER BY m.digest
+    """).fetchall()
+    matrix = np.frombuffer(b"".join(r[2] for r in rows), dtype=np.uint32).reshape(len(rows), NUM_HASHES)
+    return [r[0] for r in rows], np.array([r[1] for r in rows], dtype=np.int64), matrix
+
+# ================= LSH CLUSTERING =================
+def _connected_components(n, left, right):
+    labels = np.arange(n)
+    while True:
+        before = labels.copy()
+        np.minimum.at(labels, left, labels[right])
+        np.minimum.at(labels, right, labels[left])
+        labels = labels[labels]
+        if np.array_equal(labels, before):
+            return labels
+
+def cluster_labels(matrix, identity):
+    """Cluster label per signature row: rows linked by LSH candidate pairs that pass the Jaccard check.
+
+    Each band sorts the rows by their band hash; rows with equal hashes
+    are adjacent, and only adjacent pairs are verified, so the work is
+    O(n log n) per band however large a bucket gets.
+    """
+    n = len(matrix)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    jaccard = identity_to_jaccard(identity)
+    bands, rows = band_layout(jaccard)
+    empty = (matrix == _EMPTY).all(axis=1)
+    multipliers = np.random.default_rng(7).integers(1, 2 ** 63, size=rows, dtype=np.uint64) | np.uint64(1)
+    left, right = [], []
+    for band in range(bands):
+        keys = (matrix[:, band * rows:(band + 1) * rows].astype(np.uint64) * multipliers).sum(axis=1)
+        order = np.argsort(keys, kind="stable")
+        same = keys[order][1:] == keys[order][:-1]
+        a, b = order[:-1][same], order[1:][same]
+        similar = (matrix[a] == matrix[b]).mean(axis=1) >= jaccard
+        keep = similar & ~empty[a] & ~empty[b]
+        left.append(a[keep])
+        right.append(b[keep])
+    return _connected_components(n, np.concatenate(left), np.concatenate(right))
+
+def recluster(conn, identities=IDENTITIES, on_progress=None):
+    """Bring signatures up to date, then rebuild the clusters at every identity level.
+
+    Only sequences without a stored signature are read from the sequence
+    file, so after a batch ingest the cost is the new sequences plus the
+    in-memory LSH pass. Only members of multi-sequence clusters are stored;
+    a sequence without a row is its own representative. The representative
+    of a cluster is its longest sequence. Returns {identity: cluster count}.
+    """
+    update_signatures(conn, on_progress)
+    digests, lengths, matrix = load_signatures(conn)
+    digest_array = np.array(digests, dtype=object)
+    counts = {}
+    with conn:
+        conn.execute("DELETE FROM sequence_cluster")
+        for identity in identities:
+            labels = cluster_labels(matrix, identity)
+            # Longest member first within each cluster, ties by digest order.
+            order = np.lexsort((np.arange(len(labels)), -lengths, labels))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = labels[order][1:] != labels[order][:-1]
+            representative = np.empty(len(labels), dtype=np.int64)
+            representative[labels[order[first]]] = order[first]
+            rep_of = representative[labels]
+            sizes = np.bincount(labels, minlength=len(labels))
+            shared = np.flatnonzero(sizes[labels] > 1)
+            conn.executemany(
+                "INSERT INTO sequence_cluster (identity, digest, representative) VALUES (?, ?, ?)",
+                zip([identity] * len(shared), digest_array[shared], digest_array[rep_of[shared]]))
+            counts[identity] = int(first.sum())
+    return counts
+
+# ================= READING =================
+CLUSTER_OF_SQL = """
+SELECT p.pdb_id, IFNULL(c.representative, IFNULL(q.digest, p.pdb_id))
+FROM protein p
+LEFT JOIN protein_sequence q ON q.protein_id = p.protein_id
+LEFT JOIN sequence_cluster c ON c.identity = ? AND c.digest = q.digest
+WHERE p.pdb_id IN ({placeholders})
+"""
+
+def collapse_redundant(conn, df, identity):
+    """Keep the first (best ranked) row of each cluster in a search result and add a cluster_size column."""
+    if df.empty:
+        return df
+    pdb_ids = df["pdb_id"].tolist()
+    marks = ", ".join("?" * len(pdb_ids))
+    cluster = dict(fetch_all(conn, CLUSTER_OF_SQL.format(placeholders=marks), (identity, *pdb_ids)))
+    keys = df["pdb_id"].map(cluster)
+    kept = df[~keys.duplicated()]
+    reps = keys[kept.index].unique().tolist()
+    marks = ", ".join("?" * len(reps))
+    # Singleton clusters are just the proteins sharing the digest; larger ones are counted via their rows.
+    sizes = dict(fetch_all(conn, f"""
+    SELECT digest, COUNT(*) FROM protein_sequence WHERE digest IN ({marks}) GROUP BY digest
+    """, tuple(reps)))
+    sizes.update(fetch_all(conn, f"""
+    SELECT c.representative, COUNT(*)
+    FROM sequence_cluster c JOIN protein_sequence q ON q.digest = c.digest
+    WHERE c.identity = ? AND c.representative IN ({marks})
+    GROUP BY c.representative
+    """, (identity, *reps)))
+    return kept.assign(cluster_size=keys[kept.index].map(sizes).fillna(1).astype(int)).reset_index(drop=True)
+
+def cluster_summary(conn, identity):
+    """(proteins with a sequence, distinct sequences, clusters) at an identity level."""
+    return fetch_all(conn, """
+    SELECT COUNT(*), COUNT(DISTINCT q.digest), COUNT(DISTINCT IFNULL(c.representative, q.digest))
+    FROM protein_sequence q
+    LEFT JOIN sequence_cluster c ON c.identity = ? AND c.digest = q.digest
+    """, (identity,))[0]
+
+def largest_clusters(conn, identity, limit=10):
+    """(representative PDB ID, protein name, member proteins) for the biggest clusters."""
+    return fetch_all(conn, """
+    SELECT p.pdb_id, p.protein_name, top.members
+    FROM (
+        SELECT IFNULL(c.representative, q.digest) AS representative, COUNT(*) AS members
+        FROM protein_sequence q
+        LEFT JOIN sequence_cluster c ON c.identity = ? AND c.digest = q.digest
+        GROUP BY 1
+        ORDER BY members DESC
+        LIMIT ?
+    ) top
+    JOIN protein p ON p.protein_id = (
+        SELECT MIN(r.protein_id) FROM protein_sequence r WHERE r.digest = top.representative)
+    ORDER BY top.members DESC
+    """, (identity, limit))
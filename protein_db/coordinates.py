@@ -0,0 +1,237 @@
+import gzip
+import re
+
+import numpy as np
+import requests
+
+from protein_db import http_client
+from protein_db.structure_cache import RCSB_FILES_URL
+
+# ================= SETTINGS =================
+# Two CA atoms are in contact within CONTACT_CUTOFF angstroms, unless they
+# are fewer than CONTACT_MIN_SEPARATION residues apart on the same chain.
+CONTACT_CUTOFF = 8.0
+CONTACT_MIN_SEPARATION = 3
+CONTACT_CHUNK = 50000
+MMCIF_URL = RCSB_FILES_URL + "/download/{pdb_id}.cif.gz"
+
+# Per-atom flag bits.
+POLYMER = 1
+CA = 2
+
+DESCRIPTOR_COLUMNS = ("atom_count", "chain_count", "radius_of_gyration", "ca_contacts",
+                      "extent_major", "extent_middle", "extent_minor")
+
+_TOKEN = re.compile(rb"""'(?:[^']|'(?!\s|$))*'(?=\s|$)|"(?:[^"]|"(?!\s|$))*"(?=\s|$)|\S+""")
+_WATER = [b"HOH", b"DOD", b"WAT"]
+_HYDROGEN = [b"H", b"D"]
+
+# ================= PARSING =================
+def _atom_site(data):
+    """(column names, flat token list) of the _atom_site loop of an mmCIF file, as bytes."""
+    start = data.find(b"\n_atom_site.")
+    if start < 0:
+        raise ValueError("no _atom_site loop")
+    columns = []
+    pos = start + 1
+    while data.startswith(b"_atom_site.", pos):
+        end = data.index(b"\n", pos)
+        columns.append(data[pos + len(b"_atom_site."):end].strip().decode())
+        pos = end + 1
+    # Loops end at a "#" comment line, the next loop or category, or the end of the block.
+    ends = [i for i in (data.find(b"\n#", pos - 1), data.find(b"\nloop_", pos - 1),
+                        data.find(b"\n_", pos - 1), data.find(b"\ndata_", pos - 1)) if i >= 0]
+    body = data[pos:min(ends) if ends else len(data)]
+    tokens = body.split()
+    if len(tokens) % len(columns):
+        # Quoted values containing spaces; rare in coordinate records.
+        tokens = [t[1:-1] if t[:1] in (b"'", b'"') else t for t in _TOKEN.findall(body)]
+    return columns, tokens
+
+def _first_altloc(alt, chain, seq, ins, atom, keep):
+    """Mask keeping, for each atom with alternate locations, only the altloc ID it lists first.
+
+    Atoms without an altloc are always kept. Altloc IDs are not always A, B, ...:
+    entries may start at B or number them 1, 2.
+    """
+    mask = np.ones(len(alt), dtype=bool)
+    rows = np.flatnonzero(keep & ~np.isin(alt, [b".", b"?"]))
+    if not len(rows):
+        return mask
+    sep = np.array([b"\0"])
+    key = chain[rows]
+    for part in (seq[rows], ins[rows], atom[rows]):
+        key = np.char.add(np.char.add(key, sep), part)
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    mask[rows] = alt[rows] == alt[rows][first][inverse.ravel()]
+    return mask
+
+def parse_mmcif(data):
+    """Compact coordinate arrays of the first model of an mmCIF file (bytes or str).
+
+    Waters, hydrogens and all but the first alternate location of each atom
+    are dropped.
+    Returns a dict: xyz (n, 3) float32, residue_index and chain_index (n,)
+    int32, atom_flags (n,) uint8 (POLYMER, CA bits) and chains (list of
+    author chain IDs, indexed by chain_index).
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    columns, tokens = _atom_site(data)
+    width = len(columns)
+    index = {name: i for i, name in enumerate(columns)}
+
+    def values(*names):
+        for name in names:
+            if name in index:
+                return tokens[index[name]::width]
+        return None
+
+    def column(*names, default=b"."):
+        found = values(*names)
+        return np.array(found) if found is not None else np.full(len(tokens) // width, default)
+
+    # Columns that are usually constant are only materialized when they are not.
+    keep = ~np.isin(column("auth_comp_id", "label_comp_id"), _WATER)
+    element = column("type_symbol")
+    keep &= ~np.isin(element, _HYDROGEN)
+    model = values("pdbx_PDB_model_num")
+    if model is not None and model[0] != model[-1]:
+        keep &= np.array(model) == model[0]
+    alt = values("label_alt_id")
+    if alt is not None and not set(alt) <= {b".", b"?"}:
+        keep &= _first_altloc(np.array(alt), column("auth_asym_id", "label_asym_id"),
+                              column("auth_seq_id", "label_seq_id"), column("pdbx_PDB_ins_code"),
+                              column("label_atom_id", "auth_atom_id"), keep)
+    rows = np.flatnonzero(keep)
+
+    xyz = np.empty((len(rows), 3), dtype=np.float32)
+    for axis, name in enumerate(("Cartn_x", "Cartn_y", "Cartn_z")):
+        xyz[:, axis] = np.array(values(name), dtype=np.float32)[rows]
+    chain = column("auth_asym_id", "label_asym_id")[rows]
+    seq = column("auth_seq_id", "label_seq_id")[rows]
+    ins = column("pdbx_PDB_ins_code")[rows]
+    polymer = column("group_PDB", default=b"ATOM")[rows] == b"ATOM"
+    ca = polymer & (column("label_atom_id", "auth_atom_id")[rows] == b"CA") & (element[rows] == b"C")
+
+    names, first, chain_index = np.unique(chain, return_index=True, return_inverse=True)
+    appearance = np.argsort(first)
+    rank = np.empty(len(names), dtype=np.int32)
+    rank[appearance] = np.arange(len(names), dtype=np.int32)
+    boundary = np.ones(len(rows), dtype=bool)
+    boundary[1:] = (chain[1:] != chain[:-1]) | (seq[1:] != seq[:-1]) | (ins[1:] != ins[:-1])
+    return {
+        "xyz": xyz,
+        "residue_index": (np.cumsum(boundary) - 1).astype(np.int32),
+        "chain_index": rank[chain_index.ravel()],
+        "atom_flags": (polymer * POLYMER + ca * CA).astype(np.uint8),
+        "chains": [name.decode() for name in names[appearance]],
+    }
+
+# ================= DESCRIPTORS =================
+_HALF_SHELL = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+               if (dx, dy, dz) > (0, 0, 0)]
+
+def contact_count(xyz, residue_index, chain_index, cutoff=CONTACT_CUTOFF, min_separation=CONTACT_MIN_SEPARATION):
+    """Number of atom pairs within cutoff, via a cell list so the cost stays linear in the atom count."""
+    n = len(xyz)
+    if n < 2:
+        return 0
+    cells = np.floor((xyz - xyz.min(axis=0)) / cutoff).astype(np.int64) + 1
+    dims = cells.max(axis=0) + 2
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    order = np.argsort(keys, kind="stable")
+    keys, xyz = keys[order], xyz[order]
+    residue_index, chain_index = residue_index[order], chain_index[order]
+    limit = cutoff * cutoff
+    total = 0
+    for first in range(0, n, CONTACT_CHUNK):
+        atoms = np.arange(first, min(first + CONTACT_CHUNK, n))
+        # Each unordered pair once: later atoms of the same cell, then the 13 forward neighbour cells.
+        for offset in [(0, 0, 0)] + _HALF_SHELL:
+            target = keys[atoms] + (offset[0] * dims[1] + offset[1]) * dims[2] + offset[2]
+            lo = np.searchsorted(keys, target, "left")
+            hi = np.searchsorted(keys, target, "right")
+            if offset == (0, 0, 0):
+                lo = atoms + 1
+            sizes = np.maximum(hi - lo, 0)
+            if not sizes.any():
+                continue
+            a = np.repeat(atoms, sizes)
+            b = np.repeat(lo - (np.cumsum(sizes) - sizes), sizes) + np.arange(sizes.sum())
+            close = ((xyz[a] - xyz[b]) ** 2).sum(axis=1) <= limit
+            near_in_chain = ((chain_index[a] == chain_index[b])
+                             & (np.abs(residue_index[a] - residue_index[b]) < min_separation))
+            total += int((close & ~near_in_chain).sum())
+    return total
+
+def descriptors(coords):
+    """Geometric descriptors of a parse_mmcif() result, computed over polymer atoms.
+
+    Extents are the spans along the principal axes, longest first, so they
+    do not depend on how the entry happens to be oriented.
+    """
+    polymer = (coords["atom_flags"] & POLYMER).astype(bool)
+    xyz = coords["xyz"][polymer].astype(np.float64)
+    ca = (coords["atom_flags"] & CA).astype(bool)
+    result = {"atom_count": int(len(coords["xyz"])),
+              "chain_count": int(len(np.unique(coords["chain_index"][polymer]))),
+              "ca_contacts": contact_count(coords["xyz"][ca], coords["residue_index"][ca],
+                                           coords["chain_index"][ca])}
+    if len(xyz) == 0:
+        return {**result, "radius_of_gyration": None,
+                "extent_major": None, "extent_middle": None, "extent_minor": None}
+    centered = xyz - xyz.mean(axis=0)
+    _, axes = np.linalg.eigh(centered.T @ centered)
+    projected = centered @ axes
+    extents = np.sort(projected.max(axis=0) - projected.min(axis=0))[::-1]
+    return {**result,
+            "radius_of_gyration": float(np.sqrt((centered ** 2).sum(axis=1).mean())),
+            "extent_major": float(extents[0]),
+            "extent_middle": float(extents[1]),
+            "extent_minor": float(extents[2])}
+
+# ================= FETCH / STORE =================
+def fetch_coordinates(pdb_id):
+    """Download and parse an entry's mmCIF file. None if it is unavailable or unparseable."""
+    try:
+        response = http_client.get(MMCIF_URL.format(pdb_id=pdb_id), headers={"Accept": "*/*"})
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    content = response.content
+    if content[:2] == b"\x1f\x8b":
+        content = gzip.decompress(content)
+    try:
+        return parse_mmcif(content)
+    except (ValueError, KeyError, IndexError):
+        return None
+
+def store_coordinates(cursor, protein_id, coords, values):
+    """Save coordinate blobs and their descriptors() for one protein. Does not commit."""
+    cursor.execute("""
+    INSERT OR REPLACE INTO structure_coordinates
+    (protein_id, atom_count, chains, xyz, residue_index, chain_index, atom_flags)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (protein_id, values["atom_count"], ",".join(coords["chains"]), coords["xyz"].tobytes(),
+          coords["residue_index"].tobytes(), coords["chain_index"].tobytes(), coords["atom_flags"].tobytes()))
+    cursor.execute(f"""
+    UPDATE protein_structure SET {", ".join(f"{c} = ?" for c in DESCRIPTOR_COLUMNS)}
+    WHERE protein_id = ?
+    """, (*(values[c] for c in DESCRIPTOR_COLUMNS), protein_id))
+
+def load_coordinates(conn, protein_id):
+    """The arrays saved by store_coordinates(), or None."""
+    row = conn.execute("""
+    SELECT chains, xyz, residue_index, chain_index, atom_flags FROM structure_coordinates WHERE protein_id = ?
+    """, (protein_id,)).fetchone()
+    if row is None:
+        return None
+    return {
+        "xyz": np.frombuffer(row[1], dtype=np.float32).reshape(-1, 3),
+        "residue_index": np.frombuffer(row[2], dtype=np.int32),
+        "chain_index": np.frombuffer(row[3], dtype=np.int32),
+        "atom_flags": np.frombuffer(row[4], dtype=np.uint8),
+        "chains": row[0].split(",") if row[0] else [],
+    }
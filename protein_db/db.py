@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+
+from protein_db.instrumentation import TimedConnection
+from protein_db.migrations import migrate
+
+# ================= SETTINGS =================
+DB_NAME = os.environ.get("PROTEIN_DB_PATH", "protein_structure.db")
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 256 * 1024 * 1024
+CACHE_SIZE_KIB = 64 * 1024
+# sqlite3 keeps this many prepared statements per connection, so the
+# fixed page queries are only compiled once per connection.
+STATEMENT_CACHE_SIZE = 256
+
+# ================= CONNECTIONS =================
+def _connect(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        # Times statements for the diagnostics page; a plain pass-through while metrics are off.
+        factory=TimedConnection,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    return conn
+
+class ConnectionPool:
+    """Hands each thread its own connection and recycles connections of finished threads.
+
+    Streamlit runs every script rerun on a fresh thread, so connections are
+    not tied to thread lifetime: once a thread has exited its connection
+    goes back to the idle list and the next thread reuses it. A connection
+    is therefore never used by two threads at the same time, and reruns do
+    not pay the connect and pragma cost. Pending schema migrations are
+    applied once, when the pool opens its first connection, and the job
+    workers are started right after, so they run whichever page a server
+    process serves first.
+    """
+
+    def __init__(self, path=DB_NAME):
+        self.path = path
+        self._lock = threading.Lock()
+        self._bound = {}
+        self._idle = []
+        self._created = 0
+        self._schema_ready = False
+
+    def _reclaim(self):
+        for ident, (thread, conn) in list(self._bound.items()):
+            if not thread.is_alive():
+                del self._bound[ident]
+                if conn.in_transaction:
+                    conn.rollback()
+                self._idle.append(conn)
+
+    def get(self):
+        thread = threading.current_thread()
+        with self._lock:
+            bound = self._bound.get(thread.ident)
+            if bound is not None and bound[0] is thread:
+                return bound[1]
+            self._reclaim()
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = _connect(self.path)
+            with self._lock:
+                self._created += 1
+                bootstrap = not self._schema_ready
+                if bootstrap:
+                    migrate(conn)
+                    self._schema_ready = True
+            if bootstrap:
+                # Imported here: protein_db.jobs itself gets its connections from this module.
+                from protein_db.jobs import start_runner
+                start_runner(self.path)
+        with self._lock:
+            self._bound[thread.ident] = (thread, conn)
+        return conn
+
+    def stats(self):
+        with self._lock:
+            return {"created": self._created, "in_use": len(self._bound), "idle": len(self._idle)}
+
+# ================= SHARED POOL =================
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path=DB_NAME):
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+        return pool
+
+def get_connection(path=DB_NAME):
+    """The calling thread's connection to ``path``, created on first use."""
+    return get_pool(path).get()
@@ -0,0 +1,287 @@
+import argparse
+import csv
+import io
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from protein_db.listing import SORT_COLUMNS, filter_clauses
+from protein_db.search import RESULT_COLUMNS, build_match_query
+
+# ================= SETTINGS =================
+# Finished exports are served by Streamlit's static file handler (see
+# .streamlit/config.toml), which streams them from disk. Streamlit cannot
+# stream a response that is still being produced, so the UI writes the file
+# chunk by chunk first; the command-line entry point at the bottom streams
+# straight to stdout instead.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPORT_DIR = os.path.join(APP_DIR, "static", "exports")
+STATIC_URL = "app/static/exports"
+CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 5000))
+# Exports are one-off downloads; older files are removed before each new export.
+MAX_AGE = int(os.environ.get("EXPORT_MAX_AGE", 3600))
+# Streamlit refuses to serve static files larger than this.
+STATIC_MAX_BYTES = 200 * 1024 * 1024
+PARQUET_COMPRESSION = "zstd"
+
+FORMATS = {
+    "csv": ("CSV", "text/csv"),
+    "jsonl": ("JSON Lines", "application/x-ndjson"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+}
+
+# ================= QUERIES =================
+DATABASE_QUERY = f"""
+SELECT p.protein_id, {RESULT_COLUMNS}, s.atom_count, p.aa_composition
+FROM protein p
+JOIN protein_structure s ON p.protein_id = s.protein_id
+ORDER BY p.protein_id
+"""
+
+SEARCH_QUERY = f"""
+SELECT {RESULT_COLUMNS}
+FROM protein_fts f
+JOIN protein p ON p.protein_id = f.rowid
+JOIN protein_structure s ON p.protein_id = s.protein_id
+WHERE protein_fts MATCH ?
+ORDER BY f.rank
+"""
+
+def database_query():
+    """(sql, params) for the whole protein / protein_structure join."""
+    return DATABASE_QUERY, ()
+
+def listing_query(sort="protein_id", descending=False, text=None, method=None, ligand=None):
+    """(sql, params) for every row of an admin listing view, in its sort order."""
+    _, key = SORT_COLUMNS[sort]
+    direction = "DESC" if descending else "ASC"
+    where, params = filter_clauses(text, method, ligand)
+    sql = f"""
+    SELECT p.protein_id, {RESULT_COLUMNS}
+    FROM protein p
+    CROSS JOIN protein_structure s ON p.protein_id = s.protein_id
+    {"WHERE " + " AND ".join(where) if where else ""}
+    ORDER BY {key} {direction}, p.protein_id {direction}
+    """
+    return sql, tuple(params)
+
+def search_query(text):
+    """(sql, params) for every full-text match of a search, best first; None if there is nothing to search."""
+    match = build_match_query(text)
+    return (SEARCH_QUERY, (match,)) if match else None
+
+def count_rows(conn, sql, params=()):
+    return conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+
+# ================= ROW SOURCES =================
+def iter_query(conn, sql, params=(), chunk_rows=CHUNK_ROWS):
+    """(column names, generator of row lists) for a query, read with fetchmany() so only one chunk is in memory."""
+    cursor = conn.execute(sql, params)
+    columns = [d[0] for d in cursor.description]
+
+    def chunks():
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+    return columns, chunks()
+
+def iter_frame(df, chunk_rows=CHUNK_ROWS):
+    """The iter_query() shape for a DataFrame that is already in memory (e.g. sequence search hits)."""
+    def chunks():
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows].astype(object)
+            yield list(chunk.where(chunk.notna(), None).itertuples(index=False, name=None))
+    return list(df.columns), chunks()
+
+_AFFINITY = (("INT", pa.int64()), ("CHAR", pa.string()), ("CLOB", pa.string()), ("TEXT", pa.string()),
+             ("BLOB", pa.binary()), ("REAL", pa.float64()), ("FLOA", pa.float64()), ("DOUB", pa.float64()))
+
+def column_types(conn):
+    """Arrow type of every protein / protein_structure column, from the declared SQLite types."""
+    types = {}
+    for table in ("protein_structure", "protein"):
+        for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({table})"):
+            declared = (declared or "").upper()
+            types[name] = next((t for marker, t in _AFFINITY if marker in declared), None)
+    return {name: t for name, t in types.items() if t is not None}
+
+def frame_types(df):
+    return {field.name: field.type for field in pa.Schema.from_pandas(df, preserve_index=False)
+            if not pa.types.is_null(field.type)}
+
+# ================= ENCODERS =================
+class _Sink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last take()."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+def _csv(columns, chunks, types):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def _jsonl(columns, chunks, types):
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows).encode()
+
+def _parquet(columns, chunks, types):
+    # One row group per chunk; the writer flushes each group to the sink as it goes.
+    sink = _Sink()
+    writer = None
+    for rows in chunks:
+        values = list(zip(*rows))
+        if writer is None:
+            schema = pa.schema([(name, types.get(name) or _infer(column))
+                                for name, column in zip(columns, values)])
+            writer = pq.ParquetWriter(sink, schema, compression=PARQUET_COMPRESSION)
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(values, writer.schema)],
+            schema=writer.schema))
+        yield sink.take()
+    if writer is None:
+        writer = pq.ParquetWriter(sink, pa.schema([(name, types.get(name, pa.string())) for name in columns]),
+                                  compression=PARQUET_COMPRESSION)
+    writer.close()
+    yield sink.take()
+
+def _infer(column):
+    inferred = pa.array(column).type
+    return pa.string() if pa.types.is_null(inferred) else inferred
+
+_ENCODERS = {"csv": _csv, "jsonl": _jsonl, "parquet": _parquet}
+
+def encode(columns, chunks, fmt, types=None):
+    """Generator of byte chunks in one of FORMATS, produced as the row chunks arrive.
+
+    ``types`` maps column names to Arrow types for Parquet; other columns
+    are typed from their first chunk.
+    """
+    return _ENCODERS[fmt](columns, chunks, types or {})
+
+# ================= FILES =================
+def prune(max_age=MAX_AGE):
+    """Remove exports older than max_age seconds."""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def export_file(columns, chunks, fmt, name, types=None, on_progress=None):
+    """Write an export to the static folder one chunk at a time.
+
+    ``on_progress(rows)`` is called after each chunk. Returns a dict with
+    the static ``url``, file_name, rows, size and whether the file is small
+    enough for Streamlit to serve.
+    """
+    prune()
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    file_name = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(8)}.{fmt}"
+    path = os.path.join(EXPORT_DIR, file_name)
+    counted = {"rows": 0}
+
+    def counting():
+        for rows in chunks:
+            counted["rows"] += len(rows)
+            if on_progress is not None:
+                on_progress(counted["rows"])
+            yield rows
+
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            for data in encode(columns, counting(), fmt, types):
+                f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    size = os.path.getsize(path)
+    return {"url": f"{STATIC_URL}/{file_name}", "file_name": file_name, "rows": counted["rows"],
+            "size": size, "servable": size <= STATIC_MAX_BYTES}
+
+def export_query(conn, sql, params, fmt, name, on_progress=None):
+    """export_file() for a query against protein / protein_structure."""
+    columns, chunks = iter_query(conn, sql, params)
+    return export_file(columns, chunks, fmt, name, column_types(conn), on_progress)
+
+def export_frame(df, fmt, name, types=None, on_progress=None):
+    """export_file() for a DataFrame; ``types`` covers columns that are entirely null in it."""
+    columns, chunks = iter_frame(df)
+    return export_file(columns, chunks, fmt, name, {**(types or {}), **frame_types(df)}, on_progress)
+
+# ================= COMMAND LINE =================
+# python -m protein_db.export --format parquet > proteins.parquet
+# Output starts as soon as the first chunk has been read, so it can be piped
+# or served by any server that accepts a generator as a response body.
+if __name__ == "__main__":
+    from protein_db.db import DB_NAME
+    from protein_db.listing import METHODS
+
+    parser = argparse.ArgumentParser(description="Stream the protein / structure table to stdout.")
+    parser.add_argument("--db", default=DB_NAME, help=f"database file (default: {DB_NAME})")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("--search", help="only full-text matches of this search, best first")
+    parser.add_argument("--text", help="listing filter on name, function or organism")
+    parser.add_argument("--method", choices=METHODS, help="listing filter on experimental method")
+    parser.add_argument("--ligand", choices=["yes", "no"], help="listing filter on ligand presence")
+    parser.add_argument("--sort", choices=list(SORT_COLUMNS), help="listing sort column")
+    parser.add_argument("--descending", action="store_true")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.search:
+        query = search_query(args.search)
+        if query is None:
+            parser.error("--search has no searchable words")
+    elif args.text or args.method or args.ligand or args.sort:
+        query = listing_query(args.sort or "protein_id", args.descending, args.text, args.method,
+                              None if args.ligand is None else args.ligand == "yes")
+    else:
+        query = database_query()
+    columns, chunks = iter_query(conn, *query)
+    for data in encode(columns, chunks, args.format, column_types(conn)):
+        sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+    conn.close()
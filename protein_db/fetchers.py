@@ -0,0 +1,60 @@
+import os
+
+from protein_db import response_cache
+
+# ================= API ENDPOINTS =================
+# Overridable so ingestion can be pointed at a local mirror or stub server.
+RCSB_DATA_URL = os.environ.get("RCSB_DATA_URL", "https://data.rcsb.org").rstrip("/")
+UNIPROT_REST_URL = os.environ.get("UNIPROT_REST_URL", "https://rest.uniprot.org").rstrip("/")
+
+# ================= PARSING =================
+# Shared by the fetchers below and by bulk_import.py, which reads the same
+# documents from local dumps.
+def parse_rcsb_entry(data):
+    protein_name = data.get("struct", {}).get("title", "Unknown")
+    method = data.get("exptl", [{}])[0].get("method") if data.get("exptl") else None
+    resolution = data.get("rcsb_entry_info", {}).get("resolution_combined", [None])[0]
+    ligands = data.get("rcsb_entry_container_identifiers", {}).get("nonpolymer_entity_ids", [])
+    ligand_present = 1 if ligands else 0
+    return protein_name, method, resolution, ligand_present, "Unknown"
+
+def parse_polymer_entity(data):
+    uniprot_ids = data.get("rcsb_polymer_entity_container_identifiers", {}).get("uniprot_ids", [])
+    uniprot_id = uniprot_ids[0] if uniprot_ids else None
+    organism = "Unknown"
+    src = data.get("rcsb_entity_source_organism", [])
+    if src:
+        organism = src[0].get("scientific_name", "Unknown")
+    return uniprot_id, organism
+
+def parse_uniprot_entry(data):
+    sequence = data["sequence"]["value"]
+    function = "No description available"
+    for c in data.get("comments", []):
+        if c.get("commentType") == "FUNCTION":
+            texts = c.get("texts", [])
+            if texts:
+                function = texts[0].get("value", function)
+    return sequence, function
+
+# ================= DATA FETCHING =================
+def fetch_rcsb_data(pdb_id):
+    url = f"{RCSB_DATA_URL}/rest/v1/core/entry/{pdb_id}"
+    r = response_cache.get(url)
+    if r.status_code != 200:
+        return None
+    return parse_rcsb_entry(r.json())
+
+def get_uniprot_and_organism(pdb_id):
+    url = f"{RCSB_DATA_URL}/rest/v1/core/polymer_entity/{pdb_id}/1"
+    r = response_cache.get(url)
+    if r.status_code != 200:
+        return None, "Unknown"
+    return parse_polymer_entity(r.json())
+
+def fetch_uniprot_data(uniprot_id):
+    url = f"{UNIPROT_REST_URL}/uniprotkb/{uniprot_id}.json"
+    r = response_cache.get(url)
+    if r.status_code != 200:
+        return None, None
+    return parse_uniprot_entry(r.json())
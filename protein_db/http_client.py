@@ -0,0 +1,110 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from protein_db import instrumentation
+
+# ================= SETTINGS =================
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 30))
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 4))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+POOL_SIZE = 32
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# ================= SESSION =================
+# One keep-alive session for the whole process; the adapter's pool is
+# sized for the batch importer's worker threads.
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+_session.headers.update({"Accept": "application/json"})
+
+# ================= LATENCY COUNTERS =================
+_stats_lock = threading.Lock()
+_host_stats = {}
+
+def _record(host, seconds, failed=False, retried=False):
+    with _stats_lock:
+        s = _host_stats.setdefault(host, {
+            "requests": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+        })
+        s["requests"] += 1
+        s["total_seconds"] += seconds
+        s["max_seconds"] = max(s["max_seconds"], seconds)
+        if failed:
+            s["errors"] += 1
+        if retried:
+            s["retries"] += 1
+
+def host_stats():
+    """Snapshot of per-host request counts and latencies, keyed by host name."""
+    with _stats_lock:
+        snapshot = {host: dict(s) for host, s in _host_stats.items()}
+    for s in snapshot.values():
+        s["mean_seconds"] = s["total_seconds"] / s["requests"] if s["requests"] else 0.0
+    return snapshot
+
+def reset_stats():
+    with _stats_lock:
+        _host_stats.clear()
+
+# ================= RETRIES =================
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _backoff(attempt):
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt))
+    return delay * (0.5 + random.random() / 2)
+
+# ================= REQUESTS =================
+def get(url, timeout=None, max_retries=None, **kwargs):
+    """GET through the shared session with timeouts and retry on 429/5xx and connection errors.
+
+    Returns the final response (which may still be an error status once
+    retries are exhausted); re-raises the last network error if no response
+    was ever received.
+    """
+    host = urlsplit(url).netloc
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        last_attempt = attempt == max_retries
+        start = time.perf_counter()
+        try:
+            response = _session.get(url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            elapsed = time.perf_counter() - start
+            _record(host, elapsed, failed=True, retried=not last_attempt)
+            instrumentation.observe("http", instrumentation.endpoint_name(url), elapsed)
+            if last_attempt:
+                raise
+            time.sleep(_backoff(attempt))
+            continue
+        elapsed = time.perf_counter() - start
+        retry = response.status_code in RETRY_STATUSES and not last_attempt
+        _record(host, elapsed, failed=response.status_code in RETRY_STATUSES, retried=retry)
+        instrumentation.observe("http", instrumentation.endpoint_name(url), elapsed)
+        if not retry:
+            return response
+        delay = _retry_after(response)
+        time.sleep(min(BACKOFF_MAX, delay) if delay is not None else _backoff(attempt))
+        response.close()
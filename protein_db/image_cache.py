@@ -0,0 +1,288 @@
+import hashlib
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import requests
+from PIL import Image
+
+from protein_db import http_client
+
+# ================= SETTINGS =================
+# Served by Streamlit's static file handler from the ``static`` folder next
+# to Home.py (see .streamlit/config.toml). File names carry a content digest,
+# so a URL always means the same bytes and browsers can keep them forever.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_DIR = os.path.join(APP_DIR, "static", "images")
+STATIC_URL = "app/static/images"
+CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(".cache", "images"))
+MAX_BYTES = int(os.environ.get("IMAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+THUMBNAIL_SIZE = int(os.environ.get("IMAGE_THUMBNAIL_SIZE", 400))
+THUMBNAIL_QUALITY = 85
+# Fetch images after ingesting, so the first detail view is already local.
+# Prefetching runs on its own daemon threads; when more than PREFETCH_QUEUE
+# entries are waiting, further ones are skipped and fetched on first view.
+PREFETCH = os.environ.get("IMAGE_PREFETCH", "1").lower() in ("1", "true", "yes")
+PREFETCH_WORKERS = int(os.environ.get("IMAGE_PREFETCH_WORKERS", 2))
+PREFETCH_QUEUE = 10000
+RCSB_CDN_URL = os.environ.get("RCSB_CDN_URL", "https://cdn.rcsb.org").rstrip("/")
+KINDS = {
+    "assembly": "/images/structures/{pdb_lower}_assembly-1.jpeg",
+    "ligand": "/images/structures/{pdb_lower}_ligand-1.jpeg",
+}
+# Statuses that mean the CDN has no such image; anything else may be transient.
+MISSING_STATUSES = {403, 404, 410}
+# Images are decoration; do not let a struggling CDN hold up ingestion.
+MAX_RETRIES = 1
+
+# ================= CACHE =================
+class ImageCache:
+    """RCSB structure images plus downscaled thumbnails, with an LRU disk budget.
+
+    Lookups the CDN answered with "not found" are remembered as negative
+    entries (no file, no size) and never requested again until the cache is
+    cleared; they cost nothing against the budget and are never evicted.
+    """
+
+    def __init__(self, image_dir=IMAGE_DIR, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES,
+                 thumbnail_size=THUMBNAIL_SIZE):
+        self.image_dir = image_dir
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self._lock = threading.Lock()
+        self._entry_locks = {}
+        os.makedirs(image_dir, exist_ok=True)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS image (
+            pdb_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            digest TEXT,
+            size INTEGER NOT NULL DEFAULT 0,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (pdb_id, kind)
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_image_last_access ON image(last_access)")
+        self._conn.commit()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "downloads": 0, "not_found": 0,
+                       "failures": 0, "bytes_downloaded": 0, "evictions": 0}
+
+    # ---------- files ----------
+    def file_names(self, pdb_id, kind, digest):
+        """(full image, thumbnail) file names for one stored image."""
+        stem = f"{pdb_id}_{kind}.{digest[:16]}"
+        return f"{stem}.jpeg", f"{stem}.thumb.jpeg"
+
+    def _remove(self, pdb_id, kind, digest):
+        for name in self.file_names(pdb_id, kind, digest):
+            try:
+                os.remove(os.path.join(self.image_dir, name))
+            except FileNotFoundError:
+                pass
+
+    def _write(self, name, content):
+        path = os.path.join(self.image_dir, name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def _thumbnail(self, content):
+        image = Image.open(io.BytesIO(content))
+        image.thumbnail((self.thumbnail_size, self.thumbnail_size), Image.LANCZOS)
+        out = io.BytesIO()
+        image.convert("RGB").save(out, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+        return out.getvalue()
+
+    def _entry(self, pdb_id, kind, digest, size):
+        full, thumb = self.file_names(pdb_id, kind, digest)
+        return {"pdb_id": pdb_id, "kind": kind, "url": f"{STATIC_URL}/{full}",
+                "thumbnail_url": f"{STATIC_URL}/{thumb}", "size": size}
+
+    def _entry_lock(self, key):
+        with self._lock:
+            return self._entry_locks.setdefault(key, threading.Lock())
+
+    # ---------- index ----------
+    def _lookup(self, pdb_id, kind):
+        """(digest, size) for a stored image, (None, 0) for a known-missing one, None if unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, size FROM image WHERE pdb_id = ? AND kind = ?", (pdb_id, kind)
+            ).fetchone()
+            if row is not None and row[0] is not None and not all(
+                    os.path.exists(os.path.join(self.image_dir, name))
+                    for name in self.file_names(pdb_id, kind, row[0])):
+                self._conn.execute("DELETE FROM image WHERE pdb_id = ? AND kind = ?", (pdb_id, kind))
+                self._conn.commit()
+                row = None
+        return row
+
+    def _touch(self, pdb_id, kind):
+        with self._lock:
+            self._conn.execute("UPDATE image SET last_access = ? WHERE pdb_id = ? AND kind = ?",
+                               (time.time(), pdb_id, kind))
+            self._conn.commit()
+
+    def _store(self, pdb_id, kind, digest, size):
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT digest FROM image WHERE pdb_id = ? AND kind = ?", (pdb_id, kind)
+            ).fetchone()
+            self._conn.execute("""
+            INSERT OR REPLACE INTO image (pdb_id, kind, digest, size, fetched_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (pdb_id, kind, digest, size, now, now))
+            if old is not None and old[0] is not None and old[0] != digest:
+                self._remove(pdb_id, kind, old[0])
+            self._evict(keep=(pdb_id, kind))
+            self._conn.commit()
+
+    def _evict(self, keep):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM image").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("""
+        SELECT pdb_id, kind, digest, size FROM image
+        WHERE digest IS NOT NULL AND NOT (pdb_id = ? AND kind = ?)
+        ORDER BY last_access
+        """, keep).fetchall()
+        for pdb_id, kind, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM image WHERE pdb_id = ? AND kind = ?", (pdb_id, kind))
+            self._remove(pdb_id, kind, digest)
+            total -= size
+            self._stats["evictions"] += 1
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    # ---------- downloads ----------
+    def _download(self, pdb_id, kind):
+        """Fetch and store one image. Entry dict, or None if the CDN does not have it."""
+        url = RCSB_CDN_URL + KINDS[kind].format(pdb_lower=pdb_id.lower())
+        response = http_client.get(url, max_retries=MAX_RETRIES, headers={"Accept": "image/*"})
+        if response.status_code in MISSING_STATUSES:
+            self._count("not_found")
+            self._store(pdb_id, kind, None, 0)
+            return None
+        if response.status_code != 200:
+            raise requests.HTTPError(f"{response.status_code} for {url}", response=response)
+        content = response.content
+        thumbnail = self._thumbnail(content)
+        digest = hashlib.sha256(content).hexdigest()
+        full_name, thumb_name = self.file_names(pdb_id, kind, digest)
+        self._write(full_name, content)
+        self._write(thumb_name, thumbnail)
+        size = len(content) + len(thumbnail)
+        self._count("downloads")
+        self._count("bytes_downloaded", len(content))
+        self._store(pdb_id, kind, digest, size)
+        return self._entry(pdb_id, kind, digest, size)
+
+    # ---------- public ----------
+    def get(self, pdb_id, kind):
+        """Entry dict with the static ``url`` and ``thumbnail_url`` of an image; None if unavailable.
+
+        A miss downloads the image. Network errors and undecodable images
+        return None without being remembered, so they are retried next time.
+        """
+        pdb_id = pdb_id.strip().upper()
+        with self._entry_lock((pdb_id, kind)):
+            row = self._lookup(pdb_id, kind)
+            if row is not None:
+                if row[0] is None:
+                    self._count("negative_hits")
+                    return None
+                self._touch(pdb_id, kind)
+                self._count("hits")
+                return self._entry(pdb_id, kind, *row)
+            self._count("misses")
+            try:
+                return self._download(pdb_id, kind)
+            except Exception:
+                # Network errors, disk errors and anything PIL raises on a corrupt
+                # or oversized image: an image is never worth failing a caller for.
+                self._count("failures")
+                return None
+
+    def prefetch(self, pdb_id, ligand_present):
+        """Bring an entry's assembly image, and its ligand image if it has ligands, into the cache."""
+        for kind in ("assembly", "ligand") if ligand_present else ("assembly",):
+            self.get(pdb_id, kind)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            images, missing, total = self._conn.execute("""
+            SELECT COUNT(digest), COUNT(*) - COUNT(digest), COALESCE(SUM(size), 0) FROM image
+            """).fetchone()
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats.update({
+            "images": images,
+            "known_missing": missing,
+            "stored_bytes": total,
+            "max_bytes": self.max_bytes,
+            "hit_rate": (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0,
+        })
+        return stats
+
+    def clear(self):
+        """Drop every image and every negative entry."""
+        with self._lock:
+            rows = self._conn.execute("SELECT pdb_id, kind, digest FROM image WHERE digest IS NOT NULL").fetchall()
+            self._conn.execute("DELETE FROM image")
+            self._conn.commit()
+            for pdb_id, kind, digest in rows:
+                self._remove(pdb_id, kind, digest)
+
+# ================= SHARED INSTANCE =================
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ImageCache()
+        return _cache
+
+def get(pdb_id, kind):
+    return get_cache().get(pdb_id, kind)
+
+# ================= PREFETCH =================
+_prefetch_queue = queue.Queue(maxsize=PREFETCH_QUEUE)
+_prefetch_threads = []
+
+def _prefetch_worker():
+    while True:
+        pdb_id, ligand_present = _prefetch_queue.get()
+        try:
+            get_cache().prefetch(pdb_id, ligand_present)
+        except Exception:
+            pass
+
+def prefetch(pdb_id, ligand_present):
+    """Queue an entry's images for download in the background. Never blocks and never raises."""
+    if not PREFETCH:
+        return
+    with _cache_lock:
+        while len(_prefetch_threads) < PREFETCH_WORKERS:
+            thread = threading.Thread(target=_prefetch_worker, name="image-prefetch", daemon=True)
+            thread.start()
+            _prefetch_threads.append(thread)
+    try:
+        _prefetch_queue.put_nowait((pdb_id, ligand_present))
+    except queue.Full:
+        pass
+
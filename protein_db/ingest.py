@@ -0,0 +1,347 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from protein_db import image_cache
+from protein_db.coordinates import descriptors, fetch_coordinates, store_coordinates
+from protein_db.kmer_index import index_for
+from protein_db.properties import property_rows
+from protein_db.query_cache import bump_generation, fetch_all
+from protein_db.sequence_store import store_for
+from protein_db.shape_index import shape_descriptor, store_shape
+from protein_db.fetchers import (
+    fetch_rcsb_data,
+    fetch_uniprot_data,
+    get_uniprot_and_organism,
+)
+
+PDB_ID_PATTERN = re.compile(r"^[0-9][A-Z0-9]{3}$")
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 100
+
+# ================= ID LISTS =================
+def parse_pdb_ids(text):
+    """Split pasted/uploaded text into (valid_ids, invalid_tokens), upper-cased and de-duplicated."""
+    ids, invalid, seen = [], [], set()
+    for token in re.split(r"[\s,;]+", text.upper()):
+        if not token or token in seen:
+            continue
+        seen.add(token)
+        if PDB_ID_PATTERN.match(token):
+            ids.append(token)
+        else:
+            invalid.append(token)
+    return ids, invalid
+
+# ================= FETCH =================
+def fetch_geometry(pdb_id):
+    """(coordinate arrays, descriptors) for an entry, or (None, None) if its mmCIF file is unavailable.
+
+    The descriptors include the shape-search vector under "shape" (None for
+    entries with fewer than two CA atoms).
+    """
+    coords = fetch_coordinates(pdb_id)
+    if coords is None:
+        return None, None
+    return coords, {**descriptors(coords), "shape": shape_descriptor(coords)}
+
+def fetch_protein_record(pdb_id, executor=None):
+    """Fetch everything needed for one protein. Returns (record, error_message).
+
+    When an executor is given, the polymer-entity call runs on it while the
+    entry call runs on the current thread, so the two RCSB requests overlap.
+    """
+    try:
+        entity_future = executor.submit(get_uniprot_and_organism, pdb_id) if executor else None
+        rcsb = fetch_rcsb_data(pdb_id)
+        if rcsb is None:
+            if entity_future is not None:
+                entity_future.cancel()
+            return None, "RCSB data not found"
+        protein_name, method, resolution, ligand_present, organism = rcsb
+        if entity_future is not None:
+            uniprot_id, organism = entity_future.result()
+        else:
+            uniprot_id, organism = get_uniprot_and_organism(pdb_id)
+        if uniprot_id is None:
+            return None, "UniProt mapping not found"
+        sequence, function = fetch_uniprot_data(uniprot_id)
+        if sequence is None:
+            return None, "UniProt data not found"
+    except requests.RequestException as e:
+        return None, f"Network error: {str(e)}"
+    record = {
+        "protein_name": protein_name,
+        "pdb_id": pdb_id,
+        "uniprot_id": uniprot_id,
+        "organism": organism,
+        "function": function,
+        "method": method,
+        "resolution": resolution,
+        "ligand_present": ligand_present,
+        "sequence": sequence,
+    }
+    record.update(property_rows([sequence])[0])
+    record["coordinates"], record["descriptors"] = fetch_geometry(pdb_id)
+    return record, None
+
+# ================= STORE =================
+def store_geometry(cursor, protein_id, coords, values, after_commit=None):
+    """Save one protein's fetch_geometry() result, shape vector included. Does not commit."""
+    store_coordinates(cursor, protein_id, coords, values)
+    if values["shape"] is not None:
+        store_shape(cursor, protein_id, values["shape"], after_commit)
+
+PROTEIN_COLUMNS = ("protein_name", "pdb_id", "uniprot_id", "organism", "function", "aa_length",
+                   "molecular_weight", "isoelectric_point", "extinction_coefficient", "gravy", "aa_composition")
+REFRESHED_COLUMNS = [c for c in PROTEIN_COLUMNS if c != "pdb_id"]
+
+# ON CONFLICT DO NOTHING returns no row for an existing protein, which is
+# all the plain insert mode needs to know. A refresh overwrites the fetched
+# columns and stamps refreshed_at, which is NULL on a freshly inserted row,
+# so one statement says both which protein it was and whether it is new.
+PROTEIN_INSERT_SQL = f"""
+INSERT INTO protein ({", ".join(PROTEIN_COLUMNS)})
+VALUES ({", ".join("?" * len(PROTEIN_COLUMNS))})
+ON CONFLICT (pdb_id) DO NOTHING
+RETURNING protein_id, 1
+"""
+
+PROTEIN_REFRESH_SQL = f"""
+INSERT INTO protein ({", ".join(PROTEIN_COLUMNS)})
+VALUES ({", ".join("?" * len(PROTEIN_COLUMNS))})
+ON CONFLICT (pdb_id) DO UPDATE SET
+    {", ".join(f"{c} = excluded.{c}" for c in REFRESHED_COLUMNS)},
+    refreshed_at = CURRENT_TIMESTAMP
+RETURNING protein_id, refreshed_at IS NULL
+"""
+
+STRUCTURE_UPSERT_SQL = """
+INSERT INTO protein_structure (protein_id, method, resolution, ligand_present)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (protein_id) DO UPDATE SET
+    method = excluded.method, resolution = excluded.resolution, ligand_present = excluded.ligand_present
+"""
+
+def store_protein(cursor, record, refresh=False, after_commit=None):
+    """Insert one fetched record. Does not commit; the caller owns the transaction.
+
+    An existing protein is left untouched, unless ``refresh`` is set: then
+    its metadata, structure row, sequence and geometry are overwritten
+    with the fetched values. The in-memory search indexes only change once
+    the rows are committed: their updates are appended to ``after_commit``
+    as callables for the caller to pass to run_after_commit() after its
+    commit; without a list they are dropped.
+    """
+    after_commit = [] if after_commit is None else after_commit
+    record["pdb_id"] = record["pdb_id"].strip().upper()
+    row = cursor.execute(PROTEIN_REFRESH_SQL if refresh else PROTEIN_INSERT_SQL,
+                         tuple(record.get(c) for c in PROTEIN_COLUMNS)).fetchone()
+    if row is None:
+        return True, "Protein already exists"
+    protein_id, inserted = row
+    if record.get("sequence"):
+        conn = cursor.connection
+        old = None if inserted else cursor.execute(
+            "SELECT seq_offset FROM protein_sequence WHERE protein_id = ?", (protein_id,)).fetchone()
+        sequence = record["sequence"].strip().upper()
+        offset = store_for(conn).put(conn, protein_id, record["uniprot_id"], sequence)
+        index = index_for(conn)
+        after_commit.append(lambda: index.add(offset, sequence))
+        if old is not None and old[0] != offset:
+            # A refreshed sequence leaves its old range behind, unless another protein shares it.
+            after_commit.append(lambda: index.discard(conn, old[0]))
+    cursor.execute(STRUCTURE_UPSERT_SQL, (protein_id, record["method"], record["resolution"],
+                                          record["ligand_present"]))
+    if record.get("coordinates") is not None:
+        store_geometry(cursor, protein_id, record["coordinates"], record["descriptors"], after_commit)
+    return True, "Protein added successfully" if inserted else "Protein refreshed"
+
+def _store_in_savepoint(cursor, record, refresh, after_commit):
+    # A record that fails halfway is rolled back on its own, so the batch
+    # transaction never commits a protein without its structure row.
+    if not cursor.connection.in_transaction:
+        cursor.execute("BEGIN")
+    cursor.execute("SAVEPOINT store_protein")
+    queued = len(after_commit)
+    try:
+        result = store_protein(cursor, record, refresh, after_commit)
+    except BaseException:
+        # Whatever failed (SQLite, the sequence file, bad coordinates), none of the record is kept.
+        cursor.execute("ROLLBACK TO store_protein")
+        cursor.execute("RELEASE store_protein")
+        del after_commit[queued:]
+        raise
+    cursor.execute("RELEASE store_protein")
+    return result
+
+def run_after_commit(after_commit):
+    """Apply the index updates queued by store_protein() once their transaction has committed, and empty the list."""
+    bump_generation()
+    for update in after_commit:
+        update()
+    after_commit.clear()
+
+def _completed_groups(futures, batch_size):
+    """Finished futures in lists of up to batch_size, in completion order.
+
+    Callers write each list in its own BEGIN IMMEDIATE transaction, so the
+    write lock is only held while already-fetched rows are inserted, never
+    while fetches are in flight.
+    """
+    group = []
+    for future in as_completed(futures):
+        group.append(future)
+        if len(group) >= batch_size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+# ================= BATCH INGESTION =================
+def _store_records(conn, records, refresh):
+    """Store already-fetched records in one transaction. Returns (success, message) per record."""
+    cursor = conn.cursor()
+    after_commit = []
+    outcomes = []
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for record in records:
+            try:
+                outcomes.append(_store_in_savepoint(cursor, record, refresh, after_commit))
+            except Exception as e:
+                # Already rolled back to before this record; the rest of the group goes on.
+                outcomes.append((False, f"Error: {str(e)}"))
+    run_after_commit(after_commit)
+    for record, (success, _) in zip(records, outcomes):
+        if success:
+            # Best effort, on the image cache's own threads: images never hold up or fail ingestion.
+            image_cache.prefetch(record["pdb_id"], record["ligand_present"])
+    return outcomes
+
+def ingest_batch(conn, pdb_ids, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, on_result=None,
+                 refresh=False):
+    """Fetch many PDB IDs through a bounded thread pool and store them in batched transactions.
+
+    Network calls run on worker threads; all database writes happen on the
+    calling thread, one transaction per group of up to ``batch_size``
+    fetched records. ``on_result(done, total, pdb_id, success, message)``
+    is called as each ID finishes, after its group has committed; if it
+    raises, the groups stored so far stay committed. ``refresh`` overwrites
+    proteins that are already stored. Returns a list of (pdb_id, success,
+    message).
+    """
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            ThreadPoolExecutor(max_workers=workers) as entity_pool:
+        futures = {pool.submit(fetch_protein_record, pdb_id, entity_pool): pdb_id for pdb_id in pdb_ids}
+        for group in _completed_groups(futures, batch_size):
+            outcomes, fetched = {}, {}
+            for future in group:
+                try:
+                    record, error = future.result()
+                except Exception as e:
+                    record, error = None, f"Error: {str(e)}"
+                if record is None:
+                    outcomes[future] = (False, error)
+                else:
+                    fetched[future] = record
+            outcomes.update(zip(fetched, _store_records(conn, list(fetched.values()), refresh)))
+            for future in group:
+                success, message = outcomes[future]
+                results.append((futures[future], success, message))
+                if on_result is not None:
+                    on_result(len(results), len(futures), futures[future], success, message)
+    return results
+
+# ================= SEQUENCE BACKFILL =================
+MISSING_SEQUENCES_SQL = """
+SELECT p.protein_id, p.uniprot_id
+FROM protein p
+LEFT JOIN protein_sequence q ON q.protein_id = p.protein_id
+WHERE q.protein_id IS NULL AND p.uniprot_id IS NOT NULL
+"""
+
+def count_missing_sequences(conn):
+    return fetch_all(conn, f"SELECT COUNT(*) FROM ({MISSING_SEQUENCES_SQL})")[0][0]
+
+def backfill_sequences(conn, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, on_result=None):
+    """Fetch and store UniProt sequences for proteins added before the sequence store existed."""
+    rows = conn.execute(MISSING_SEQUENCES_SQL).fetchall()
+    store = store_for(conn)
+    index = index_for(conn)
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_uniprot_data, uniprot_id): (protein_id, uniprot_id)
+                   for protein_id, uniprot_id in rows}
+        for group in _completed_groups(futures, batch_size):
+            outcomes = []
+            after_commit = []
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for future in group:
+                    protein_id, uniprot_id = futures[future]
+                    try:
+                        sequence, _ = future.result()
+                    except requests.RequestException as e:
+                        sequence, message = None, f"Network error: {str(e)}"
+                    else:
+                        message = "UniProt data not found"
+                    if sequence is None:
+                        outcomes.append((uniprot_id, False, message))
+                        continue
+                    sequence = sequence.strip().upper()
+                    offset = store.put(conn, protein_id, uniprot_id, sequence)
+                    after_commit.append(lambda offset=offset, sequence=sequence: index.add(offset, sequence))
+                    outcomes.append((uniprot_id, True, f"{len(sequence)} residues"))
+            run_after_commit(after_commit)
+            for uniprot_id, success, message in outcomes:
+                results.append((uniprot_id, success, message))
+                if on_result is not None:
+                    on_result(len(results), len(futures), uniprot_id, success, message)
+    return results
+
+# ================= COORDINATE BACKFILL =================
+MISSING_COORDINATES_SQL = """
+SELECT p.protein_id, p.pdb_id
+FROM protein p
+JOIN protein_structure s ON s.protein_id = p.protein_id
+LEFT JOIN structure_coordinates c ON c.protein_id = p.protein_id
+WHERE c.protein_id IS NULL
+"""
+
+def count_missing_coordinates(conn):
+    return fetch_all(conn, f"SELECT COUNT(*) FROM ({MISSING_COORDINATES_SQL})")[0][0]
+
+def backfill_coordinates(conn, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE, on_result=None):
+    """Fetch coordinates and compute descriptors for structures added before they were parsed at ingest."""
+    rows = conn.execute(MISSING_COORDINATES_SQL).fetchall()
+    cursor = conn.cursor()
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_geometry, pdb_id): (protein_id, pdb_id) for protein_id, pdb_id in rows}
+        for group in _completed_groups(futures, batch_size):
+            outcomes = []
+            after_commit = []
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for future in group:
+                    protein_id, pdb_id = futures[future]
+                    try:
+                        coords, values = future.result()
+                    except Exception as e:
+                        coords, message = None, f"Error: {str(e)}"
+                    else:
+                        message = "mmCIF file not available"
+                    if coords is None:
+                        outcomes.append((pdb_id, False, message))
+                        continue
+                    store_geometry(cursor, protein_id, coords, values, after_commit)
+                    outcomes.append((pdb_id, True, f"{values['atom_count']} atoms"))
+            run_after_commit(after_commit)
+            for pdb_id, success, message in outcomes:
+                results.append((pdb_id, success, message))
+                if on_result is not None:
+                    on_result(len(results), len(futures), pdb_id, success, message)
+    return results
@@ -0,0 +1,313 @@
+import functools
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+# ================= SETTINGS =================
+# Off by default; the diagnostics page can switch it on for the running process.
+ENABLED = os.environ.get("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+# Percentiles are computed over the most recent WINDOW samples of each series.
+WINDOW = int(os.environ.get("METRICS_WINDOW", 1024))
+QUANTILES = (0.5, 0.95, 0.99)
+# Prometheus text exposition, rewritten at most every EXPORT_SECONDS while
+# samples arrive. Point it into a node_exporter textfile directory, or into
+# static/ to scrape it at app/static/....
+EXPORT_PATH = os.environ.get("METRICS_FILE", os.path.join(".cache", "metrics", "protein_db.prom"))
+EXPORT_SECONDS = float(os.environ.get("METRICS_EXPORT_SECONDS", 15))
+# Distinct statements beyond this many are counted under one "(other)" series.
+MAX_SERIES = 2000
+
+KINDS = {
+    "sql": ("protein_db_sql_seconds", "SQLite statement time, execution plus fetching"),
+    "http": ("protein_db_http_seconds", "Outbound HTTP request time per attempt"),
+    "section": ("protein_db_section_seconds", "Streamlit page section time per rerun"),
+}
+
+_enabled = ENABLED
+
+# ================= SERIES =================
+class Series:
+    """Count, sum and maximum since the last reset, plus a rolling window of samples for percentiles."""
+
+    __slots__ = ("samples", "count", "total", "max", "example")
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.example = None
+
+    def add(self, seconds, example=None):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if example is not None:
+            self.example = example
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._exported_at = 0.0
+        self._export_lock = threading.Lock()
+        self.started_at = time.time()
+
+    def observe(self, kind, name, seconds, example=None):
+        key = (kind, name)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= MAX_SERIES:
+                    key = (kind, "(other)")
+                    series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = Series()
+            series.add(seconds, example)
+        if time.monotonic() - self._exported_at >= EXPORT_SECONDS:
+            self._export()
+
+    def _export(self):
+        # Whichever thread gets here first writes the file; the others move on.
+        if not self._export_lock.acquire(blocking=False):
+            return
+        try:
+            self._exported_at = time.monotonic()
+            write_prometheus(EXPORT_PATH)
+        except OSError:
+            pass
+        finally:
+            self._export_lock.release()
+
+    def snapshot(self, kind=None):
+        """One dict per series (times in milliseconds), slowest total first."""
+        with self._lock:
+            items = [(k, n, s.count, s.total, s.max, s.quantiles()) for (k, n), s in self._series.items()
+                     if kind is None or k == kind]
+        rows = [{"kind": k, "name": n, "count": count, "total_ms": total * 1e3, "mean_ms": total / count * 1e3,
+                 "p50_ms": q[0.5] * 1e3, "p95_ms": q[0.95] * 1e3, "p99_ms": q[0.99] * 1e3, "max_ms": peak * 1e3}
+                for k, n, count, total, peak, q in items]
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def example(self, kind, name):
+        with self._lock:
+            series = self._series.get((kind, name))
+            return None if series is None else series.example
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self.started_at = time.time()
+
+    def series(self):
+        with self._lock:
+            return [(k, n, s.count, s.total, s.quantiles()) for (k, n), s in sorted(self._series.items())]
+
+_registry = Registry()
+
+def get_registry():
+    return _registry
+
+def enabled():
+    return _enabled
+
+def set_enabled(on):
+    global _enabled
+    _enabled = bool(on)
+
+def observe(kind, name, seconds, example=None):
+    if _enabled:
+        _registry.observe(kind, name, seconds, example)
+
+# ================= SQL =================
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+
+@functools.lru_cache(maxsize=4096)
+def statement_name(sql):
+    """Normalized statement text; IN (?, ?, ...) lists of any length share one series."""
+    return _PLACEHOLDER_LIST.sub("?, ...", _WHITESPACE.sub(" ", sql).strip())
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that times each statement from execute() until its rows have been fetched.
+
+    The sample is recorded when the cursor runs its next statement, has
+    fetched everything, is closed or is garbage collected, so rows read
+    with fetchall() / fetchmany() count towards the statement that produced
+    them. While instrumentation is disabled every method goes straight to
+    sqlite3.Cursor.
+    """
+
+    _pending = None
+
+    def _flush(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            _registry.observe("sql", statement_name(pending[0]), pending[2], (pending[0], pending[1]))
+
+    def execute(self, sql, parameters=()):
+        if not _enabled:
+            if self._pending is not None:
+                self._flush()
+            return super().execute(sql, parameters)
+        self._flush()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, parameters, time.perf_counter() - start]
+
+    def executemany(self, sql, seq_of_parameters):
+        if not _enabled:
+            if self._pending is not None:
+                self._flush()
+            return super().executemany(sql, seq_of_parameters)
+        self._flush()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._pending = [sql, None, time.perf_counter() - start]
+
+    def fetchall(self):
+        if self._pending is None:
+            return super().fetchall()
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._pending[2] += time.perf_counter() - start
+        self._flush()
+        return rows
+
+    def fetchmany(self, size=None):
+        if self._pending is None:
+            return super().fetchmany(size or self.arraysize)
+        start = time.perf_counter()
+        rows = super().fetchmany(size or self.arraysize)
+        self._pending[2] += time.perf_counter() - start
+        if not rows:
+            self._flush()
+        return rows
+
+    def close(self):
+        self._flush()
+        super().close()
+
+    def __del__(self):
+        self._flush()
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including those behind conn.execute(), are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute() builds a plain cursor without calling
+    # cursor(), which is also the fastest path while metrics are off.
+    def execute(self, sql, parameters=()):
+        if not _enabled:
+            return super().execute(sql, parameters)
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not _enabled:
+            return super().executemany(sql, seq_of_parameters)
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def query_plan(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN rows for a statement, run on an untimed cursor.
+
+    ``params`` of None (statements recorded from executemany()) binds NULL
+    to every placeholder; the plan rarely depends on the values.
+    """
+    if params is None:
+        params = (None,) * sql.count("?")
+    return sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+
+def format_plan(rows):
+    """EXPLAIN QUERY PLAN rows as an indented tree, like the sqlite3 shell prints it."""
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return "\n".join(lines)
+
+# ================= HTTP =================
+_ID_SEGMENT = re.compile(r"[^/]*\d[^/]*")
+
+def endpoint_name(url):
+    """host/path with every path segment containing a digit (IDs, versions) replaced by {id}."""
+    parts = urlsplit(url)
+    return parts.netloc + _ID_SEGMENT.sub("{id}", parts.path)
+
+# ================= PAGE SECTIONS =================
+class PageTimer:
+    """Times consecutive sections of one script run: section("b") ends section "a" and starts "b"."""
+
+    def __init__(self, page):
+        self.page = page
+        self._start = self._mark = time.perf_counter()
+        self._section = None
+
+    def section(self, name):
+        now = time.perf_counter()
+        if self._section is not None:
+            observe("section", f"{self.page}: {self._section}", now - self._mark)
+        self._section, self._mark = name, now
+
+    def finish(self):
+        """End the last section and record the whole run as "<page>: (total)"."""
+        self.section(None)
+        observe("section", f"{self.page}: (total)", self._mark - self._start)
+
+class _NoTimer:
+    def section(self, name):
+        pass
+
+    def finish(self):
+        pass
+
+_NO_TIMER = _NoTimer()
+
+def page_timer(page):
+    """A PageTimer for this script run, or a no-op stand-in while instrumentation is disabled."""
+    return PageTimer(page) if _enabled else _NO_TIMER
+
+# ================= PROMETHEUS =================
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_prometheus():
+    """All series in the Prometheus text exposition format, as summaries with p50 / p95 / p99."""
+    by_kind = {}
+    for kind, name, count, total, quantiles in _registry.series():
+        by_kind.setdefault(kind, []).append((name, count, total, quantiles))
+    lines = []
+    for kind, (metric, help_text) in KINDS.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} summary"]
+        for name, count, total, quantiles in by_kind.get(kind, []):
+            label = f'name="{_label(name)}"'
+            lines += [f'{metric}{{{label},quantile="{q}"}} {v:.6f}' for q, v in quantiles.items()]
+            lines += [f"{metric}_sum{{{label}}} {total:.6f}", f"{metric}_count{{{label}}} {count}"]
+    return "\n".join(lines) + "\n"
+
+def write_prometheus(path=EXPORT_PATH):
+    """Atomically replace path with render_prometheus()."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
@@ -0,0 +1,359 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from protein_db.db import DB_NAME, get_connection
+from protein_db.ingest import DEFAULT_WORKERS, backfill_coordinates, ingest_batch
+from protein_db.properties import recompute_database
+from protein_db.query_cache import bump_generation
+from protein_db.sequence_store import store_for
+
+# ================= SETTINGS =================
+WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+# A failed attempt waits RETRY_DELAY seconds per attempt so far before the next.
+RETRY_DELAY = int(os.environ.get("JOB_RETRY_DELAY", 30))
+IDLE_POLL_SECONDS = 1.0
+# Progress and heartbeats of running jobs are written this often.
+HEARTBEAT_SECONDS = 2.0
+# A running job of another runner whose heartbeat is older than this is
+# requeued once the process that claimed it has exited.
+STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", 120))
+# Ingestion jobs store every INGEST_BATCH_SIZE fetched records in one short
+# transaction; the fetches themselves run before it begins.
+INGEST_BATCH_SIZE = 25
+INGEST_CHUNK = 100
+# Bookkeeping writes give up quickly rather than wait behind a long write transaction.
+BOOKKEEPING_TIMEOUT = 0.5
+MAX_FAILURES_KEPT = 200
+
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+class JobCancelled(Exception):
+    pass
+
+# ================= HANDLERS =================
+# handler(conn, payload, progress) -> (summary message, result dict or None).
+# progress(done, total, message=None) raises JobCancelled once a cancel is requested.
+def _ingest(conn, payload, progress, refresh=False):
+    pdb_ids = payload["pdb_ids"]
+    if not refresh:
+        # A retried job skips what an earlier attempt already stored.
+        stored = {row[0] for row in conn.execute(
+            "SELECT pdb_id FROM protein WHERE pdb_id IN (SELECT value FROM json_each(?))", (json.dumps(pdb_ids),))}
+        pdb_ids = [pdb_id for pdb_id in pdb_ids if pdb_id not in stored]
+    progress(0, len(pdb_ids))
+    results = []
+    # Fetches already submitted finish before a cancel takes effect, so
+    # IDs go to ingest_batch() a chunk at a time.
+    for start in range(0, len(pdb_ids), INGEST_CHUNK):
+        results += ingest_batch(
+            conn, pdb_ids[start:start + INGEST_CHUNK], workers=payload.get("workers", DEFAULT_WORKERS),
+            batch_size=INGEST_BATCH_SIZE, refresh=refresh,
+            on_result=lambda done, total, pdb_id, success, message:
+                progress(start + done, len(pdb_ids), f"{pdb_id}: {message}"))
+    failures = [(pdb_id, message) for pdb_id, success, message in results if not success]
+    skipped = len(payload["pdb_ids"]) - len(pdb_ids)
+    summary = f"{len(results) - len(failures)} stored, {len(failures)} failed" + (
+        f", {skipped} already stored" if skipped else "")
+    return summary, {"failures": failures[:MAX_FAILURES_KEPT]}
+
+def _refresh(conn, payload, progress):
+    return _ingest(conn, payload, progress, refresh=True)
+
+def _recompute(conn, payload, progress):
+    updated = recompute_database(conn, store_for(conn), on_progress=progress)
+    bump_generation()
+    return f"Recomputed properties for {updated} proteins", None
+
+def _coordinates(conn, payload, progress):
+    results = backfill_coordinates(
+        conn, batch_size=INGEST_BATCH_SIZE,
+        on_result=lambda done, total, pdb_id, success, message: progress(done, total, f"{pdb_id}: {message}"))
+    failures = [(pdb_id, message) for pdb_id, success, message in results if not success]
+    return (f"Stored coordinates for {len(results) - len(failures)} structures, {len(failures)} failed",
+            {"failures": failures[:MAX_FAILURES_KEPT]})
+
+# kind -> (label, handler)
+KINDS = {
+    "ingest": ("Ingest", _ingest),
+    "refresh": ("Refresh", _refresh),
+    "recompute": ("Recompute properties", _recompute),
+    "coordinates": ("Fetch coordinates", _coordinates),
+}
+
+# ================= QUEUE =================
+def enqueue(conn, kind, payload=None, max_attempts=MAX_ATTEMPTS):
+    """Add a job and commit. Returns its job_id."""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    now = time.time()
+    with conn:
+        job_id = conn.execute("""
+        INSERT INTO job (kind, payload, max_attempts, created_at, run_after)
+        VALUES (?, ?, ?, ?, ?)
+        RETURNING job_id
+        """, (kind, json.dumps(payload or {}), max_attempts, now, now)).fetchone()[0]
+    if _runner is not None:
+        _runner.wake()
+    return job_id
+
+JOB_COLUMNS = ("job_id", "kind", "status", "attempts", "max_attempts", "progress_done", "progress_total",
+               "message", "error", "result", "cancel_requested", "created_at", "started_at", "finished_at")
+
+def list_jobs(conn, limit=50):
+    """The most recent jobs as dicts, newest first, with live progress for jobs running in this process."""
+    rows = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM job ORDER BY job_id DESC LIMIT ?",
+                        (limit,)).fetchall()
+    jobs = [dict(zip(JOB_COLUMNS, row)) for row in rows]
+    live = _runner.live() if _runner is not None else {}
+    for job in jobs:
+        if job["status"] == "running" and job["job_id"] in live:
+            job["progress_done"], job["progress_total"], job["message"] = live[job["job_id"]]
+    return jobs
+
+def status_counts(conn):
+    return dict(conn.execute("SELECT status, COUNT(*) FROM job GROUP BY status").fetchall())
+
+def cancel(conn, job_id):
+    """Cancel a queued job at once; a running job stops at its next progress report."""
+    with conn:
+        conn.execute("""
+        UPDATE job SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'
+        """, (time.time(), job_id))
+        conn.execute("UPDATE job SET cancel_requested = 1 WHERE job_id = ? AND status = 'running'", (job_id,))
+    if _runner is not None:
+        _runner.request_cancel(job_id)
+
+def retry(conn, job_id):
+    """Put a failed or cancelled job back in the queue with a fresh attempt budget."""
+    now = time.time()
+    with conn:
+        conn.execute("""
+        UPDATE job SET status = 'queued', attempts = 0, cancel_requested = 0, error = NULL,
+               run_after = ?, finished_at = NULL
+        WHERE job_id = ? AND status IN ('failed', 'cancelled')
+        """, (now, job_id))
+    if _runner is not None:
+        _runner.wake()
+
+def clear_finished(conn):
+    """Delete done, failed and cancelled jobs. Returns how many were removed."""
+    with conn:
+        return conn.execute("DELETE FROM job WHERE status IN ('done', 'failed', 'cancelled')").rowcount
+
+# ================= RUNNER =================
+def _owner_alive(owner):
+    """Whether the process behind a job's owner ("<pid>-<token>") is still running.
+
+    WAL databases are only shared by processes on one host, so the pid says
+    enough. Where it cannot be checked, a stale heartbeat counts as dead.
+    """
+    if not owner or os.name != "posix":
+        return False
+    pid = int(owner.split("-", 1)[0])
+    if pid == os.getpid():
+        # An earlier run of this server that got the same pid, as PID 1 in a container does.
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class JobRunner:
+    """Worker threads that claim queued jobs and run them outside any Streamlit script run.
+
+    Jobs write through the worker's pooled connection. Claims, progress and
+    heartbeats go through separate autocommit connections, but SQLite has a
+    single writer: while a job holds a write transaction (one batch of
+    ingested records, one chunk of recomputed properties) none of them can
+    be written. Progress is therefore
+    kept in memory, where list_jobs() reads it, and a heartbeat thread
+    writes it whenever the database is free. Each claimed job records the
+    runner as its owner, so another runner never requeues it while this
+    process is alive, however stale its heartbeat.
+    """
+
+    def __init__(self, path=DB_NAME, workers=WORKERS):
+        self.path = path
+        self.workers = workers
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._threads = []
+        self._live = {}
+        self._cancelled = set()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            threading.Thread(target=self._beat_loop, name="job-heartbeat", daemon=True).start()
+
+    def wake(self):
+        self._wake.set()
+
+    def request_cancel(self, job_id):
+        with self._lock:
+            if job_id in self._live:
+                self._cancelled.add(job_id)
+
+    def live(self):
+        with self._lock:
+            return dict(self._live)
+
+    # ---------- bookkeeping ----------
+    def _bookkeeping(self):
+        conn = sqlite3.connect(self.path, timeout=BOOKKEEPING_TIMEOUT, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _requeue_stale(self, book):
+        # Jobs of this runner are never stale: they are tracked in memory.
+        now = time.time()
+        stale = [job_id for job_id, owner in book.execute("""
+        SELECT job_id, owner FROM job WHERE status = 'running' AND IFNULL(heartbeat_at, 0) < ?
+        """, (now - STALE_SECONDS,)).fetchall() if owner != self.owner and not _owner_alive(owner)]
+        if stale:
+            book.execute(f"""
+            UPDATE job SET status = 'queued', run_after = ?, message = 'Requeued after its worker stopped'
+            WHERE status = 'running' AND job_id IN ({", ".join("?" * len(stale))})
+            """, (now, *stale))
+
+    def _claim(self, book):
+        now = time.time()
+        return book.execute("""
+        UPDATE job SET status = 'running', attempts = attempts + 1, started_at = ?, heartbeat_at = ?,
+               owner = ?, progress_done = 0, progress_total = NULL, message = NULL
+        WHERE job_id = (
+            SELECT job_id FROM job WHERE status = 'queued' AND run_after <= ? ORDER BY job_id LIMIT 1
+        )
+        RETURNING job_id, kind, payload, attempts, max_attempts
+        """, (now, now, self.owner, now)).fetchone()
+
+    def _write(self, book, sql, params):
+        # Best effort: a busy database only delays the next progress write.
+        try:
+            book.execute(sql, params)
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _beat(self, book):
+        """Write progress and heartbeats of this runner's jobs, and pick up cancel requests."""
+        live = self.live()
+        if not live:
+            return
+        now = time.time()
+        try:
+            book.executemany("""
+            UPDATE job SET progress_done = ?, progress_total = ?, message = ?, heartbeat_at = ?
+            WHERE job_id = ? AND status = 'running' AND owner = ?
+            """, [(done, total, message, now, job_id, self.owner)
+                  for job_id, (done, total, message) in live.items()])
+            requested = [job_id for job_id, in book.execute("""
+            SELECT job_id FROM job WHERE cancel_requested = 1 AND job_id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(list(live)),))]
+        except sqlite3.OperationalError:
+            # Busy behind a write transaction; the next beat tries again.
+            return
+        with self._lock:
+            self._cancelled.update(job_id for job_id in requested if job_id in self._live)
+
+    def _beat_loop(self):
+        book = self._bookkeeping()
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            self._beat(book)
+
+    # ---------- work ----------
+    def _loop(self):
+        conn = get_connection(self.path)
+        book = self._bookkeeping()
+        while True:
+            try:
+                self._requeue_stale(book)
+                job = self._claim(book)
+            except sqlite3.OperationalError:
+                job = None
+            if job is None:
+                self._wake.wait(IDLE_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self._run(conn, book, *job)
+
+    def _run(self, conn, book, job_id, kind, payload, attempts, max_attempts):
+        def progress(done, total, message=None):
+            # Memory only: the heartbeat thread writes it, and reads cancel requests.
+            with self._lock:
+                self._live[job_id] = (done, total, message)
+                cancelled = job_id in self._cancelled
+            if cancelled:
+                raise JobCancelled()
+
+        with self._lock:
+            self._live[job_id] = (0, None, None)
+            # A cancel aimed at an earlier attempt does not carry over to a retry.
+            self._cancelled.discard(job_id)
+        try:
+            message, result = KINDS[kind][1](conn, json.loads(payload), progress)
+        except JobCancelled:
+            conn.rollback()
+            status, message, result, error, run_after = "cancelled", "Cancelled", None, None, None
+        except Exception as e:
+            conn.rollback()
+            error = f"{type(e).__name__}: {e}"
+            if attempts < max_attempts:
+                status, run_after = "queued", time.time() + RETRY_DELAY * attempts
+                message, result = f"Attempt {attempts} failed; retrying", None
+            else:
+                status, message, result, run_after = "failed", "Failed", None, None
+        else:
+            status, error, run_after = "done", None, None
+        done, total, _ = self.live().get(job_id, (0, None, None))
+        finished = None if status == "queued" else time.time()
+        # The outcome must be recorded; keep trying until the database is free.
+        while not self._write(book, """
+        UPDATE job SET status = ?, message = ?, error = ?, result = ?, progress_done = ?, progress_total = ?,
+               run_after = IFNULL(?, run_after), finished_at = ?, heartbeat_at = ?
+        WHERE job_id = ?
+        """, (status, message, error, json.dumps(result) if result is not None else None, done, total,
+              run_after, finished, time.time(), job_id)):
+            time.sleep(BOOKKEEPING_TIMEOUT)
+        with self._lock:
+            self._live.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {"workers": len(self._threads), "running": len(self._live), "owner": self.owner}
+
+# ================= SHARED RUNNER =================
+_runner = None
+_runner_lock = threading.Lock()
+
+def start_runner(path=DB_NAME):
+    """Start this process's worker threads once; later calls return the same runner.
+
+    The connection pool calls this when it opens its first connection, so
+    every process that serves pages runs workers. They run nowhere else:
+    the query cache and the k-mer and shape indexes are in-memory and only
+    see writes made in their own process.
+    """
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(path)
+        _runner.start()
+        return _runner
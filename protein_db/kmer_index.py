@@ -0,0 +1,276 @@
+import re
+import threading
+
+import numpy as np
+
+from protein_db.sequence_store import store_for
+
+# ================= LAYOUT =================
+# Seeds are k-mers over the 20 standard residues, encoded base-20 as ints.
+# Stored sequences are indexed on non-overlapping k-mers (every K-th
+# position) and queries use every overlapping k-mer, so any exact match of
+# 2K-1 residues or more is seeded at least once.
+#
+# Postings are CSR arrays: entries for code c are entry_slot/entry_pos
+# [starts[c]:starts[c+1]]. A slot is one distinct byte range of the sequence
+# file (identical sequences share a range, see sequence_store.py), so a
+# slot maps back to every protein that has that sequence via
+# protein_sequence.seq_offset. Sequences added after the build go into a
+# small dict-based delta that is merged into the arrays once it grows;
+# deleted ranges are masked out until the next rebuild.
+K = 4
+ALPHABET = "ACDEFGHIKLMNPQRSTVWY"
+NUM_CODES = len(ALPHABET) ** K
+DIAGONAL_BAND = 8
+MIN_SEEDS = 2
+# Query k-mers with more postings than this (low-complexity repeats) are skipped.
+MAX_POSTINGS = 100000
+MERGE_THRESHOLD = 200000
+BUILD_CHUNK = 20000
+
+_CODE = np.full(256, -1, dtype=np.int64)
+for _i, _residue in enumerate(ALPHABET):
+    _CODE[ord(_residue)] = _i
+    _CODE[ord(_residue.lower())] = _i
+
+def _weights(k):
+    return len(ALPHABET) ** np.arange(k - 1, -1, -1, dtype=np.int64)
+
+_WEIGHTS = _weights(K)
+
+def clean_sequence(text):
+    """Residue letters from pasted text, dropping FASTA header lines, whitespace and numbering."""
+    lines = [line for line in text.splitlines() if not line.startswith(">")]
+    return re.sub(r"[^A-Za-z]", "", "".join(lines)).upper()
+
+def kmer_codes(residues, k=K):
+    """Code of the k-mer starting at every position of a uint8 array; -1 where it has a non-standard residue."""
+    if len(residues) < k:
+        return np.empty(0, dtype=np.int64)
+    windows = np.lib.stride_tricks.sliding_window_view(_CODE[residues], k)
+    return np.where((windows >= 0).all(axis=1), windows @ _weights(k), -1)
+
+def _codes_at(residues, starts):
+    """kmer_codes() evaluated only at the given start positions."""
+    codes = np.zeros(len(starts), dtype=np.int64)
+    valid = np.ones(len(starts), dtype=bool)
+    for j, weight in enumerate(_WEIGHTS.tolist()):
+        values = _CODE[residues[starts + j]]
+        valid &= values >= 0
+        codes += values * weight
+    return np.where(valid, codes, -1)
+
+def _place(codes, fill):
+    """Destination of each entry in CSR arrays whose next free slot per code is fill; advances fill.
+
+    Order within a posting list does not matter to search(), so an unstable sort is fine.
+    """
+    order = np.argsort(codes)
+    ordered = codes[order]
+    rank = np.arange(len(codes)) - np.searchsorted(ordered, ordered)
+    dest = np.empty(len(codes), dtype=np.int64)
+    dest[order] = fill[ordered] + rank
+    fill += np.bincount(codes, minlength=len(fill))
+    return dest
+
+def _seed_positions(lengths):
+    """(sequence index, position) of every non-overlapping seed for sequences of the given lengths."""
+    counts = np.where(lengths >= K, (lengths - K) // K + 1, 0)
+    owner = np.repeat(np.arange(len(lengths)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, (np.arange(counts.sum()) - first) * K
+
+class KmerIndex:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._built = False
+        self._starts = np.zeros(NUM_CODES + 1, dtype=np.int64)
+        self._entry_slot = np.empty(0, dtype=np.int32)
+        self._entry_pos = np.empty(0, dtype=np.int32)
+        self._offsets = []
+        self._slot_of = {}
+        self._dead = np.zeros(0, dtype=bool)
+        self._delta = {}
+        self._delta_size = 0
+
+    # ---------- build ----------
+    def build(self, conn):
+        """Index every distinct stored sequence from scratch."""
+        with self._lock:
+            self._build(conn)
+
+    def ensure_built(self, conn):
+        with self._lock:
+            if not self._built:
+                self._build(conn)
+
+    def _build(self, conn):
+        # Runs under _lock so that add() calls made meanwhile wait for the
+        # new arrays instead of being dropped. Two passes over the sequence
+        # file (count, then scatter) keep peak memory near the final size.
+        rows = conn.execute("""
+        SELECT seq_offset, MAX(seq_length) FROM protein_sequence GROUP BY seq_offset ORDER BY seq_offset
+        """).fetchall()
+        offsets = np.array([r[0] for r in rows], dtype=np.int64)
+        lengths = np.array([r[1] for r in rows], dtype=np.int64)
+        counts = np.zeros(NUM_CODES, dtype=np.int64)
+        for codes, _, _ in self._seeds(offsets, lengths):
+            counts += np.bincount(codes, minlength=NUM_CODES)
+        self._reset()
+        np.cumsum(counts, out=self._starts[1:])
+        self._entry_slot = np.empty(self._starts[-1], dtype=np.int32)
+        self._entry_pos = np.empty(self._starts[-1], dtype=np.int32)
+        fill = self._starts[:-1].copy()
+        for codes, slots, positions in self._seeds(offsets, lengths):
+            dest = _place(codes, fill)
+            self._entry_slot[dest] = slots
+            self._entry_pos[dest] = positions
+        self._offsets = offsets.tolist()
+        self._slot_of = {offset: slot for slot, offset in enumerate(self._offsets)}
+        self._dead = np.zeros(len(self._offsets), dtype=bool)
+        self._built = True
+
+    def _seeds(self, offsets, lengths):
+        """Yield (codes, slots, positions) of the valid seeds, BUILD_CHUNK sequences at a time."""
+        for first in range(0, len(offsets), BUILD_CHUNK):
+            chunk = slice(first, first + BUILD_CHUNK)
+            owner, pos = _seed_positions(lengths[chunk])
+            if len(pos) == 0:
+                continue
+            base = int(offsets[chunk][0])
+            end = int((offsets[chunk] + lengths[chunk]).max())
+            block = np.frombuffer(self.store.read_range(base, end - base), dtype=np.uint8)
+            codes = _codes_at(block, offsets[chunk][owner] - base + pos)
+            keep = codes >= 0
+            yield codes[keep], (owner[keep] + first).astype(np.int32), pos[keep].astype(np.int32)
+
+    @property
+    def built(self):
+        return self._built
+
+    # ---------- incremental updates ----------
+    def add(self, offset, sequence):
+        """Index a newly stored sequence range. Ignored until the index has been built."""
+        data = np.frombuffer(sequence.encode("ascii") if isinstance(sequence, str) else sequence, dtype=np.uint8)
+        with self._lock:
+            if not self._built:
+                return
+            slot = self._slot_of.get(offset)
+            if slot is not None:
+                self._dead[slot] = False
+                return
+            slot = self._slot_of[offset] = len(self._offsets)
+            self._offsets.append(offset)
+            self._dead = np.append(self._dead, False)
+            codes = kmer_codes(data)[::K]
+            for pos, code in enumerate(codes.tolist()):
+                if code >= 0:
+                    self._delta.setdefault(code, []).append((slot, pos * K))
+                    self._delta_size += 1
+            if self._delta_size >= MERGE_THRESHOLD:
+                self._merge_delta()
+
+    def _merge_delta(self):
+        delta_codes = np.array([c for c, hits in self._delta.items() for _ in hits], dtype=np.int64)
+        delta_hits = np.array([h for hits in self._delta.values() for h in hits], dtype=np.int32).reshape(-1, 2)
+        old_starts, old_counts = self._starts, np.diff(self._starts)
+        starts = np.zeros(NUM_CODES + 1, dtype=np.int64)
+        np.cumsum(old_counts + np.bincount(delta_codes, minlength=NUM_CODES), out=starts[1:])
+        entry_slot = np.empty(starts[-1], dtype=np.int32)
+        entry_pos = np.empty(starts[-1], dtype=np.int32)
+        # Existing postings keep their place in each list; delta entries follow them.
+        existing = np.repeat(np.arange(NUM_CODES), old_counts)
+        dest = starts[existing] + np.arange(len(existing)) - old_starts[existing]
+        entry_slot[dest] = self._entry_slot
+        entry_pos[dest] = self._entry_pos
+        dest = _place(delta_codes, starts[:-1] + old_counts)
+        entry_slot[dest] = delta_hits[:, 0]
+        entry_pos[dest] = delta_hits[:, 1]
+        self._starts, self._entry_slot, self._entry_pos = starts, entry_slot, entry_pos
+        self._delta = {}
+        self._delta_size = 0
+
+    def discard(self, conn, offset):
+        """Drop a sequence range from results once no protein references it any more."""
+        with self._lock:
+            slot = self._slot_of.get(offset)
+            if slot is None:
+                return
+            still_used = conn.execute(
+                "SELECT 1 FROM protein_sequence WHERE seq_offset = ? LIMIT 1", (offset,)
+            ).fetchone()
+            if still_used is None:
+                self._dead[slot] = True
+
+    def invalidate(self):
+        """Forget everything; the next search rebuilds. Needed after the sequence file is compacted."""
+        with self._lock:
+            self._reset()
+
+    # ---------- search ----------
+    def search(self, sequence, limit=50):
+        """Rank indexed sequences by their best diagonal band of seed hits.
+
+        Returns a list of (seq_offset, seeds, diagonal), best first, where
+        seeds is the number of shared k-mers on the best band and diagonal is
+        the database position minus the query position at that band.
+        """
+        query = np.frombuffer(clean_sequence(sequence).encode("ascii"), dtype=np.uint8)
+        codes = kmer_codes(query)
+        query_pos = np.flatnonzero(codes >= 0)
+        codes = codes[query_pos]
+        with self._lock:
+            begin = self._starts[codes]
+            sizes = self._starts[codes + 1] - begin
+            common = sizes <= MAX_POSTINGS
+            begin, sizes, hit_query = begin[common], sizes[common], query_pos[common]
+            index = np.repeat(begin - (np.cumsum(sizes) - sizes), sizes) + np.arange(sizes.sum())
+            slots = self._entry_slot[index]
+            diagonals = self._entry_pos[index] - np.repeat(hit_query, sizes)
+            extra = [(slot, pos - q) for q, code in zip(query_pos.tolist(), codes.tolist())
+                     for slot, pos in self._delta.get(code, ())]
+            if extra:
+                extra = np.array(extra, dtype=np.int64)
+                slots = np.concatenate([slots, extra[:, 0].astype(np.int32)])
+                diagonals = np.concatenate([diagonals, extra[:, 1].astype(np.int32)])
+            alive = ~self._dead[slots]
+            slots, diagonals = slots[alive], diagonals[alive]
+            offsets = self._offsets
+        if len(slots) == 0:
+            return []
+        bands = diagonals.astype(np.int64) // DIAGONAL_BAND
+        keys, seeds = np.unique((slots.astype(np.int64) << 32) | (bands & 0xFFFFFFFF), return_counts=True)
+        key_slots = keys >> 32
+        # Per slot, keep the band with the most seeds.
+        order = np.lexsort((-seeds, key_slots))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = key_slots[order][1:] != key_slots[order][:-1]
+        best = order[first]
+        best = best[seeds[best] >= MIN_SEEDS]
+        best = best[np.argsort(-seeds[best], kind="stable")[:limit]]
+        band_of = ((keys[best] & 0xFFFFFFFF).astype(np.uint32).astype(np.int32)).astype(np.int64)
+        return [(offsets[int(s)], int(n), int(b) * DIAGONAL_BAND)
+                for s, n, b in zip(key_slots[best], seeds[best], band_of)]
+
+    def stats(self):
+        with self._lock:
+            return {"built": self._built, "sequences": len(self._offsets) - int(self._dead.sum()),
+                    "postings": len(self._entry_slot) + self._delta_size, "delta": self._delta_size,
+                    "bytes": self._entry_slot.nbytes + self._entry_pos.nbytes + self._starts.nbytes}
+
+# ================= SHARED INDEXES =================
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def index_for(conn):
+    """The KmerIndex over conn's sequence store, created once per process and built on first search."""
+    store = store_for(conn)
+    with _indexes_lock:
+        index = _indexes.get(store.path)
+        if index is None:
+            index = _indexes[store.path] = KmerIndex(store)
+        return index
@@ -0,0 +1,93 @@
+from protein_db.query_cache import read_sql
+from protein_db.search import build_match_query
+
+# ================= SORTING =================
+# key -> (label, sort expression). Each expression has a matching index in
+# migrations/0004_listing_sort_indexes.sql. NULLs are folded to '' so keyset
+# comparisons never hit NULL; in SQLite '' sorts after every number, so
+# numeric NULLs come last.
+SORT_COLUMNS = {
+    "protein_id": ("Date Added", "p.protein_id"),
+    "pdb_id": ("PDB ID", "IFNULL(p.pdb_id, '')"),
+    "protein_name": ("Protein Name", "IFNULL(p.protein_name, '')"),
+    "organism": ("Organism", "IFNULL(p.organism, '')"),
+    "aa_length": ("AA Length", "IFNULL(p.aa_length, '')"),
+    "molecular_weight": ("Molecular Weight", "IFNULL(p.molecular_weight, '')"),
+}
+
+METHODS = [
+    "X-RAY DIFFRACTION",
+    "ELECTRON MICROSCOPY",
+    "SOLUTION NMR",
+    "SOLID-STATE NMR",
+    "NEUTRON DIFFRACTION",
+    "ELECTRON CRYSTALLOGRAPHY",
+    "FIBER DIFFRACTION",
+]
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+LISTING_COLUMNS = """
+    p.protein_name, p.pdb_id, p.uniprot_id, p.organism, p.aa_length,
+    p.molecular_weight, s.method, s.resolution, s.ligand_present
+"""
+
+# ================= FILTERS =================
+def filter_clauses(text=None, method=None, ligand=None):
+    """(WHERE clauses, parameters) for the listing filters, over ``protein p`` and ``protein_structure s``."""
+    where, params = [], []
+    if text:
+        match = build_match_query(text)
+        if match:
+            where.append("p.protein_id IN (SELECT rowid FROM protein_fts WHERE protein_fts MATCH ?)")
+            params.append(match)
+    if method:
+        where.append("s.method = ?")
+        params.append(method)
+    if ligand is not None:
+        where.append("s.ligand_present = ?")
+        params.append(int(ligand))
+    return where, params
+
+# ================= PAGES =================
+def _plain(value):
+    # numpy scalar -> Python value so the cursor can be bound as a parameter
+    return value.item() if hasattr(value, "item") else value
+
+def fetch_page(conn, sort="protein_id", descending=False, after=None, page_size=50,
+               text=None, method=None, ligand=None):
+    """One page of the protein/structure listing using keyset pagination.
+
+    ``after`` is the cursor returned for the previous page. Only
+    ``page_size + 1`` rows are read (the extra one tells us whether a next
+    page exists), so the cost does not grow with table size. Returns
+    (DataFrame, next_cursor); next_cursor is None on the last page.
+    """
+    _, key = SORT_COLUMNS[sort]
+    direction, op = ("DESC", "<") if descending else ("ASC", ">")
+    where, params = [], []
+    if after is not None:
+        # The plain bound lets SQLite seek the expression index; the row-value
+        # comparison breaks ties on protein_id.
+        where.append(f"{key} {op}= ? AND ({key}, p.protein_id) {op} (?, ?)")
+        params.extend([after[0], after[0], after[1]])
+    filters, filter_params = filter_clauses(text, method, ligand)
+    where += filters
+    params += filter_params
+    # CROSS JOIN keeps protein as the outer loop so the sort index drives the scan.
+    sql = f"""
+    SELECT {LISTING_COLUMNS}, {key} AS sort_key, p.protein_id AS row_id
+    FROM protein p
+    CROSS JOIN protein_structure s ON p.protein_id = s.protein_id
+    {"WHERE " + " AND ".join(where) if where else ""}
+    ORDER BY {key} {direction}, p.protein_id {direction}
+    LIMIT ?
+    """
+    params.append(page_size + 1)
+    df = read_sql(conn, sql, tuple(params))
+    next_cursor = None
+    if len(df) > page_size:
+        last = df.iloc[page_size - 1]
+        next_cursor = (_plain(last["sort_key"]), int(last["row_id"]))
+        df = df.iloc[:page_size]
+    return df.drop(columns=["sort_key", "row_id"]), next_cursor
@@ -0,0 +1,20 @@
+-- Original protein / protein_structure tables, previously created by pages/admin.py.
+CREATE TABLE IF NOT EXISTS protein (
+    protein_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    protein_name TEXT,
+    pdb_id TEXT UNIQUE,
+    uniprot_id TEXT,
+    organism TEXT,
+    function TEXT,
+    aa_length INTEGER,
+    molecular_weight REAL
+);
+
+CREATE TABLE IF NOT EXISTS protein_structure (
+    structure_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    protein_id INTEGER,
+    method TEXT,
+    resolution REAL,
+    ligand_present INTEGER,
+    FOREIGN KEY (protein_id) REFERENCES protein(protein_id)
+);
@@ -0,0 +1,18 @@
+-- Store every pdb_id trimmed and upper-case so lookups can compare against
+-- UPPER(?) and use the UNIQUE index. Rows that only differed by case are
+-- collapsed onto the oldest one.
+DELETE FROM protein_structure WHERE protein_id IN (
+    SELECT protein_id FROM protein WHERE protein_id NOT IN (
+        SELECT MIN(protein_id) FROM protein GROUP BY UPPER(TRIM(pdb_id))
+    )
+);
+
+DELETE FROM protein WHERE protein_id NOT IN (
+    SELECT MIN(protein_id) FROM protein GROUP BY UPPER(TRIM(pdb_id))
+);
+
+UPDATE protein SET pdb_id = UPPER(TRIM(pdb_id)) WHERE pdb_id <> UPPER(TRIM(pdb_id));
+
+-- Covers the protein -> protein_structure join so it never touches the table.
+CREATE INDEX IF NOT EXISTS idx_protein_structure_protein
+    ON protein_structure(protein_id, structure_id, method, resolution, ligand_present);
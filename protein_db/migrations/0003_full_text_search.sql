@@ -0,0 +1,30 @@
+-- External-content FTS5 index over protein; the triggers keep it in sync
+-- so the table itself is never written to directly.
+CREATE VIRTUAL TABLE IF NOT EXISTS protein_fts USING fts5(
+    protein_name, function, organism,
+    content='protein', content_rowid='protein_id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS protein_fts_ai AFTER INSERT ON protein BEGIN
+    INSERT INTO protein_fts(rowid, protein_name, function, organism)
+    VALUES (new.protein_id, new.protein_name, new.function, new.organism);
+END;
+
+CREATE TRIGGER IF NOT EXISTS protein_fts_ad AFTER DELETE ON protein BEGIN
+    INSERT INTO protein_fts(protein_fts, rowid, protein_name, function, organism)
+    VALUES ('delete', old.protein_id, old.protein_name, old.function, old.organism);
+END;
+
+CREATE TRIGGER IF NOT EXISTS protein_fts_au AFTER UPDATE OF protein_name, function, organism ON protein BEGIN
+    INSERT INTO protein_fts(protein_fts, rowid, protein_name, function, organism)
+    VALUES ('delete', old.protein_id, old.protein_name, old.function, old.organism);
+    INSERT INTO protein_fts(rowid, protein_name, function, organism)
+    VALUES (new.protein_id, new.protein_name, new.function, new.organism);
+END;
+
+INSERT INTO protein_fts(protein_fts) VALUES ('rebuild');
+
+-- Column weights for bm25(): protein_name, function, organism.
+INSERT INTO protein_fts(protein_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)');
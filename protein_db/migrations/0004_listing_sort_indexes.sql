@@ -0,0 +1,7 @@
+-- One index per listing.SORT_COLUMNS expression, so keyset pages in the
+-- admin table are index seeks.
+CREATE INDEX IF NOT EXISTS idx_protein_sort_pdb_id ON protein(IFNULL(pdb_id, ''), protein_id);
+CREATE INDEX IF NOT EXISTS idx_protein_sort_name ON protein(IFNULL(protein_name, ''), protein_id);
+CREATE INDEX IF NOT EXISTS idx_protein_sort_organism ON protein(IFNULL(organism, ''), protein_id);
+CREATE INDEX IF NOT EXISTS idx_protein_sort_aa_length ON protein(IFNULL(aa_length, ''), protein_id);
+CREATE INDEX IF NOT EXISTS idx_protein_sort_mw ON protein(IFNULL(molecular_weight, ''), protein_id);
@@ -0,0 +1,88 @@
+-- stat_counter holds whole-database totals and stat_breakdown per-method and
+-- per-organism counts. Triggers on protein / protein_structure keep both
+-- current so the admin dashboard reads a handful of rows instead of counting.
+CREATE TABLE IF NOT EXISTS stat_counter (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS stat_breakdown (
+    dimension TEXT NOT NULL,
+    label TEXT NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, label)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS stat_protein_ai AFTER INSERT ON protein BEGIN
+    UPDATE stat_counter SET value = value + 1 WHERE name = 'proteins';
+    INSERT INTO stat_breakdown (dimension, label, value)
+    VALUES ('organism', IFNULL(new.organism, 'Unknown'), 1)
+    ON CONFLICT (dimension, label) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stat_protein_ad AFTER DELETE ON protein BEGIN
+    UPDATE stat_counter SET value = value - 1 WHERE name = 'proteins';
+    UPDATE stat_breakdown SET value = value - 1
+    WHERE dimension = 'organism' AND label = IFNULL(old.organism, 'Unknown');
+    DELETE FROM stat_breakdown WHERE dimension = 'organism' AND value <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stat_protein_au AFTER UPDATE OF organism ON protein
+WHEN IFNULL(old.organism, 'Unknown') <> IFNULL(new.organism, 'Unknown') BEGIN
+    UPDATE stat_breakdown SET value = value - 1
+    WHERE dimension = 'organism' AND label = IFNULL(old.organism, 'Unknown');
+    INSERT INTO stat_breakdown (dimension, label, value)
+    VALUES ('organism', IFNULL(new.organism, 'Unknown'), 1)
+    ON CONFLICT (dimension, label) DO UPDATE SET value = value + 1;
+    DELETE FROM stat_breakdown WHERE dimension = 'organism' AND value <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stat_structure_ai AFTER INSERT ON protein_structure BEGIN
+    UPDATE stat_counter SET value = value + 1 WHERE name = 'structures';
+    UPDATE stat_counter SET value = value + 1
+    WHERE name = CASE WHEN new.ligand_present = 1
+                      THEN 'structures_with_ligands' ELSE 'structures_without_ligands' END;
+    INSERT INTO stat_breakdown (dimension, label, value)
+    VALUES ('method', IFNULL(new.method, 'Unknown'), 1)
+    ON CONFLICT (dimension, label) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stat_structure_ad AFTER DELETE ON protein_structure BEGIN
+    UPDATE stat_counter SET value = value - 1 WHERE name = 'structures';
+    UPDATE stat_counter SET value = value - 1
+    WHERE name = CASE WHEN old.ligand_present = 1
+                      THEN 'structures_with_ligands' ELSE 'structures_without_ligands' END;
+    UPDATE stat_breakdown SET value = value - 1
+    WHERE dimension = 'method' AND label = IFNULL(old.method, 'Unknown');
+    DELETE FROM stat_breakdown WHERE dimension = 'method' AND value <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS stat_structure_au AFTER UPDATE OF method, ligand_present ON protein_structure BEGIN
+    UPDATE stat_counter SET value = value - 1
+    WHERE name = CASE WHEN old.ligand_present = 1
+                      THEN 'structures_with_ligands' ELSE 'structures_without_ligands' END;
+    UPDATE stat_counter SET value = value + 1
+    WHERE name = CASE WHEN new.ligand_present = 1
+                      THEN 'structures_with_ligands' ELSE 'structures_without_ligands' END;
+    UPDATE stat_breakdown SET value = value - 1
+    WHERE dimension = 'method' AND label = IFNULL(old.method, 'Unknown');
+    INSERT INTO stat_breakdown (dimension, label, value)
+    VALUES ('method', IFNULL(new.method, 'Unknown'), 1)
+    ON CONFLICT (dimension, label) DO UPDATE SET value = value + 1;
+    DELETE FROM stat_breakdown WHERE dimension = 'method' AND value <= 0;
+END;
+
+-- Initial population; must match stats.ACTUAL_COUNTERS_SQL / ACTUAL_BREAKDOWN_SQL.
+DELETE FROM stat_counter;
+DELETE FROM stat_breakdown;
+
+INSERT INTO stat_counter (name, value)
+SELECT 'proteins', COUNT(*) FROM protein
+UNION ALL SELECT 'structures', COUNT(*) FROM protein_structure
+UNION ALL SELECT 'structures_with_ligands', COUNT(*) FROM protein_structure WHERE ligand_present = 1
+UNION ALL SELECT 'structures_without_ligands', COUNT(*) FROM protein_structure WHERE IFNULL(ligand_present, 0) <> 1;
+
+INSERT INTO stat_breakdown (dimension, label, value)
+SELECT 'organism', IFNULL(organism, 'Unknown'), COUNT(*) FROM protein GROUP BY 2
+UNION ALL
+SELECT 'method', IFNULL(method, 'Unknown'), COUNT(*) FROM protein_structure GROUP BY 2;
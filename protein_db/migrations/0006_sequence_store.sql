@@ -0,0 +1,16 @@
+-- Offset index into the flat sequence file managed by sequence_store.py.
+-- digest lets identical sequences share one byte range.
+CREATE TABLE IF NOT EXISTS protein_sequence (
+    protein_id INTEGER PRIMARY KEY REFERENCES protein(protein_id),
+    uniprot_id TEXT,
+    seq_offset INTEGER NOT NULL,
+    seq_length INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_protein_sequence_uniprot ON protein_sequence(uniprot_id);
+CREATE INDEX IF NOT EXISTS idx_protein_sequence_digest ON protein_sequence(digest);
+
+CREATE TRIGGER IF NOT EXISTS protein_sequence_ad AFTER DELETE ON protein BEGIN
+    DELETE FROM protein_sequence WHERE protein_id = old.protein_id;
+END;
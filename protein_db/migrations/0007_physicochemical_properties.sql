@@ -0,0 +1,6 @@
+-- Columns filled by protein_db/properties.py at ingest time and by the
+-- admin "Recompute properties" action. molecular_weight keeps its kDa units.
+ALTER TABLE protein ADD COLUMN isoelectric_point REAL;
+ALTER TABLE protein ADD COLUMN extinction_coefficient INTEGER;
+ALTER TABLE protein ADD COLUMN gravy REAL;
+ALTER TABLE protein ADD COLUMN aa_composition TEXT;
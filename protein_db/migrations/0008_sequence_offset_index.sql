@@ -0,0 +1,3 @@
+-- Sequence search hits are byte ranges of the sequence file; this maps a
+-- range back to every protein that shares it.
+CREATE INDEX IF NOT EXISTS idx_protein_sequence_offset ON protein_sequence(seq_offset);
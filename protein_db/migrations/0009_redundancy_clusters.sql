@@ -0,0 +1,17 @@
+-- MinHash signatures per distinct sequence (keyed by digest, so they survive
+-- compaction of the sequence file) and the clusters built from them by
+-- protein_db/clustering.py. Only members of multi-sequence clusters get a
+-- sequence_cluster row; any other sequence is its own representative.
+CREATE TABLE IF NOT EXISTS sequence_minhash (
+    digest TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS sequence_cluster (
+    identity REAL NOT NULL,
+    digest TEXT NOT NULL,
+    representative TEXT NOT NULL,
+    PRIMARY KEY (identity, digest)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_sequence_cluster_representative ON sequence_cluster(identity, representative);
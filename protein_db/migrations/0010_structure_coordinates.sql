@@ -0,0 +1,25 @@
+-- Coordinates parsed by protein_db/coordinates.py, one row per protein.
+-- xyz is float32 (n, 3), residue_index / chain_index int32 and atom_flags
+-- uint8 per atom, all native byte order; chains lists author chain IDs.
+CREATE TABLE IF NOT EXISTS structure_coordinates (
+    protein_id INTEGER PRIMARY KEY REFERENCES protein(protein_id),
+    atom_count INTEGER NOT NULL,
+    chains TEXT NOT NULL,
+    xyz BLOB NOT NULL,
+    residue_index BLOB NOT NULL,
+    chain_index BLOB NOT NULL,
+    atom_flags BLOB NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS structure_coordinates_ad AFTER DELETE ON protein BEGIN
+    DELETE FROM structure_coordinates WHERE protein_id = old.protein_id;
+END;
+
+-- Geometric descriptors derived from the coordinates (angstroms).
+ALTER TABLE protein_structure ADD COLUMN atom_count INTEGER;
+ALTER TABLE protein_structure ADD COLUMN chain_count INTEGER;
+ALTER TABLE protein_structure ADD COLUMN radius_of_gyration REAL;
+ALTER TABLE protein_structure ADD COLUMN ca_contacts INTEGER;
+ALTER TABLE protein_structure ADD COLUMN extent_major REAL;
+ALTER TABLE protein_structure ADD COLUMN extent_middle REAL;
+ALTER TABLE protein_structure ADD COLUMN extent_minor REAL;
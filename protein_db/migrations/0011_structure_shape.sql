@@ -0,0 +1,10 @@
+-- Fixed-length shape descriptors (float32 CA distance-distribution
+-- histograms, see protein_db/shape_index.py) for "similar structure" search.
+CREATE TABLE IF NOT EXISTS structure_shape (
+    protein_id INTEGER PRIMARY KEY REFERENCES protein(protein_id),
+    descriptor BLOB NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS structure_shape_ad AFTER DELETE ON protein BEGIN
+    DELETE FROM structure_shape WHERE protein_id = old.protein_id;
+END;
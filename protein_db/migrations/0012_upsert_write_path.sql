@@ -0,0 +1,42 @@
+-- One structure row per protein, so ingestion can UPSERT on protein_id.
+-- Duplicates left by the old check-then-insert path collapse onto the
+-- oldest row (the stat triggers keep the counters right).
+DELETE FROM protein_structure WHERE structure_id NOT IN (
+    SELECT MIN(structure_id) FROM protein_structure GROUP BY protein_id
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_protein_structure_unique_protein ON protein_structure(protein_id);
+
+-- Set whenever a refresh overwrites the fetched metadata; NULL until then.
+ALTER TABLE protein ADD COLUMN refreshed_at TEXT;
+
+-- A refresh rewrites every fetched column. Only touch the FTS index and the
+-- summary counters when a value actually changed.
+DROP TRIGGER IF EXISTS protein_fts_au;
+
+CREATE TRIGGER protein_fts_au AFTER UPDATE OF protein_name, function, organism ON protein
+WHEN old.protein_name IS NOT new.protein_name OR old.function IS NOT new.function
+  OR old.organism IS NOT new.organism BEGIN
+    INSERT INTO protein_fts(protein_fts, rowid, protein_name, function, organism)
+    VALUES ('delete', old.protein_id, old.protein_name, old.function, old.organism);
+    INSERT INTO protein_fts(rowid, protein_name, function, organism)
+    VALUES (new.protein_id, new.protein_name, new.function, new.organism);
+END;
+
+DROP TRIGGER IF EXISTS stat_structure_au;
+
+CREATE TRIGGER stat_structure_au AFTER UPDATE OF method, ligand_present ON protein_structure
+WHEN old.method IS NOT new.method OR old.ligand_present IS NOT new.ligand_present BEGIN
+    UPDATE stat_counter SET value = value - 1
+    WHERE name = CASE WHEN old.ligand_present = 1
+                      THEN 'structures_with_ligands' ELSE 'structures_without_ligands' END;
+    UPDATE stat_counter SET value = value + 1
+    WHERE name = CASE WHEN new.ligand_present = 1
+                      THEN 'structures_with_ligands' ELSE 'structures_without_ligands' END;
+    UPDATE stat_breakdown SET value = value - 1
+    WHERE dimension = 'method' AND label = IFNULL(old.method, 'Unknown');
+    INSERT INTO stat_breakdown (dimension, label, value)
+    VALUES ('method', IFNULL(new.method, 'Unknown'), 1)
+    ON CONFLICT (dimension, label) DO UPDATE SET value = value + 1;
+    DELETE FROM stat_breakdown WHERE dimension = 'method' AND value <= 0;
+END;
@@ -0,0 +1,26 @@
+-- Background jobs run by protein_db/jobs.py. A job is claimed by flipping
+-- queued -> running; a running job whose heartbeat stops (its process died)
+-- is put back in the queue, so jobs survive a server restart. Times are
+-- Unix seconds.
+CREATE TABLE IF NOT EXISTS job (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'done', 'failed', 'cancelled')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER,
+    message TEXT,
+    error TEXT,
+    result TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_queue ON job(status, run_after, job_id);
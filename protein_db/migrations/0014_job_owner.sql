@@ -0,0 +1,4 @@
+-- The runner that claimed a running job, as "<pid>-<token>". A stale
+-- heartbeat only gets a job requeued once that process has exited: a job
+-- holding a long write transaction cannot write heartbeats meanwhile.
+ALTER TABLE job ADD COLUMN owner TEXT;
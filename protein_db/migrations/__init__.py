@@ -0,0 +1,133 @@
+import hashlib
+import importlib.util
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+# ================= DISCOVERY =================
+# Migrations are files named NNNN_description.sql or NNNN_description.py in
+# this directory, applied in version order. A .py migration defines
+# upgrade(conn) and must only use conn.execute (executescript would commit
+# the runner's transaction).
+MIGRATIONS_DIR = os.path.dirname(os.path.abspath(__file__))
+_FILENAME = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+
+SCHEMA_VERSION_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+)
+"""
+
+class MigrationError(Exception):
+    pass
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    @property
+    def checksum(self):
+        with open(self.path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+
+    def apply(self, conn):
+        if self.path.endswith(".sql"):
+            with open(self.path, encoding="utf-8") as f:
+                run_sql_script(conn, f.read())
+        else:
+            spec = importlib.util.spec_from_file_location(f"_migration_{self.version:04d}", self.path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.upgrade(conn)
+
+    def __repr__(self):
+        return f"Migration({self.version:04d}_{self.name})"
+
+def discover(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in os.listdir(directory):
+        m = _FILENAME.match(filename)
+        if m:
+            migrations.append(Migration(int(m.group(1)), m.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise MigrationError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+def run_sql_script(conn, script):
+    """Execute a multi-statement script statement by statement inside the current transaction."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                conn.execute(statement)
+            statement = ""
+    if statement.strip() and not statement.strip().startswith("--"):
+        raise MigrationError(f"Incomplete SQL statement at end of script: {statement.strip()[:60]}")
+
+# ================= STATE =================
+def applied_versions(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return {}
+    return {version: (name, applied_at) for version, name, applied_at in
+            conn.execute("SELECT version, name, applied_at FROM schema_version")}
+
+def current_version(conn):
+    return max(applied_versions(conn), default=0)
+
+def pending(conn, migrations=None):
+    applied = applied_versions(conn)
+    return [m for m in (migrations if migrations is not None else discover()) if m.version not in applied]
+
+# ================= RUNNER =================
+def migrate(conn, dry_run=False, migrations=None):
+    """Apply every pending migration, each in its own transaction.
+
+    The version row is written in the same transaction as the migration, so
+    a failure rolls both back and leaves the database at the last good
+    version. With dry_run=True all pending migrations run in a single
+    transaction that is rolled back, which checks that they apply cleanly.
+    Returns the list of migrations applied (or that would be applied).
+    """
+    if conn.in_transaction:
+        conn.commit()
+    migrations = discover() if migrations is None else migrations
+    done = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(SCHEMA_VERSION_SQL)
+        # Re-read inside the write lock so concurrent processes don't both migrate.
+        todo = pending(conn, migrations)
+        for migration in todo:
+            try:
+                migration.apply(conn)
+            except sqlite3.Error as e:
+                raise MigrationError(f"{migration!r} failed: {e}") from e
+            conn.execute(
+                "INSERT INTO schema_version (version, name, checksum, applied_at) VALUES (?, ?, ?, ?)",
+                (migration.version, migration.name, migration.checksum,
+                 datetime.now(timezone.utc).isoformat(timespec="seconds")),
+            )
+            done.append(migration)
+            if not dry_run:
+                conn.commit()
+                conn.execute("BEGIN IMMEDIATE")
+    except Exception:
+        conn.rollback()
+        raise
+    if dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    return done
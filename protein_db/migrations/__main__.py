@@ -0,0 +1,25 @@
+import argparse
+import sqlite3
+
+from protein_db.db import DB_NAME
+from protein_db.migrations import current_version, migrate, pending
+
+parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+parser.add_argument("--db", default=DB_NAME, help=f"database file (default: {DB_NAME})")
+parser.add_argument("--dry-run", action="store_true", help="run pending migrations and roll back")
+parser.add_argument("--status", action="store_true", help="only list pending migrations")
+args = parser.parse_args()
+
+conn = sqlite3.connect(args.db)
+print(f"{args.db}: schema version {current_version(conn)}")
+if args.status:
+    for migration in pending(conn):
+        print(f"  pending  {migration.version:04d}_{migration.name}")
+else:
+    applied = migrate(conn, dry_run=args.dry_run)
+    verb = "would apply" if args.dry_run else "applied"
+    for migration in applied:
+        print(f"  {verb}  {migration.version:04d}_{migration.name}")
+    if not applied:
+        print("  up to date")
+conn.close()
@@ -0,0 +1,165 @@
+import json
+
+import numpy as np
+
+# ================= RESIDUE TABLES =================
+# Columns of the per-sequence count matrix. The 20 standard residues come
+# first; U/O/B/Z/X are counted so length and mass stay right, and
+# anything else goes into the final "other" column.
+RESIDUES = "ACDEFGHIKLMNPQRSTVWYUOBZX"
+STANDARD = RESIDUES[:20]
+OTHER = len(RESIDUES)
+
+# Average residue masses (Da), i.e. amino acid minus one water. A chain of n
+# residues weighs sum(residue masses) + one water.
+RESIDUE_MASS = {
+    'A': 71.0788, 'C': 103.1388, 'D': 115.0886, 'E': 129.1155, 'F': 147.1766,
+    'G': 57.0519, 'H': 137.1411, 'I': 113.1594, 'K': 128.1741, 'L': 113.1594,
+    'M': 131.1926, 'N': 114.1038, 'P': 97.1167, 'Q': 128.1307, 'R': 156.1875,
+    'S': 87.0782, 'T': 101.1051, 'V': 99.1326, 'W': 186.2132, 'Y': 163.1760,
+    'U': 150.0388, 'O': 237.3018, 'B': 114.5962, 'Z': 128.6231, 'X': 110.0,
+}
+WATER_MASS = 18.01524
+
+# Kyte & Doolittle hydropathy.
+HYDROPATHY = {
+    'A': 1.8, 'C': 2.5, 'D': -3.5, 'E': -3.5, 'F': 2.8, 'G': -0.4, 'H': -3.2,
+    'I': 4.5, 'K': -3.9, 'L': 3.8, 'M': 1.9, 'N': -3.5, 'P': -1.6, 'Q': -3.5,
+    'R': -4.5, 'S': -0.8, 'T': -0.7, 'V': 4.2, 'W': -0.9, 'Y': -1.3,
+}
+
+# EMBOSS pKa set.
+PKA_N_TERM, PKA_C_TERM = 8.6, 3.6
+PKA_POSITIVE = {'K': 10.8, 'R': 12.5, 'H': 6.5}
+PKA_NEGATIVE = {'D': 3.9, 'E': 4.1, 'C': 8.5, 'Y': 10.1}
+
+# Molar extinction at 280 nm (Pace et al.), cystines assumed fully formed.
+EXT_TRP, EXT_TYR, EXT_CYSTINE = 5500, 1490, 125
+
+def _column_vector(table):
+    vector = np.zeros(OTHER + 1)
+    for residue, value in table.items():
+        vector[RESIDUES.index(residue)] = value
+    return vector
+
+_MASS = _column_vector(RESIDUE_MASS)
+_HYDROPATHY = _column_vector(HYDROPATHY)
+
+# Byte value -> count-matrix column, for upper- and lower-case letters.
+_LOOKUP = np.full(256, OTHER, dtype=np.int64)
+for _i, _residue in enumerate(RESIDUES):
+    _LOOKUP[ord(_residue)] = _i
+    _LOOKUP[ord(_residue.lower())] = _i
+
+def _col(residue):
+    return RESIDUES.index(residue)
+
+# ================= BATCH ENGINE =================
+def residue_counts(sequences):
+    """(n, len(RESIDUES) + 1) count matrix for str / bytes / memoryview sequences, in one pass."""
+    chunks = [s.encode("ascii") if isinstance(s, str) else s for s in sequences]
+    lengths = np.fromiter((len(s) for s in chunks), dtype=np.int64, count=len(chunks))
+    width = OTHER + 1
+    if lengths.sum() == 0:
+        return np.zeros((len(chunks), width), dtype=np.int64)
+    residues = np.frombuffer(b"".join(chunks), dtype=np.uint8)
+    owner = np.repeat(np.arange(len(chunks), dtype=np.int64), lengths)
+    flat = np.bincount(owner * width + _LOOKUP[residues], minlength=len(chunks) * width)
+    return flat.reshape(len(chunks), width)
+
+def _net_charge(counts, ph):
+    ph = ph[:, None]
+    positive = sum(counts[:, _col(r), None] / (1 + 10 ** (ph - pka)) for r, pka in PKA_POSITIVE.items())
+    negative = sum(counts[:, _col(r), None] / (1 + 10 ** (pka - ph)) for r, pka in PKA_NEGATIVE.items())
+    n_term = 1 / (1 + 10 ** (ph - PKA_N_TERM))
+    c_term = 1 / (1 + 10 ** (PKA_C_TERM - ph))
+    return (positive + n_term - negative - c_term)[:, 0]
+
+def isoelectric_points(counts, iterations=40):
+    """pH of zero net charge for every row of a count matrix, by vectorized bisection."""
+    low = np.zeros(len(counts))
+    high = np.full(len(counts), 14.0)
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        positive = _net_charge(counts, mid) > 0
+        low = np.where(positive, mid, low)
+        high = np.where(positive, high, mid)
+    return (low + high) / 2
+
+def compute_properties(sequences):
+    """Physicochemical properties for many sequences at once.
+
+    Returns a dict of NumPy arrays: aa_length, molecular_weight (kDa),
+    isoelectric_point, extinction_coefficient (M^-1 cm^-1 at 280 nm),
+    gravy, plus ``composition``, an (n, 20) array of percentages for STANDARD.
+    """
+    counts = residue_counts(sequences)
+    lengths = counts.sum(axis=1)
+    safe_lengths = np.maximum(lengths, 1)
+    mass = counts @ _MASS + np.where(lengths > 0, WATER_MASS, 0.0)
+    return {
+        "aa_length": lengths,
+        "molecular_weight": np.round(mass / 1000, 2),
+        "isoelectric_point": np.round(isoelectric_points(counts), 2),
+        "extinction_coefficient": (EXT_TRP * counts[:, _col('W')] + EXT_TYR * counts[:, _col('Y')]
+                                   + EXT_CYSTINE * (counts[:, _col('C')] // 2)),
+        "gravy": np.round(counts @ _HYDROPATHY / safe_lengths, 3),
+        "composition": np.round(100 * counts[:, :20] / safe_lengths[:, None], 2),
+    }
+
+def composition_json(row):
+    return json.dumps({aa: float(pct) for aa, pct in zip(STANDARD, row) if pct})
+
+def property_rows(sequences):
+    """compute_properties() as one dict of plain Python values per sequence, ready for SQL."""
+    props = compute_properties(sequences)
+    return [
+        {
+            "aa_length": int(props["aa_length"][i]),
+            "molecular_weight": float(props["molecular_weight"][i]),
+            "isoelectric_point": float(props["isoelectric_point"][i]),
+            "extinction_coefficient": int(props["extinction_coefficient"][i]),
+            "gravy": float(props["gravy"][i]),
+            "aa_composition": composition_json(props["composition"][i]),
+        }
+        for i in range(len(props["aa_length"]))
+    ]
+
+# ================= DATABASE RECOMPUTE =================
+def recompute_database(conn, store, chunk_size=5000, on_progress=None):
+    """Recompute length, MW, pI, extinction coefficient, GRAVY and composition for every stored sequence.
+
+    Commits every chunk_size proteins, so other writers never wait behind
+    the whole table; while it runs, readers see some proteins with new values
+    and some with old. Proteins without a stored sequence keep their
+    current values. Returns the number of proteins updated.
+    """
+    total = conn.execute("SELECT COUNT(*) FROM protein_sequence").fetchone()[0]
+    updated = 0
+    ids, sequences = [], []
+
+    def flush():
+        nonlocal updated
+        rows = property_rows(sequences)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany("""
+            UPDATE protein SET aa_length = ?, molecular_weight = ?, isoelectric_point = ?,
+                   extinction_coefficient = ?, gravy = ?, aa_composition = ?
+            WHERE protein_id = ?
+            """, [(r["aa_length"], r["molecular_weight"], r["isoelectric_point"], r["extinction_coefficient"],
+                   r["gravy"], r["aa_composition"], protein_id) for protein_id, r in zip(ids, rows)])
+        updated += len(ids)
+        ids.clear()
+        sequences.clear()
+        if on_progress is not None:
+            on_progress(updated, total)
+
+    for protein_id, sequence in store.iter_sequences(conn):
+        ids.append(protein_id)
+        sequences.append(sequence)
+        if len(ids) >= chunk_size:
+            flush()
+    if ids:
+        flush()
+    return updated
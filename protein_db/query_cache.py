@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# ================= SETTINGS =================
+MAX_ENTRIES = int(os.environ.get("QUERY_CACHE_MAX_ENTRIES", 256))
+MAX_BYTES = int(os.environ.get("QUERY_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(sql):
+    return _WHITESPACE.sub(" ", sql).strip()
+
+def _size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(
+            sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row) for row in value
+        )
+    return sys.getsizeof(value)
+
+# ================= CACHE =================
+class QueryCache:
+    """LRU cache of read-query results, invalidated by a data-generation counter.
+
+    Every write path calls bump_generation() after it commits. Cached results
+    belong to the generation they were read in, so a bump drops them all.
+    The cache is bounded by both entry count and estimated bytes.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.generation = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def bump_generation(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+            self._stats["invalidations"] += 1
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None, self.generation
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry, self.generation
+
+    def _put(self, key, generation, value):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # A write committed while this query ran; its result may be stale.
+            if generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._stats["evictions"] += 1
+
+    def fetch(self, kind, sql, params, run):
+        key = (kind, normalize_sql(sql), tuple(params))
+        entry, generation = self._get(key)
+        if entry is not None:
+            return entry[0]
+        value = run()
+        self._put(key, generation, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"entries": len(self._entries), "bytes": self._bytes,
+                          "generation": self.generation,
+                          "max_entries": self.max_entries, "max_bytes": self.max_bytes})
+        return stats
+
+# ================= SHARED INSTANCE =================
+_cache = QueryCache()
+
+def get_cache():
+    return _cache
+
+def bump_generation():
+    """Call after committing any write to protein or protein_structure."""
+    _cache.bump_generation()
+
+def read_sql(conn, sql, params=()):
+    """Cached pd.read_sql_query. The returned DataFrame is shared; do not modify it."""
+    return _cache.fetch("frame", sql, params, lambda: pd.read_sql_query(sql, conn, params=params))
+
+def fetch_all(conn, sql, params=()):
+    """Cached cursor.fetchall() returning a list of row tuples."""
+    return _cache.fetch("rows", sql, params, lambda: conn.execute(sql, params).fetchall())
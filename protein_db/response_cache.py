@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from protein_db import http_client
+
+# ================= SETTINGS =================
+CACHE_DIR = os.environ.get("RESPONSE_CACHE_DIR", os.path.join(".cache", "responses"))
+MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+DAY = 24 * 60 * 60
+# Seconds a cached response is served without revalidation, per API host.
+SOURCE_TTLS = {
+    "data.rcsb.org": 7 * DAY,
+    "rest.uniprot.org": 30 * DAY,
+}
+DEFAULT_TTL = DAY
+
+# ================= RESPONSES =================
+class CachedResponse:
+    """The subset of requests.Response the fetchers use, backed by cached bytes."""
+
+    def __init__(self, url, status_code, content, headers=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    def json(self):
+        return json.loads(self.content)
+
+# ================= CACHE =================
+class ResponseCache:
+    """Content-addressed store of GET response bodies with an LRU-bounded SQLite index.
+
+    Bodies live in ``blobs/<sha[:2]>/<sha>``, so identical payloads fetched
+    under different URLs are stored once. The index maps each URL to its
+    blob plus the validators (ETag / Last-Modified) needed to revalidate it.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES, ttls=None, default_ttl=DEFAULT_TTL):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttls = SOURCE_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(cache_dir, "blobs"), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS response (
+            url TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_last_access ON response(last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_response_digest ON response(digest)")
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "stale_served": 0,
+                       "bytes_served": 0, "bytes_fetched": 0, "evictions": 0}
+
+    # ---------- blobs ----------
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, "blobs", digest[:2], digest)
+
+    def _read_blob(self, digest):
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_blob(self, digest, content):
+        path = self._blob_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def _drop_blob_if_unused(self, digest):
+        if self._conn.execute("SELECT 1 FROM response WHERE digest = ?", (digest,)).fetchone() is None:
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    # ---------- index ----------
+    def ttl_for(self, url):
+        return self.ttls.get(urlsplit(url).hostname, self.default_ttl)
+
+    def _lookup(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest, etag, last_modified, fetched_at FROM response WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        content = self._read_blob(row[0])
+        if content is None:
+            return None
+        return {"digest": row[0], "etag": row[1], "last_modified": row[2], "fetched_at": row[3],
+                "content": content}
+
+    def _touch(self, url, fetched=False):
+        now = time.time()
+        with self._lock:
+            if fetched:
+                self._conn.execute("UPDATE response SET last_access = ?, fetched_at = ? WHERE url = ?",
+                                   (now, now, url))
+            else:
+                self._conn.execute("UPDATE response SET last_access = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+
+    def _store(self, url, response):
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        self._write_blob(digest, content)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT digest FROM response WHERE url = ?", (url,)).fetchone()
+            self._conn.execute("""
+            INSERT OR REPLACE INTO response (url, digest, size, etag, last_modified, fetched_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (url, digest, len(content), response.headers.get("ETag"),
+                  response.headers.get("Last-Modified"), now, now))
+            if old is not None and old[0] != digest:
+                self._drop_blob_if_unused(old[0])
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM response").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT url, digest, size FROM response ORDER BY last_access").fetchall()
+        for url, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM response WHERE url = ?", (url,))
+            self._drop_blob_if_unused(digest)
+            total -= size
+            self._stats["evictions"] += 1
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    # ---------- public ----------
+    def get(self, url, **kwargs):
+        """GET ``url``, serving a fresh cached body or revalidating a stale one.
+
+        Only 200 responses are cached. If the network fails and a stale copy
+        exists, the stale copy is served.
+        """
+        entry = self._lookup(url)
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl_for(url):
+            self._touch(url)
+            self._count("hits")
+            self._count("bytes_served", len(entry["content"]))
+            return CachedResponse(url, 200, entry["content"], from_cache=True)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response = http_client.get(url, headers=headers, **kwargs)
+        except requests.RequestException:
+            if entry is None:
+                raise
+            self._count("stale_served")
+            self._count("bytes_served", len(entry["content"]))
+            return CachedResponse(url, 200, entry["content"], from_cache=True)
+
+        if response.status_code == 304 and entry is not None:
+            self._touch(url, fetched=True)
+            self._count("revalidated")
+            self._count("bytes_served", len(entry["content"]))
+            return CachedResponse(url, 200, entry["content"], from_cache=True)
+
+        self._count("misses")
+        if response.status_code == 200:
+            self._count("bytes_fetched", len(response.content))
+            self._store(url, response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response"
+            ).fetchone()
+            blobs = self._conn.execute("SELECT COUNT(DISTINCT digest) FROM response").fetchone()[0]
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats.update({
+            "entries": entries,
+            "blobs": blobs,
+            "stored_bytes": total,
+            "max_bytes": self.max_bytes,
+            "hit_rate": (stats["hits"] + stats["revalidated"]) / lookups if lookups else 0.0,
+        })
+        return stats
+
+    def clear(self):
+        with self._lock:
+            digests = [row[0] for row in self._conn.execute("SELECT DISTINCT digest FROM response")]
+            self._conn.execute("DELETE FROM response")
+            self._conn.commit()
+            for digest in digests:
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+
+# ================= SHARED INSTANCE =================
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+def get(url, **kwargs):
+    return get_cache().get(url, **kwargs)
@@ -0,0 +1,143 @@
+import re
+import sqlite3
+
+import pandas as pd
+
+from protein_db.alignment import align, align_many
+from protein_db.kmer_index import K, clean_sequence, index_for
+from protein_db.query_cache import read_sql
+
+RESULT_COLUMNS = """
+    p.protein_name,
+    p.pdb_id,
+    p.uniprot_id,
+    p.organism,
+    p.function,
+    p.aa_length,
+    p.molecular_weight,
+    p.isoelectric_point,
+    p.extinction_coefficient,
+    p.gravy,
+    s.method,
+    s.resolution,
+    s.ligand_present,
+    s.chain_count,
+    s.radius_of_gyration,
+    s.ca_contacts,
+    s.extent_major,
+    s.extent_middle,
+    s.extent_minor
+"""
+
+PDB_ID_QUERY = f"""
+SELECT {RESULT_COLUMNS}
+FROM protein p
+JOIN protein_structure s ON p.protein_id = s.protein_id
+WHERE p.pdb_id = UPPER(?)
+"""
+
+# FTS5 scores every match and keeps the best ones in a bounded sorter, so
+# broad terms cost time linear in their match count; the query cache keeps
+# repeated searches cheap.
+TEXT_QUERY = f"""
+SELECT {RESULT_COLUMNS}
+FROM (
+    SELECT rowid, rank FROM protein_fts WHERE protein_fts MATCH ? ORDER BY rank LIMIT ?
+) f
+JOIN protein p ON p.protein_id = f.rowid
+JOIN protein_structure s ON p.protein_id = s.protein_id
+ORDER BY f.rank
+LIMIT ?
+"""
+
+SEQUENCE_QUERY = """
+SELECT {columns}, q.seq_offset, q.seq_length
+FROM protein_sequence q
+JOIN protein p ON p.protein_id = q.protein_id
+JOIN protein_structure s ON p.protein_id = s.protein_id
+WHERE q.seq_offset IN ({placeholders})
+"""
+
+DEFAULT_LIMIT = 50
+MIN_SEQUENCE_LENGTH = 2 * K
+
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: "quoted text" is a phrase, bare words are prefix terms.
+
+    Only word characters reach FTS5, so user input can never produce a
+    syntax error. Returns an empty string when there is nothing to search.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(text):
+        if phrase:
+            words = _WORD.findall(phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+        else:
+            terms.extend(f'"{w}"*' for w in _WORD.findall(word))
+    return " ".join(terms)
+
+def search_proteins(conn, text, limit=DEFAULT_LIMIT):
+    """Exact PDB ID match first, otherwise bm25-ranked full-text search over name, function and organism."""
+    df = read_sql(conn, PDB_ID_QUERY, (text,))
+    if not df.empty:
+        return df
+    match = build_match_query(text)
+    if not match:
+        return df
+    try:
+        return read_sql(conn, TEXT_QUERY, (match, limit, limit))
+    except (sqlite3.OperationalError, pd.errors.DatabaseError):
+        return df
+
+def search_by_sequence(conn, text, limit=DEFAULT_LIMIT):
+    """Proteins similar to a pasted (optionally FASTA) sequence, best alignment first.
+
+    Candidates come from the k-mer index and are re-ranked by
+    Smith-Waterman score. Adds alignment_score, seed_score (shared
+    residues on the best diagonal band) and coverage (seed_score / query
+    length).
+    """
+    sequence = clean_sequence(text)
+    if len(sequence) < MIN_SEQUENCE_LENGTH:
+        return pd.DataFrame()
+    index = index_for(conn)
+    index.ensure_built(conn)
+    hits = index.search(sequence, limit)
+    if not hits:
+        return pd.DataFrame()
+    seeds = {offset: n * K for offset, n, _ in hits}
+    sql = SEQUENCE_QUERY.format(columns=RESULT_COLUMNS, placeholders=", ".join("?" * len(seeds)))
+    df = read_sql(conn, sql, tuple(seeds))
+    ranges = df[["seq_offset", "seq_length"]].drop_duplicates()
+    store = index.store
+    scores = dict(zip(ranges["seq_offset"], align_many(
+        sequence, [store.read_range(int(o), int(n)) for o, n in zip(ranges["seq_offset"], ranges["seq_length"])])))
+    df = df.assign(
+        alignment_score=df["seq_offset"].map(scores),
+        seed_score=df["seq_offset"].map(seeds),
+        coverage=(df["seq_offset"].map(seeds) / len(sequence)).clip(upper=1.0).round(3),
+    )
+    return df.sort_values(["alignment_score", "seed_score", "pdb_id"], ascending=[False, False, True]) \
+        .head(limit).reset_index(drop=True)
+
+def align_hit(conn, text, seq_offset, seq_length):
+    """Full Smith-Waterman alignment of the pasted sequence against one search_by_sequence() hit."""
+    target = index_for(conn).store.read_range(int(seq_offset), int(seq_length)).tobytes().decode("ascii")
+    return align(clean_sequence(text), target)
+
+def format_alignment(result, width=60):
+    """Blocks of query / midline / target lines with 1-based start positions, for a monospace view."""
+    lines = []
+    q_pos, t_pos = result["query_start"], result["target_start"]
+    for start in range(0, len(result["midline"]), width):
+        top = result["aligned_query"][start:start + width]
+        bottom = result["aligned_target"][start:start + width]
+        lines += [f"Query  {q_pos:>5}  {top}", f"{'':14}{result['midline'][start:start + width]}",
+                  f"Target {t_pos:>5}  {bottom}", ""]
+        q_pos += len(top) - top.count("-")
+        t_pos += len(bottom) - bottom.count("-")
+    return "\n".join(lines)
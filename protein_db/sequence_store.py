@@ -0,0 +1,250 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+import numpy as np
+
+from protein_db.query_cache import fetch_all
+
+# ================= LAYOUT =================
+# Sequences are stored one byte per residue, back to back, in an append-only
+# flat file next to the database (protein_structure.db -> protein_structure.sequences).
+# The protein_sequence table (migrations/0006_sequence_store.sql) is the
+# offset index: protein_id / uniprot_id -> (seq_offset, seq_length). Identical
+# sequences share one range via their digest. Reads slice an mmap of the file,
+# so no Python string is built unless a caller asks for one.
+#
+# The bytes are deliberately neither residue-packed nor compressed. Every
+# reader consumes them in place as a uint8 array with no copy and no decode
+# step: the k-mer index build (read_range over thousands of adjacent
+# sequences), property recompute and clustering (iter_sequences), and the
+# aligner. Packing at 5 bits per residue would save 3/8 of the file: about
+# 130 MB per million proteins of average length 350, next to a database
+# file of about 1 GB. Block compression saves about as much (zlib reaches
+# about 0.59 on the benchmark data), but every read would then have to
+# decode into a new buffer.
+
+def default_path(db_path):
+    return os.environ.get("SEQUENCE_STORE_PATH") or os.path.splitext(db_path)[0] + ".sequences"
+
+def sequence_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+class SequenceStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._map = None
+        self._mapped_size = 0
+        # Appends go through this handle; it is only touched under _lock.
+        self._file = open(path, "ab")
+        # Bumped by compact(); an offset read before a bump is stale.
+        self._epoch = 0
+
+    # ---------- mapping ----------
+    def _view(self, offset, length):
+        if length == 0:
+            return memoryview(b"")
+        end = offset + length
+        if end > self._mapped_size:
+            with self._lock:
+                if end > self._mapped_size:
+                    self._file.flush()
+                    size = os.path.getsize(self.path)
+                    if end > size:
+                        raise ValueError(f"Sequence range {offset}:{end} is beyond {self.path} ({size} bytes)")
+                    with open(self.path, "rb") as f:
+                        # The old map stays alive for as long as views into it exist.
+                        self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._mapped_size = size
+        return memoryview(self._map)[offset:end]
+
+    def _append(self, data):
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+        return offset
+
+    # ---------- writes (caller owns the transaction) ----------
+    # The index row is written after the bytes are appended. Once that
+    # INSERT has run, the caller's transaction holds the database write lock
+    # that compact() also takes, so the offset stays valid until commit; if
+    # a compaction slipped in between the append and the INSERT, the epoch
+    # has moved and the write is redone against the new file.
+    def put(self, conn, protein_id, uniprot_id, sequence):
+        """Store a sequence for protein_id and return the offset of its byte range."""
+        data = sequence.strip().upper().encode("ascii")
+        digest = sequence_digest(data)
+        stale = None
+        while True:
+            epoch = self._epoch
+            row = conn.execute(
+                "SELECT seq_offset FROM protein_sequence WHERE digest = ? AND protein_id IS NOT ? LIMIT 1",
+                (digest, stale)
+            ).fetchone()
+            offset = row[0] if row is not None else self._append(data)
+            conn.execute("""
+            INSERT INTO protein_sequence (protein_id, uniprot_id, seq_offset, seq_length, digest)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (protein_id) DO UPDATE SET
+                uniprot_id = excluded.uniprot_id, seq_offset = excluded.seq_offset,
+                seq_length = excluded.seq_length, digest = excluded.digest
+            """, (protein_id, uniprot_id, offset, len(data), digest))
+            if self._epoch == epoch:
+                return offset
+            # The row just written points into the old file; don't reuse it.
+            stale = protein_id
+
+    def put_many(self, conn, rows):
+        """put() for many (protein_id, uniprot_id, sequence) rows: one append, one executemany. Returns the offsets."""
+        data = [sequence.strip().upper().encode("ascii") for _, _, sequence in rows]
+        digests = [sequence_digest(d) for d in data]
+        stale = "[]"
+        while True:
+            epoch = self._epoch
+            offsets = dict(conn.execute("""
+            SELECT digest, MIN(seq_offset) FROM protein_sequence
+            WHERE digest IN (SELECT value FROM json_each(?))
+              AND protein_id NOT IN (SELECT value FROM json_each(?))
+            GROUP BY digest
+            """, (json.dumps(sorted(set(digests))), stale)).fetchall())
+            pending, relative = bytearray(), {}
+            for d, digest in zip(data, digests):
+                if digest not in offsets and digest not in relative:
+                    relative[digest] = len(pending)
+                    pending += d
+            if pending:
+                base = self._append(bytes(pending))
+                offsets.update((digest, base + position) for digest, position in relative.items())
+            conn.executemany("""
+            INSERT INTO protein_sequence (protein_id, uniprot_id, seq_offset, seq_length, digest)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (protein_id) DO UPDATE SET
+                uniprot_id = excluded.uniprot_id, seq_offset = excluded.seq_offset,
+                seq_length = excluded.seq_length, digest = excluded.digest
+            """, [(protein_id, uniprot_id, offsets[digest], len(d), digest)
+                  for (protein_id, uniprot_id, _), d, digest in zip(rows, data, digests)])
+            if self._epoch == epoch:
+                return [offsets[digest] for digest in digests]
+            stale = json.dumps([protein_id for protein_id, _, _ in rows])
+
+    def delete(self, conn, protein_id):
+        """Drop the index entry; the bytes are reclaimed by compact()."""
+        conn.execute("DELETE FROM protein_sequence WHERE protein_id = ?", (protein_id,))
+
+    # ---------- reads ----------
+    def _lookup(self, conn, column, value):
+        row = conn.execute(
+            f"SELECT seq_offset, seq_length FROM protein_sequence WHERE {column} = ? LIMIT 1", (value,)
+        ).fetchone()
+        return None if row is None else self._view(*row)
+
+    def get(self, conn, protein_id):
+        """Zero-copy memoryview of the residues for protein_id, or None."""
+        return self._lookup(conn, "protein_id", protein_id)
+
+    def read_range(self, offset, length):
+        """Zero-copy memoryview of a raw byte range of the file, e.g. several adjacent sequences."""
+        return self._view(offset, length)
+
+    def get_by_uniprot(self, conn, uniprot_id):
+        return self._lookup(conn, "uniprot_id", uniprot_id)
+
+    def get_str(self, conn, protein_id):
+        view = self.get(conn, protein_id)
+        return None if view is None else view.tobytes().decode("ascii")
+
+    def get_array(self, conn, protein_id):
+        """Zero-copy read-only uint8 NumPy view of the residues, or None."""
+        view = self.get(conn, protein_id)
+        return None if view is None else np.frombuffer(view, dtype=np.uint8)
+
+    def iter_sequences(self, conn, batch_size=10000):
+        """Yield (protein_id, memoryview) for every stored sequence in file order."""
+        last = -1
+        while True:
+            rows = conn.execute("""
+            SELECT protein_id, seq_offset, seq_length FROM protein_sequence
+            WHERE protein_id > ? ORDER BY protein_id LIMIT ?
+            """, (last, batch_size)).fetchall()
+            if not rows:
+                return
+            for protein_id, offset, length in rows:
+                yield protein_id, self._view(offset, length)
+            last = rows[-1][0]
+
+    # ---------- maintenance ----------
+    def stats(self, conn):
+        # Scans the whole index, so the counts come from the query cache;
+        # every write path bumps its generation. The file size is read live.
+        entries, distinct, referenced = fetch_all(conn, """
+        SELECT COUNT(*), COUNT(DISTINCT digest),
+               COALESCE((SELECT SUM(seq_length) FROM
+                   (SELECT seq_length FROM protein_sequence GROUP BY digest)), 0)
+        FROM protein_sequence
+        """)[0]
+        with self._lock:
+            self._file.flush()
+            size = os.path.getsize(self.path)
+        return {"entries": entries, "distinct_sequences": distinct,
+                "file_bytes": size, "live_bytes": referenced, "garbage_bytes": size - referenced}
+
+    def compact(self, conn):
+        """Rewrite the file with only referenced sequences and update offsets in one transaction.
+
+        Takes the database write lock first, so every sequence another
+        connection has stored is committed and visible, then holds the
+        append lock until the new file is in place, so nothing is appended
+        to the old one meanwhile. Run it while no other process uses the
+        store; this process remaps on its next read.
+        """
+        tmp = self.path + ".compact"
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            with self._lock:
+                self._file.flush()
+                rows = conn.execute("""
+                SELECT digest, MIN(seq_offset), seq_length FROM protein_sequence GROUP BY digest
+                """).fetchall()
+                new_offsets = {}
+                # Read through a private map: _view() would wait on the lock held here.
+                with open(self.path, "rb") as f, open(tmp, "wb") as out:
+                    source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(self.path) else b""
+                    for digest, offset, length in rows:
+                        new_offsets[digest] = out.tell()
+                        out.write(source[offset:offset + length])
+                    if source:
+                        source.close()
+                conn.executemany("UPDATE protein_sequence SET seq_offset = ? WHERE digest = ?",
+                                 [(offset, digest) for digest, offset in new_offsets.items()])
+                self._file.close()
+                os.replace(tmp, self.path)
+                self._file = open(self.path, "ab")
+                self._map = None
+                self._mapped_size = 0
+                self._epoch += 1
+                conn.commit()
+        except BaseException:
+            conn.rollback()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+# ================= SHARED STORES =================
+_stores = {}
+_stores_lock = threading.Lock()
+
+def _db_path(conn):
+    return conn.execute("PRAGMA database_list").fetchone()[2]
+
+def store_for(conn):
+    """The SequenceStore belonging to conn's database file, opened once per process."""
+    path = default_path(_db_path(conn) or "memory")
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = SequenceStore(path)
+        return store
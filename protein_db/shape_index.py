@@ -0,0 +1,206 @@
+import threading
+
+import numpy as np
+
+from protein_db.coordinates import CA, load_coordinates
+from protein_db.query_cache import bump_generation, fetch_all, read_sql
+
+# ================= DESCRIPTOR =================
+# Distance-distribution histogram over CA atoms: the fraction of CA pairs
+# whose distance falls in each BIN_WIDTH angstrom bin, the last bin holding
+# everything further apart. Stored as square roots, so the Euclidean
+# distance between two descriptors is the Hellinger distance between the
+# histograms (0 for identical shapes, at most sqrt(2)).
+BINS = 32
+BIN_WIDTH = 5.0
+# Larger structures are evenly subsampled; the histogram shape barely moves.
+MAX_CA = 2000
+DEFAULT_NEIGHBOURS = 5
+
+def shape_descriptor(coords):
+    """(BINS,) float32 descriptor of a parse_mmcif() result, or None without at least two CA atoms."""
+    xyz = coords["xyz"][(coords["atom_flags"] & CA).astype(bool)].astype(np.float64)
+    if len(xyz) < 2:
+        return None
+    if len(xyz) > MAX_CA:
+        xyz = xyz[np.linspace(0, len(xyz) - 1, MAX_CA).astype(np.int64)]
+    left, right = np.triu_indices(len(xyz), 1)
+    distances = np.sqrt(((xyz[left] - xyz[right]) ** 2).sum(axis=1))
+    bins = np.minimum((distances / BIN_WIDTH).astype(np.int64), BINS - 1)
+    return np.sqrt(np.bincount(bins, minlength=BINS) / len(distances)).astype(np.float32)
+
+# ================= INDEX =================
+class ShapeIndex:
+    """Every stored shape descriptor as one float32 matrix, searched with a single matrix-vector product.
+
+    The descriptors persist in structure_shape; the matrix is loaded from
+    there on first use and then kept current by add() / discard() as
+    proteins are ingested or deleted. Rows grow by doubling, so adding is
+    amortized O(1).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._built = False
+        self._size = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, BINS), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._row_of = {}
+
+    def ensure_built(self, conn):
+        with self._lock:
+            if self._built:
+                return
+            rows = conn.execute("SELECT protein_id, descriptor FROM structure_shape ORDER BY protein_id").fetchall()
+            self._reset()
+            self._grow(len(rows))
+            self._size = len(rows)
+            self._ids[:self._size] = [r[0] for r in rows]
+            self._vectors[:self._size] = np.frombuffer(b"".join(r[1] for r in rows), dtype=np.float32).reshape(-1, BINS)
+            self._norms[:self._size] = (self._vectors[:self._size] ** 2).sum(axis=1)
+            self._alive[:self._size] = True
+            self._row_of = {protein_id: row for row, protein_id in enumerate(self._ids[:self._size].tolist())}
+            self._built = True
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self._ids), 1024)
+        if needed <= len(self._ids):
+            return
+        for name in ("_ids", "_vectors", "_norms", "_alive"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def add(self, protein_id, vector):
+        """Insert or replace a protein's descriptor. Ignored until the index has been built."""
+        with self._lock:
+            if not self._built:
+                return
+            row = self._row_of.get(protein_id)
+            if row is None:
+                self._grow(self._size + 1)
+                row = self._row_of[protein_id] = self._size
+                self._size += 1
+                self._ids[row] = protein_id
+            self._vectors[row] = vector
+            self._norms[row] = float((vector.astype(np.float32) ** 2).sum())
+            self._alive[row] = True
+
+    def discard(self, protein_id):
+        with self._lock:
+            row = self._row_of.get(protein_id)
+            if row is not None:
+                self._alive[row] = False
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+    def nearest(self, vector, k=DEFAULT_NEIGHBOURS, exclude=None):
+        """[(protein_id, distance)] of the k closest descriptors, closest first."""
+        with self._lock:
+            n = self._size
+            vectors, norms, alive, ids = self._vectors[:n], self._norms[:n], self._alive[:n], self._ids[:n]
+            squared = norms - 2 * (vectors @ vector) + float((vector ** 2).sum())
+            squared[~alive] = np.inf
+            row = self._row_of.get(exclude)
+            if row is not None:
+                squared[row] = np.inf
+            k = min(k, int(np.isfinite(squared).sum()))
+            if k == 0:
+                return []
+            top = np.argpartition(squared, k - 1)[:k]
+            top = top[np.argsort(squared[top], kind="stable")]
+            return [(int(ids[i]), float(np.sqrt(max(squared[i], 0.0)))) for i in top]
+
+    def stats(self):
+        with self._lock:
+            return {"built": self._built, "structures": int(self._alive[:self._size].sum()),
+                    "bytes": self._vectors.nbytes + self._norms.nbytes + self._ids.nbytes}
+
+# ================= SHARED INDEXES =================
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def shape_index_for(conn):
+    """The ShapeIndex of conn's database file, created once per process and loaded on first search."""
+    path = conn.execute("PRAGMA database_list").fetchone()[2] or "memory"
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = ShapeIndex()
+        return index
+
+# ================= STORE / SEARCH =================
+def store_shape(cursor, protein_id, vector, after_commit=None):
+    """Save a protein's descriptor. Does not commit.
+
+    The index update is appended to ``after_commit`` for the caller to run
+    once the row is committed, so a rollback never leaves it in the index.
+    """
+    cursor.execute("INSERT OR REPLACE INTO structure_shape (protein_id, descriptor) VALUES (?, ?)",
+                   (protein_id, vector.astype(np.float32).tobytes()))
+    if after_commit is not None:
+        index = shape_index_for(cursor.connection)
+        after_commit.append(lambda: index.add(protein_id, vector))
+
+MISSING_SHAPES_SQL = """
+SELECT c.protein_id
+FROM structure_coordinates c
+LEFT JOIN structure_shape h ON h.protein_id = c.protein_id
+WHERE h.protein_id IS NULL
+"""
+
+def count_missing_shapes(conn):
+    return fetch_all(conn, f"SELECT COUNT(*) FROM ({MISSING_SHAPES_SQL})")[0][0]
+
+def backfill_shapes(conn, on_progress=None):
+    """Compute descriptors from stored coordinates for structures that have none. Returns how many were stored."""
+    ids = [r[0] for r in conn.execute(MISSING_SHAPES_SQL).fetchall()]
+    stored = 0
+    after_commit = []
+    with conn:
+        cursor = conn.cursor()
+        for done, protein_id in enumerate(ids, 1):
+            vector = shape_descriptor(load_coordinates(conn, protein_id))
+            if vector is not None:
+                store_shape(cursor, protein_id, vector, after_commit)
+                stored += 1
+            if on_progress is not None:
+                on_progress(done, len(ids))
+    bump_generation()
+    for update in after_commit:
+        update()
+    return stored
+
+SIMILAR_QUERY = """
+SELECT p.protein_id, p.pdb_id, p.protein_name, p.organism, s.method, s.resolution, s.radius_of_gyration
+FROM protein p
+JOIN protein_structure s ON s.protein_id = p.protein_id
+WHERE p.protein_id IN ({placeholders})
+"""
+
+def similar_structures(conn, pdb_id, k=DEFAULT_NEIGHBOURS):
+    """Proteins whose CA distance distribution is closest to pdb_id's, with a shape_distance column."""
+    row = conn.execute("""
+    SELECT h.protein_id, h.descriptor
+    FROM protein p JOIN structure_shape h ON h.protein_id = p.protein_id
+    WHERE p.pdb_id = UPPER(?)
+    """, (pdb_id,)).fetchone()
+    if row is None:
+        return None
+    index = shape_index_for(conn)
+    index.ensure_built(conn)
+    hits = index.nearest(np.frombuffer(row[1], dtype=np.float32), k, exclude=row[0])
+    if not hits:
+        return None
+    distances = dict(hits)
+    df = read_sql(conn, SIMILAR_QUERY.format(placeholders=", ".join("?" * len(hits))), tuple(distances))
+    return (df.assign(shape_distance=df["protein_id"].map(distances).round(4))
+            .sort_values(["shape_distance", "pdb_id"]).drop(columns="protein_id").reset_index(drop=True))
@@ -0,0 +1,58 @@
+# ================= SUMMARY TABLES =================
+# stat_counter / stat_breakdown and the triggers that maintain them are
+# created by migrations/0005_summary_statistics.sql.
+COUNTERS = ("proteins", "structures", "structures_with_ligands", "structures_without_ligands")
+
+# ================= FULL RECOUNT =================
+# The same definitions the triggers maintain, computed from scratch.
+ACTUAL_COUNTERS_SQL = """
+SELECT 'proteins', COUNT(*) FROM protein
+UNION ALL SELECT 'structures', COUNT(*) FROM protein_structure
+UNION ALL SELECT 'structures_with_ligands', COUNT(*) FROM protein_structure WHERE ligand_present = 1
+UNION ALL SELECT 'structures_without_ligands', COUNT(*) FROM protein_structure WHERE IFNULL(ligand_present, 0) <> 1
+"""
+
+ACTUAL_BREAKDOWN_SQL = """
+SELECT 'organism', IFNULL(organism, 'Unknown'), COUNT(*) FROM protein GROUP BY 2
+UNION ALL
+SELECT 'method', IFNULL(method, 'Unknown'), COUNT(*) FROM protein_structure GROUP BY 2
+"""
+
+def rebuild_stats(conn):
+    """Recount everything and overwrite the summary tables in one transaction."""
+    with conn:
+        conn.execute("DELETE FROM stat_counter")
+        conn.execute("DELETE FROM stat_breakdown")
+        conn.execute(f"INSERT INTO stat_counter (name, value) {ACTUAL_COUNTERS_SQL}")
+        conn.execute(f"INSERT INTO stat_breakdown (dimension, label, value) {ACTUAL_BREAKDOWN_SQL}")
+
+# ================= READING =================
+def get_counters(conn):
+    counters = dict.fromkeys(COUNTERS, 0)
+    counters.update(conn.execute("SELECT name, value FROM stat_counter").fetchall())
+    return counters
+
+def get_breakdown(conn, dimension, limit=20):
+    return conn.execute("""
+    SELECT label, value FROM stat_breakdown
+    WHERE dimension = ?
+    ORDER BY value DESC, label
+    LIMIT ?
+    """, (dimension, limit)).fetchall()
+
+def check_stats(conn):
+    """Compare stored counters with a full recount.
+
+    Returns a list of (dimension, name, stored, actual) for every mismatch;
+    an empty list means the summary tables are consistent.
+    """
+    stored = {("counter", name): value for name, value in get_counters(conn).items()}
+    stored.update({(dim, label): value for dim, label, value in
+                   conn.execute("SELECT dimension, label, value FROM stat_breakdown")})
+    actual = {("counter", name): value for name, value in conn.execute(ACTUAL_COUNTERS_SQL)}
+    actual.update({(dim, label): value for dim, label, value in conn.execute(ACTUAL_BREAKDOWN_SQL)})
+    return [
+        (key[0], key[1], stored.get(key, 0), actual.get(key, 0))
+        for key in sorted(set(stored) | set(actual))
+        if stored.get(key, 0) != actual.get(key, 0)
+    ]
@@ -0,0 +1,256 @@
+import gzip
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+
+from protein_db import http_client
+
+# ================= SETTINGS =================
+# Files are served by Streamlit's static file handler
+# (server.enableStaticServing in .streamlit/config.toml), which only serves
+# the ``static`` folder next to Home.py, under /app/static/.
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STRUCTURE_DIR = os.path.join(APP_DIR, "static", "structures")
+STATIC_URL = "app/static/structures"
+CACHE_DIR = os.environ.get("STRUCTURE_CACHE_DIR", os.path.join(".cache", "structures"))
+MAX_BYTES = int(os.environ.get("STRUCTURE_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+# Offline mode never touches the network: only entries already on disk are shown.
+OFFLINE = os.environ.get("STRUCTURE_OFFLINE", "").lower() in ("1", "true", "yes")
+RCSB_MODELS_URL = os.environ.get("RCSB_MODELS_URL", "https://models.rcsb.org").rstrip("/")
+RCSB_FILES_URL = os.environ.get("RCSB_FILES_URL", "https://files.rcsb.org").rstrip("/")
+# Tried in order. BinaryCIF is several times smaller than mmCIF and much
+# faster for the viewer to parse; mmCIF covers entries without it.
+FORMATS = {
+    "bcif": RCSB_MODELS_URL + "/{pdb_id}.bcif",
+    "cif": RCSB_FILES_URL + "/download/{pdb_id}.cif",
+}
+COMPRESS_LEVEL = 6
+DOWNLOAD_BLOCK = 1024 * 1024
+_ENTRY_ID = re.compile(r"[0-9A-Z_]{4,12}")
+
+# ================= CACHE =================
+class StructureCache:
+    """Gzip-compressed coordinate files, one per entry, with an LRU-bounded SQLite index.
+
+    Files are named ``<PDB ID>.<format>.gz`` and decompressed by the viewer
+    in the browser, so the server only ever streams them to disk once.
+    Files found on disk without an index row (e.g. copied in for an offline
+    deployment) are adopted on first lookup.
+    """
+
+    def __init__(self, structure_dir=STRUCTURE_DIR, cache_dir=CACHE_DIR, max_bytes=MAX_BYTES,
+                 formats=None, offline=OFFLINE):
+        self.structure_dir = structure_dir
+        self.max_bytes = max_bytes
+        self.formats = FORMATS if formats is None else formats
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._entry_locks = {}
+        os.makedirs(structure_dir, exist_ok=True)
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS structure (
+            pdb_id TEXT PRIMARY KEY,
+            format TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            source_size INTEGER,
+            fetched_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_structure_last_access ON structure(last_access)")
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0, "downloads": 0, "failures": 0, "offline_misses": 0,
+                       "bytes_downloaded": 0, "evictions": 0}
+
+    # ---------- files ----------
+    def file_name(self, pdb_id, fmt):
+        return f"{pdb_id}.{fmt}.gz"
+
+    def _path(self, pdb_id, fmt):
+        return os.path.join(self.structure_dir, self.file_name(pdb_id, fmt))
+
+    def _remove(self, pdb_id, fmt):
+        try:
+            os.remove(self._path(pdb_id, fmt))
+        except FileNotFoundError:
+            pass
+
+    def _entry(self, pdb_id, fmt, size, source_size, from_cache):
+        return {"pdb_id": pdb_id, "format": fmt, "binary": fmt == "bcif",
+                "url": f"{STATIC_URL}/{self.file_name(pdb_id, fmt)}",
+                "size": size, "source_size": source_size, "from_cache": from_cache}
+
+    def _entry_lock(self, pdb_id):
+        with self._lock:
+            return self._entry_locks.setdefault(pdb_id, threading.Lock())
+
+    # ---------- index ----------
+    def _lookup(self, pdb_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT format, size, source_size FROM structure WHERE pdb_id = ?", (pdb_id,)
+            ).fetchone()
+            if row is not None and not os.path.exists(self._path(pdb_id, row[0])):
+                self._conn.execute("DELETE FROM structure WHERE pdb_id = ?", (pdb_id,))
+                self._conn.commit()
+                row = None
+        if row is not None:
+            return row
+        for fmt in self.formats:
+            path = self._path(pdb_id, fmt)
+            if os.path.exists(path):
+                size = os.path.getsize(path)
+                self._store(pdb_id, fmt, size, None)
+                return fmt, size, None
+        return None
+
+    def _touch(self, pdb_id):
+        with self._lock:
+            self._conn.execute("UPDATE structure SET last_access = ? WHERE pdb_id = ?", (time.time(), pdb_id))
+            self._conn.commit()
+
+    def _store(self, pdb_id, fmt, size, source_size):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("""
+            INSERT OR REPLACE INTO structure (pdb_id, format, size, source_size, fetched_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """, (pdb_id, fmt, size, source_size, now, now))
+            self._evict(keep=pdb_id)
+            self._conn.commit()
+
+    def _evict(self, keep):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM structure").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT pdb_id, format, size FROM structure WHERE pdb_id != ? ORDER BY last_access", (keep,)
+        ).fetchall()
+        for pdb_id, fmt, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM structure WHERE pdb_id = ?", (pdb_id,))
+            self._remove(pdb_id, fmt)
+            total -= size
+            self._stats["evictions"] += 1
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    # ---------- downloads ----------
+    def _download(self, pdb_id):
+        """Stream the first available format to disk, gzip-compressing on the way. (format, size, source size) or None."""
+        for fmt, template in self.formats.items():
+            response = http_client.get(template.format(pdb_id=pdb_id), stream=True, headers={"Accept": "*/*"})
+            try:
+                if response.status_code != 200:
+                    continue
+                path = self._path(pdb_id, fmt)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                source_size = 0
+                try:
+                    with gzip.open(tmp, "wb", compresslevel=COMPRESS_LEVEL) as out:
+                        for block in response.iter_content(DOWNLOAD_BLOCK):
+                            out.write(block)
+                            source_size += len(block)
+                    os.replace(tmp, path)
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                    raise
+                return fmt, os.path.getsize(path), source_size
+            finally:
+                response.close()
+        return None
+
+    # ---------- public ----------
+    def get(self, pdb_id, offline=None):
+        """Entry dict for pdb_id, downloading and compressing it on a miss; None if it cannot be had.
+
+        The dict has the static ``url`` the browser fetches, the ``format``
+        ("bcif" or "cif"), whether it is ``binary``, and the compressed and
+        original sizes. Concurrent misses for the same entry download it once.
+        """
+        pdb_id = pdb_id.strip().upper()
+        if not _ENTRY_ID.fullmatch(pdb_id):
+            return None
+        offline = self.offline if offline is None else offline
+        with self._entry_lock(pdb_id):
+            row = self._lookup(pdb_id)
+            if row is not None:
+                self._touch(pdb_id)
+                self._count("hits")
+                return self._entry(pdb_id, *row, from_cache=True)
+            if offline:
+                self._count("offline_misses")
+                return None
+            self._count("misses")
+            try:
+                downloaded = self._download(pdb_id)
+            except requests.RequestException:
+                downloaded = None
+            if downloaded is None:
+                self._count("failures")
+                return None
+            fmt, size, source_size = downloaded
+            self._count("downloads")
+            self._count("bytes_downloaded", source_size)
+            self._store(pdb_id, fmt, size, source_size)
+            return self._entry(pdb_id, fmt, size, source_size, from_cache=False)
+
+    def cached_ids(self, limit=50):
+        """PDB IDs available without the network, most recently viewed first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pdb_id FROM structure ORDER BY last_access DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            entries, total, source, known = self._conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(source_size), 0),
+                   COALESCE(SUM(CASE WHEN source_size IS NOT NULL THEN size END), 0)
+            FROM structure
+            """).fetchone()
+        lookups = stats["hits"] + stats["misses"] + stats["offline_misses"]
+        stats.update({
+            "entries": entries,
+            "stored_bytes": total,
+            "max_bytes": self.max_bytes,
+            "compression_ratio": source / known if known else 0.0,
+            "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+            "offline": self.offline,
+        })
+        return stats
+
+    def clear(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT pdb_id, format FROM structure").fetchall()
+            self._conn.execute("DELETE FROM structure")
+            self._conn.commit()
+            for pdb_id, fmt in rows:
+                self._remove(pdb_id, fmt)
+
+# ================= SHARED INSTANCE =================
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = StructureCache()
+        return _cache
+
+def get(pdb_id, offline=None):
+    return get_cache().get(pdb_id, offline)
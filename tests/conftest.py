@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+from protein_db.migrations import migrate
+from protein_db.properties import property_rows
+
+SEQUENCE = "MKTAYIAKQRQISFVKSHFSRQLEERLGLIEVQAPILSRVGDGTQDNLSGAEKAVQVKVKALPDAQFEVVHSLAKWKRQTLGQHDFSAGEGLYTHMKALRPDEDRLSPLHSVYVDQWDWERVMGDGERQFSTLKSTVEAIWAGIKATEAAVSEEFGLAPFLPDQIHFVHSQELLSRYPDLDAKGRERAIAKDLGAVFLVGIGGKLSDGHRHDVRAPDYDDWUAVGVQ"
+
+@pytest.fixture
+def conn(tmp_path):
+    """A migrated database in a fresh directory, with its sequence file next to it."""
+    conn = sqlite3.connect(str(tmp_path / "test.db"))
+    migrate(conn)
+    yield conn
+    conn.close()
+
+def make_record(pdb_id="1ABC", sequence=SEQUENCE, **fields):
+    """A record shaped like fetch_protein_record() returns, without coordinates."""
+    record = {
+        "protein_name": "Test protein",
+        "pdb_id": pdb_id,
+        "uniprot_id": "P12345",
+        "organism": "Escherichia coli",
+        "function": "Binds things.",
+        "method": "X-RAY DIFFRACTION",
+        "resolution": 1.8,
+        "ligand_present": 0,
+        "sequence": sequence,
+        "coordinates": None,
+        "descriptors": None,
+    }
+    record.update(property_rows([sequence])[0])
+    record.update(fields)
+    return record
@@ -0,0 +1,48 @@
+import gzip
+import json
+
+from protein_db.bulk_import import classify, import_dumps
+from tests.conftest import SEQUENCE
+
+def record(pdb_id):
+    return {"pdb_id": pdb_id, "protein_name": "Imported", "uniprot_id": "P12345", "sequence": SEQUENCE}
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+def test_malformed_documents_are_skipped(conn, tmp_path):
+    dumps = tmp_path / "dumps"
+    dumps.mkdir()
+    (dumps / "records.jsonl").write_text("\n".join([
+        json.dumps(record("1ABC")),
+        "{not json",
+        json.dumps([1, 2, 3]),
+        json.dumps("a string"),
+        json.dumps({"unrelated": True}),
+        json.dumps(record("2DEF")),
+    ]))
+    (dumps / "broken.json").write_text("{\"rcsb_id\": ")
+    (dumps / "entry.json").write_text(json.dumps({"rcsb_id": "3GHI", "exptl": "not a list"}))
+    counts = import_dumps(conn, [str(dumps)])
+    assert counts["documents"] == 8
+    assert counts["skipped"] == 6
+    assert counts["records"] == counts["added"] == 2
+    assert count(conn, "protein") == count(conn, "protein_structure") == count(conn, "protein_sequence") == 2
+
+def test_unreadable_files_are_counted_and_skipped(conn, tmp_path):
+    dumps = tmp_path / "dumps"
+    dumps.mkdir()
+    (dumps / "a.jsonl").write_text(json.dumps(record("1ABC")))
+    packed = gzip.compress("\n".join(json.dumps(record(f"{i}XYZ")) for i in range(2, 9)).encode())
+    (dumps / "b.jsonl.gz").write_bytes(packed[:len(packed) // 2])
+    (dumps / "c.jsonl.gz").write_bytes(b"not gzip at all")
+    (dumps / "d.jsonl").write_bytes(b"\xff\xfe\xfa not utf-8\n")
+    counts = import_dumps(conn, [str(dumps)])
+    assert counts["unreadable_files"] == 3
+    assert count(conn, "protein") == counts["added"] >= 1
+    assert not conn.in_transaction
+
+def test_classify_ignores_non_objects():
+    assert classify(None) is None
+    assert classify([record("1ABC")]) is None
+    assert classify(record("1ABC")) == "record"
@@ -0,0 +1,88 @@
+import pytest
+
+from protein_db import sequence_store
+from protein_db.ingest import _store_in_savepoint, run_after_commit, store_protein
+from protein_db.kmer_index import index_for
+from protein_db.sequence_store import store_for
+from tests.conftest import SEQUENCE, make_record
+
+OTHER_SEQUENCE = "GSHMASMTGGQQMGRDLYDDDDKDPSSRSAAGTMEFAAGKLHHHHHHLEDPVVLLVFSQNAIRKWE"
+
+def stored(conn, pdb_id):
+    return conn.execute("""
+    SELECT p.protein_name, s.method, q.seq_offset
+    FROM protein p
+    LEFT JOIN protein_structure s ON s.protein_id = p.protein_id
+    LEFT JOIN protein_sequence q ON q.protein_id = p.protein_id
+    WHERE p.pdb_id = ?
+    """, (pdb_id,)).fetchone()
+
+def store(conn, record, refresh=False):
+    after_commit = []
+    with conn:
+        result = store_protein(conn.cursor(), record, refresh, after_commit)
+    run_after_commit(after_commit)
+    return result
+
+def test_insert_stores_protein_structure_and_sequence(conn):
+    assert store(conn, make_record(pdb_id=" 1abc ")) == (True, "Protein added successfully")
+    name, method, _ = stored(conn, "1ABC")
+    assert (name, method) == ("Test protein", "X-RAY DIFFRACTION")
+    protein_id = conn.execute("SELECT protein_id FROM protein WHERE pdb_id = '1ABC'").fetchone()[0]
+    assert store_for(conn).get_str(conn, protein_id) == SEQUENCE
+
+def test_existing_protein_is_left_alone_without_refresh(conn):
+    store(conn, make_record())
+    assert store(conn, make_record(protein_name="Renamed")) == (True, "Protein already exists")
+    assert stored(conn, "1ABC")[0] == "Test protein"
+
+def test_refresh_overwrites_metadata_and_sequence(conn):
+    store(conn, make_record())
+    old_offset = stored(conn, "1ABC")[2]
+    result = store(conn, make_record(protein_name="Renamed", method="ELECTRON MICROSCOPY", sequence=OTHER_SEQUENCE),
+                   refresh=True)
+    assert result == (True, "Protein refreshed")
+    name, method, offset = stored(conn, "1ABC")
+    assert (name, method) == ("Renamed", "ELECTRON MICROSCOPY")
+    assert offset != old_offset
+    assert conn.execute("SELECT refreshed_at IS NOT NULL FROM protein WHERE pdb_id = '1ABC'").fetchone()[0]
+
+def test_refresh_drops_the_old_sequence_from_the_index(conn):
+    store(conn, make_record())
+    index = index_for(conn)
+    index.build(conn)
+    store(conn, make_record(sequence=OTHER_SEQUENCE), refresh=True)
+    assert index.stats()["sequences"] == 1
+    assert [hit[0] for hit in index.search(OTHER_SEQUENCE)] == [stored(conn, "1ABC")[2]]
+    assert index.search(SEQUENCE) == []
+
+def test_index_is_untouched_until_commit(conn):
+    index = index_for(conn)
+    index.build(conn)
+    after_commit = []
+    store_protein(conn.cursor(), make_record(), after_commit=after_commit)
+    conn.rollback()
+    assert stored(conn, "1ABC") is None
+    assert index.stats()["sequences"] == 0
+
+def test_failed_record_is_rolled_back_on_its_own(conn, monkeypatch):
+    put = sequence_store.SequenceStore.put
+
+    def failing_put(self, conn, protein_id, uniprot_id, sequence):
+        if sequence == OTHER_SEQUENCE:
+            raise OSError("disk full")
+        return put(self, conn, protein_id, uniprot_id, sequence)
+    monkeypatch.setattr(sequence_store.SequenceStore, "put", failing_put)
+
+    cursor = conn.cursor()
+    after_commit = []
+    with conn:
+        _store_in_savepoint(cursor, make_record("1ABC"), False, after_commit)
+        queued = len(after_commit)
+        with pytest.raises(OSError):
+            _store_in_savepoint(cursor, make_record("2DEF", sequence=OTHER_SEQUENCE), False, after_commit)
+    assert len(after_commit) == queued
+    assert stored(conn, "1ABC") is not None
+    assert stored(conn, "2DEF") is None
+    assert conn.execute("SELECT COUNT(*) FROM protein_structure").fetchone()[0] == 1
+    assert not conn.in_transaction